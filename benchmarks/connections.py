@@ -0,0 +1,105 @@
+"""
+Compares the number of connections and the wall time of the core operations
+when every call opens its own temporary session against performing all of
+them with a single shared session.
+Uses the backend selected via $PPP_BACKEND, i.e., run it with PPP_BACKEND=fake
+for the in-process fake server (no PulseAudio server required); with the
+default pulsectl backend, it requires a running PulseAudio server.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import pypulseprofiles.session as session_module
+from pypulseprofiles.core import PulseSession, pulse_info, pulse_source, pulse_sink, pulse_create_profile, pulse_apply_profile
+
+
+class ConnectCounter(object):
+    """
+    Counts the connections opened via pulse_instance().
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._orig = session_module.pulse_instance
+
+    def __enter__(self):
+        def counting(server=None):
+            self.count += 1
+            return self._orig(server)
+        session_module.pulse_instance = counting
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        session_module.pulse_instance = self._orig
+
+
+def run_unshared():
+    """
+    Performs the operations with a temporary session for every call.
+    """
+
+    profile = pulse_create_profile()
+    pulse_info(list_sources=True, list_sinks=True)
+    pulse_source(profile['source']['device'])
+    pulse_sink(profile['sink']['device'])
+    pulse_apply_profile(profile)
+
+
+def run_shared():
+    """
+    Performs the operations with a single session.
+    """
+
+    with PulseSession() as session:
+        profile = pulse_create_profile(session=session)
+        pulse_info(list_sources=True, list_sinks=True, session=session)
+        pulse_source(profile['source']['device'], session=session)
+        pulse_sink(profile['sink']['device'], session=session)
+        pulse_apply_profile(profile, session=session)
+
+
+def measure(func, repeats):
+    """
+    Runs the function the specified number of times.
+
+    :param func: the function to run
+    :param repeats: the number of repetitions
+    :type repeats: int
+    :return: tuple of connections per run and wall time per run in msec
+    :rtype: tuple
+    """
+
+    with ConnectCounter() as counter:
+        start = time.perf_counter()
+        for i in range(repeats):
+            func()
+        duration = time.perf_counter() - start
+    return counter.count / repeats, duration / repeats * 1000.0
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Compares connections and wall time with and without a shared session.',
+        prog="connections")
+    parser.add_argument("--repeats", metavar="NUM", dest="repeats", type=int, default=20, help="the number of repetitions")
+    parsed = parser.parse_args(args=args)
+
+    for name, func in [("unshared", run_unshared), ("shared", run_shared)]:
+        connects, msec = measure(func, parsed.repeats)
+        print("%-10s connects/run: %5.1f   wall time/run: %8.2f ms" % (name, connects, msec))
+
+
+if __name__ == "__main__":
+    main()
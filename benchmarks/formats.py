@@ -0,0 +1,72 @@
+"""
+Compares the time for loading a profile in the supported storage formats,
+including YAML with the pure-Python loader for reference.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pypulseprofiles.storage import FORMATS, format_extension, profile_read, profile_write
+
+PROFILE = {
+    'description': 'Headset in meeting room',
+    'source': {
+        'device': 'alsa_input.usb-Logitech_USB_Headset_000000000000-00.mono-fallback',
+        'port': 'analog-input-mic',
+        'volume': 0.75,
+    },
+    'sink': {
+        'device': 'alsa_output.usb-Logitech_USB_Headset_000000000000-00.analog-stereo',
+        'port': 'analog-output-headphones',
+        'volume': 0.5,
+    },
+}
+""" the profile to use. """
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Compares the load times of the profile storage formats.',
+        prog="formats")
+    parser.add_argument("--repeats", metavar="NUM", dest="repeats", type=int, default=2000, help="the number of loads per format")
+    parsed = parser.parse_args(args=args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+
+        # reference: pure-Python YAML loader
+        filename = os.path.join(tmp, "pure.yaml")
+        profile_write(PROFILE, filename)
+
+        def load_pure():
+            with open(filename, "r") as f:
+                return yaml.load(f, Loader=yaml.SafeLoader)
+
+        results.append(("yaml (pure)", timeit.timeit(load_pure, number=parsed.repeats)))
+
+        for name in sorted(FORMATS):
+            filename = os.path.join(tmp, "profile" + format_extension(name))
+            profile_write(PROFILE, filename)
+            if profile_read(filename) != PROFILE:
+                raise Exception("Format %s does not reproduce the profile!" % name)
+            results.append((name, timeit.timeit(lambda: profile_read(filename), number=parsed.repeats)))
+
+    for name, total in results:
+        print("%-12s %8.2f us/load" % (name, total / parsed.repeats * 1000000.0))
+
+
+if __name__ == "__main__":
+    main()
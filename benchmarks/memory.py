@@ -0,0 +1,77 @@
+"""
+Measures the memory that the information about the setup takes when kept as
+nested dictionaries (pulse_snapshot_info) compared to compact records
+(collect_records), using tracemalloc on a fake server with 500 sources and
+500 sinks. Reports the retained size and the peak during collection.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pypulseprofiles.backend import set_backend
+from pypulseprofiles.core import pulse_snapshot_info, collect_records, info_fields
+from pypulseprofiles.fake import fake_scenario, set_fake_server
+from pypulseprofiles.session import PulseSession
+
+
+def measure(func):
+    """
+    Measures the memory allocated by the function.
+
+    :param func: the function to execute, its result is kept until after the measurement
+    :type func: function
+    :return: tuple of retained and peak size in bytes
+    :rtype: tuple
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current - before, peak - before
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Measures the memory of the setup information as dictionaries and as records.',
+        prog="memory")
+    parser.add_argument("--devices", metavar="NUM", dest="devices", type=int, default=500, help="the number of sources and of sinks")
+    parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to measure the verbose information (names and descriptions)")
+    parsed = parser.parse_args(args=args)
+
+    set_backend("fake")
+    set_fake_server(fake_scenario(sources=parsed.devices, sinks=parsed.devices, ports=4))
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        fields = info_fields(None, True)
+        options = dict(list_sources=True, list_sinks=True)
+        results = [
+            ("dictionaries", lambda: pulse_snapshot_info(snapshot, volume=True, verbose=parsed.verbose, **options)),
+            ("records", lambda: collect_records(snapshot, fields, **options)),
+            ("records+output", lambda: collect_records(snapshot, fields, **options).to_dict(parsed.verbose)),
+        ]
+        for name, func in results:
+            retained, peak = measure(func)
+            print("%-15s retained: %8.1f KB   peak: %8.1f KB" % (name, retained / 1024.0, peak / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Counts the server round trips and measures the wall time of the core
+operations against the fake backend, with latency injected into every call
+and the number of devices scaling from 2 to 500. The results get compared
+against the baselines stored in baselines.json (next to this script): more
+round trips than the baseline or a wall time exceeding the baseline by more
+than the tolerance are regressions and make the run exit with 1. As the wall
+time cannot drop below the injected latency times the round trips, the
+tolerance gets applied to that lower bound if it exceeds the baseline.
+Use --update to store the current results as new baselines.
+Can be run from a checkout without installing the library.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pypulseprofiles.backend import set_backend
+from pypulseprofiles.core import pulse_info, pulse_create_profile, pulse_apply_profile
+from pypulseprofiles.fake import fake_scenario, set_fake_server
+
+SIZES = [2, 10, 50, 100, 500]
+""" the numbers of sources and sinks to benchmark with. """
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+""" the file with the stored baselines. """
+
+
+def profile(devices, count):
+    """
+    Returns the profile for the specified run. The runs alternate between two
+    devices and, every other time, between the ports and volumes of the device,
+    i.e., every run changes every setting (defaults, ports and volumes).
+
+    :param devices: the number of sources/sinks
+    :type devices: int
+    :param count: the number of the run
+    :type count: int
+    :return: the profile
+    :rtype: dict
+    """
+
+    n = [devices // 2 - 1, devices - 1][count % 2]
+    i = (count // 2) % 2
+    return {
+        'source': {'device': "Fake Input %d" % n, 'port': "Input %d" % (i + 1), 'volume': 0.25 + i * 0.5},
+        'sink': {'device': "Fake Output %d" % n, 'port': "Output %d" % (i + 1), 'volume': 0.25 + i * 0.5},
+    }
+
+
+def operations(devices):
+    """
+    Returns the operations to benchmark, each using a temporary session like the command-line tools.
+
+    :param devices: the number of sources/sinks
+    :type devices: int
+    :return: the list of (name, function) tuples
+    :rtype: list
+    """
+
+    state = {'count': 0}
+
+    def apply():
+        pulse_apply_profile(profile(devices, state['count']), volume=True)
+        state['count'] += 1
+
+    return [
+        ("info", lambda: pulse_info(list_sources=True, list_sinks=True, volume=True)),
+        ("create", lambda: pulse_create_profile(volume=True)),
+        ("apply", apply),
+    ]
+
+
+def measure(devices, latency, repeats):
+    """
+    Benchmarks the operations with the specified number of devices.
+
+    :param devices: the number of sources/sinks
+    :type devices: int
+    :param latency: the latency per call in seconds
+    :type latency: float
+    :param repeats: the number of repetitions, the median wall time gets used
+    :type repeats: int
+    :return: the dictionary of operation -> {'round_trips', 'msec'}
+    :rtype: dict
+    """
+
+    server = fake_scenario(sources=devices, sinks=devices, ports=4, latency=latency)
+    set_fake_server(server)
+    result = dict()
+    for name, func in operations(devices):
+        times = []
+        trips = 0
+        for i in range(repeats):
+            server.reset_calls()
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000.0)
+            trips = max(trips, server.round_trips)
+        result[name] = {'round_trips': trips, 'msec': round(statistics.median(times), 2)}
+    return result
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Counts round trips and measures wall times of the core operations against the fake backend.',
+        prog="roundtrips")
+    parser.add_argument("--latency", metavar="MSEC", dest="latency", type=float, default=1.0, help="the latency to inject into every call")
+    parser.add_argument("--repeats", metavar="NUM", dest="repeats", type=int, default=5, help="the number of repetitions, the median gets used")
+    parser.add_argument("--tolerance", metavar="FACTOR", dest="tolerance", type=float, default=0.5, help="the fraction that wall times may exceed the baselines by")
+    parser.add_argument("--baselines", metavar="FILE", dest="baselines", default=BASELINES, help="the file with the baselines")
+    parser.add_argument("--update", action="store_true", dest="update", help="whether to store the results as new baselines")
+    parsed = parser.parse_args(args=args)
+
+    set_backend("fake")
+    results = dict()
+    for devices in SIZES:
+        results[str(devices)] = measure(devices, parsed.latency / 1000.0, parsed.repeats)
+
+    baselines = dict()
+    if not parsed.update and os.path.exists(parsed.baselines):
+        with open(parsed.baselines, "r") as f:
+            baselines = json.load(f)
+        if baselines.get('latency') != parsed.latency:
+            print("Baselines were measured with a latency of %s ms, not comparing wall times" % str(baselines.get('latency')))
+            for key in baselines.get('results', dict()):
+                for name in baselines['results'][key]:
+                    baselines['results'][key][name].pop('msec', None)
+
+    failed = False
+    for devices in SIZES:
+        for name, result in sorted(results[str(devices)].items()):
+            baseline = baselines.get('results', dict()).get(str(devices), dict()).get(name, dict())
+            problems = []
+            if ('round_trips' in baseline) and (result['round_trips'] > baseline['round_trips']):
+                problems.append("round trips %d > %d" % (result['round_trips'], baseline['round_trips']))
+            if 'msec' in baseline:
+                limit = max(baseline['msec'], parsed.latency * baseline.get('round_trips', 0)) * (1.0 + parsed.tolerance)
+                if result['msec'] > limit:
+                    problems.append("wall time exceeds %.2f ms" % limit)
+            failed = failed or (len(problems) > 0)
+            print("%4d devices  %-7s round trips: %4d   wall time: %8.2f ms   %s"
+                  % (devices, name, result['round_trips'], result['msec'],
+                     "FAILED (" + ", ".join(problems) + ")" if len(problems) > 0 else "OK"))
+
+    if parsed.update:
+        with open(parsed.baselines, "w") as f:
+            json.dump({'latency': parsed.latency, 'results': results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Baselines stored in: %s" % parsed.baselines)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares the end-to-end time of switching profiles with ppp-apply when executing
+in-process against forwarding to a running ppp-server. Also reports the time
+of the request itself, i.e., without the interpreter startup of the client.
+Uses the fake backend and a temporary config/runtime dir.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+""" the sources of the library, for running the benchmark from a checkout without installing it. """
+
+sys.path.insert(0, SRC)
+os.environ["PYTHONPATH"] = os.pathsep.join([SRC] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if len(p) > 0])
+
+PROFILES = {
+    'first': {'source': {'device': 'Fake Input 0', 'port': 'Input 1'}, 'sink': {'device': 'Fake Output 0', 'port': 'Output 1'}},
+    'second': {'source': {'device': 'Fake Input 1', 'port': 'Input 0'}, 'sink': {'device': 'Fake Output 1', 'port': 'Output 0'}},
+}
+""" the profiles to alternate between. """
+
+
+def run_apply(env, repeats):
+    """
+    Runs ppp-apply in a separate process, alternating between the profiles.
+
+    :param env: the environment to use
+    :type env: dict
+    :param repeats: the number of runs
+    :type repeats: int
+    :return: the median time in msec
+    :rtype: float
+    """
+
+    times = []
+    for i in range(repeats):
+        name = sorted(PROFILES)[i % 2]
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "pypulseprofiles.apply", "--config", name], env=env, check=True)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times)
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Compares profile switching with and without ppp-server.',
+        prog="server")
+    parser.add_argument("--repeats", metavar="NUM", dest="repeats", type=int, default=20, help="the number of switches")
+    parser.add_argument("--latency", metavar="MSEC", dest="latency", type=float, default=0.1, help="the latency to inject into every call of the fake backend")
+    parsed = parser.parse_args(args=args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['HOME'] = tmp
+        env['XDG_RUNTIME_DIR'] = tmp
+        env['PPP_BACKEND'] = "fake"
+        env.pop('PPP_SERVER', None)
+        os.environ.pop('PPP_SERVER', None)
+        os.environ.update(env)
+
+        from pypulseprofiles.core import pulse_store
+        from pypulseprofiles.control import control_request, socket_file
+        os.mkdir(os.path.join(tmp, ".config"))
+        for name in PROFILES:
+            pulse_store(PROFILES[name], name)
+
+        print("in-process:  %8.2f ms/switch" % run_apply(env, parsed.repeats))
+
+        server = subprocess.Popen([sys.executable, "-c",
+                                   "import pypulseprofiles.fake as f, pypulseprofiles.server as s; "
+                                   + "f.fake_server().latency = %f; s.main([])" % (parsed.latency / 1000.0)], env=env)
+        try:
+            while not os.path.exists(socket_file()):
+                time.sleep(0.01)
+            print("ppp-server:  %8.2f ms/switch" % run_apply(env, parsed.repeats))
+            times = []
+            for i in range(parsed.repeats):
+                start = time.perf_counter()
+                control_request("apply", config=sorted(PROFILES)[i % 2])
+                times.append((time.perf_counter() - start) * 1000.0)
+            print("request:     %8.2f ms/switch (without client startup)" % statistics.median(times))
+        finally:
+            control_request("shutdown")
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
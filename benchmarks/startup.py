@@ -0,0 +1,97 @@
+"""
+Measures the import time of the command-line tools with "python -X importtime"
+and checks it against the budgets. Also ensures that none of the heavy
+modules (pulsectl/libpulse, PyYAML) get imported at startup. Exits with 1
+if any of the budgets got exceeded.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+""" the sources of the library, for running the benchmark from a checkout without installing it. """
+
+sys.path.insert(0, SRC)
+os.environ["PYTHONPATH"] = os.pathsep.join([SRC] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if len(p) > 0])
+
+BUDGETS = {
+    "ppp-info": ("pypulseprofiles.info", 40.0),
+    "ppp-create": ("pypulseprofiles.create", 40.0),
+    "ppp-apply": ("pypulseprofiles.apply", 40.0),
+    "ppp-list": ("pypulseprofiles.list", 40.0),
+    "ppp-rm": ("pypulseprofiles.delete", 40.0),
+}
+""" the command -> (module, budget in msec) relation. """
+
+DEFERRED = ["pulsectl", "yaml"]
+""" the modules that must not get imported at startup. """
+
+
+def import_time(module):
+    """
+    Imports the module in a fresh interpreter and parses the output of -X importtime.
+
+    :param module: the module to import
+    :type module: str
+    :return: tuple of cumulative import time of the module in msec and the list of imported modules
+    :rtype: tuple
+    """
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    total = None
+    modules = []
+    for line in proc.stderr.split("\n"):
+        if not line.startswith("import time:") or ("|" not in line):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        modules.append(name)
+        if name == module:
+            total = int(parts[1].strip()) / 1000.0
+    return total, modules
+
+
+def main(args=None):
+    """
+    Runs the benchmark.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Checks the startup time of the command-line tools against their budgets.',
+        prog="startup")
+    parser.add_argument("--repeats", metavar="NUM", dest="repeats", type=int, default=10, help="the number of repetitions, the median gets used")
+    parser.add_argument("--scale", metavar="FACTOR", dest="scale", type=float, default=1.0, help="the factor to scale the budgets with, for slower/faster machines")
+    parsed = parser.parse_args(args=args)
+
+    failed = False
+    for command in sorted(BUDGETS):
+        module, budget = BUDGETS[command]
+        budget *= parsed.scale
+        times = []
+        modules = []
+        for i in range(parsed.repeats):
+            msec, modules = import_time(module)
+            times.append(msec)
+        msec = statistics.median(times)
+        heavy = [m for m in DEFERRED if m in modules]
+        ok = (msec <= budget) and (len(heavy) == 0)
+        failed = failed or not ok
+        print("%-10s %7.2f ms (budget %7.2f ms)%s  %s"
+              % (command, msec, budget, "" if len(heavy) == 0 else "  imports: " + ", ".join(heavy),
+                 "OK" if ok else "FAILED"))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,9 @@ setup(
         "pulsectl",
         "pyyaml",
     ],
+    extras_require={
+        "asyncio": ["pulsectl-asyncio"],
+    },
     entry_points={
         "console_scripts": [
             "ppp-info=pypulseprofiles.info:sys_main",
@@ -50,6 +53,9 @@ setup(
             "ppp-apply=pypulseprofiles.apply:sys_main",
             "ppp-list=pypulseprofiles.list:sys_main",
             "ppp-rm=pypulseprofiles.delete:sys_main",
+            "ppp-watch=pypulseprofiles.watch:sys_main",
+            "ppp-convert=pypulseprofiles.convert:sys_main",
+            "ppp-server=pypulseprofiles.server:sys_main",
         ]
     }
 )
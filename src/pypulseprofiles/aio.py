@@ -0,0 +1,322 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from pypulseprofiles.config import APPLICATION_NAME
+from pypulseprofiles.backend import current_backend
+from pypulseprofiles.snapshot import PulseSnapshot
+from pypulseprofiles.plan import pulse_plan, pulse_rollback_plan, pulse_report
+import pypulseprofiles.core as core
+
+
+def _pulsectl_async_instance():
+    """
+    Returns a (not yet connected) PulseAsync instance of pulsectl-asyncio.
+
+    :return: the instance
+    :rtype: pulsectl_asyncio.PulseAsync
+    """
+
+    try:
+        import pulsectl_asyncio
+    except ImportError as e:
+        raise ImportError("The asyncio API requires pulsectl-asyncio, "
+                          "install it with: pip install python-pulseaudio-profiles[asyncio]") from e
+    return pulsectl_asyncio.PulseAsync(APPLICATION_NAME)
+
+
+def _fake_async_instance():
+    """
+    Returns a (not yet connected) asynchronous connection to the in-process fake server.
+
+    :return: the instance
+    :rtype: FakePulseAsync
+    """
+
+    from pypulseprofiles.fake import fake_server, FakePulseAsync
+    return FakePulseAsync(fake_server())
+
+
+ASYNC_BACKENDS = {
+    "pulsectl": _pulsectl_async_instance,
+    "fake": _fake_async_instance,
+}
+""" the backends that support the asyncio API (name -> function returning a new, not yet connected instance). """
+
+
+def pulse_async_instance():
+    """
+    Returns a (not yet connected) PulseAsync instance, using the current backend (see set_backend).
+
+    :return: the instance
+    :rtype: pulsectl_asyncio.PulseAsync
+    """
+
+    name = current_backend()
+    if name not in ASYNC_BACKENDS:
+        raise Exception("Backend does not support the asyncio API: %s" % name)
+    return ASYNC_BACKENDS[name]()
+
+
+class PulseAsyncSession(object):
+    """
+    Asynchronous counterpart of PulseSession, sharing a single PulseAsync
+    connection across all the operations. Can be used as async context
+    manager, which closes the connection when exiting.
+    """
+
+    def __init__(self, pulse=None):
+        """
+        Initializes the session.
+
+        :param pulse: an existing (connected) connection to use instead of opening a new one (not closed by the session)
+        :type pulse: pulsectl_asyncio.PulseAsync
+        """
+
+        self._pulse = pulse
+        self._owner = pulse is None
+        self._snapshot = None
+        self._lock = None
+        self.connects = 0
+
+    async def pulse(self):
+        """
+        Returns the connection, connects if necessary.
+
+        :return: the connection
+        :rtype: pulsectl_asyncio.PulseAsync
+        """
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._pulse is None:
+                pulse = pulse_async_instance()
+                await pulse.connect()
+                self._pulse = pulse
+                self._owner = True
+                self.connects += 1
+        return self._pulse
+
+    async def snapshot(self):
+        """
+        Returns the snapshot of the server state, retrieves it if necessary.
+        Server info, sources and sinks are retrieved concurrently.
+
+        :return: the snapshot
+        :rtype: PulseSnapshot
+        """
+
+        if self._snapshot is None:
+            pulse = await self.pulse()
+            server, sources, sinks = await asyncio.gather(
+                pulse.server_info(), pulse.source_list(), pulse.sink_list())
+            self._snapshot = PulseSnapshot().update(server, sources, sinks)
+        return self._snapshot
+
+    async def refresh(self):
+        """
+        Retrieves the server state again.
+
+        :return: the updated snapshot
+        :rtype: PulseSnapshot
+        """
+
+        self._snapshot = None
+        return await self.snapshot()
+
+    def invalidate(self):
+        """
+        Discards the current snapshot, e.g., after the server state got modified.
+        """
+
+        self._snapshot = None
+
+    def close(self):
+        """
+        Closes the connection, if it was opened by the session.
+        """
+
+        if (self._pulse is not None) and self._owner:
+            self._pulse.close()
+        self._pulse = None
+        self._snapshot = None
+
+    async def __aenter__(self):
+        await self.pulse()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@asynccontextmanager
+async def pulse_async_session(session=None):
+    """
+    Async context manager that yields the provided session or, if None, a new
+    session that gets closed again on exit.
+
+    :param session: the session to use, creates a temporary one if None
+    :type session: PulseAsyncSession
+    :return: the session to use
+    :rtype: PulseAsyncSession
+    """
+
+    if session is None:
+        async with PulseAsyncSession() as session:
+            yield session
+    else:
+        yield session
+
+
+async def pulse_info(list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None, session=None):
+    """
+    Returns a dictionary with information about the setup.
+
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseAsyncSession
+    """
+
+    async with pulse_async_session(session) as session:
+        return core.pulse_snapshot_info(await session.snapshot(), list_sources=list_sources,
+                                        list_sinks=list_sinks, volume=volume, verbose=verbose, fields=fields)
+
+
+async def pulse_create_profile(source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False, session=None):
+    """
+    Creates and returns a profile.
+
+    :param source_name: the name or description of the pulseaudio source to use, uses current default if None
+    :type source_name: str
+    :param sink_name: the name or description of the pulseaudio sink to use, uses current default if None
+    :type sink_name: str
+    :param source_port: the name or description of the source port to use, uses first one of source if None
+    :type source_port: str
+    :param sink_port: the name or description of the sink port to use, uses first one of sink if None
+    :type sink_port: str
+    :param desc: the optional description for this profile
+    :type desc: str
+    :param volume: whether to include the volume (average and per channel), the channel map and the mute state
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseAsyncSession
+    """
+
+    async with pulse_async_session(session) as session:
+        return core.pulse_snapshot_profile(await session.snapshot(), source_name=source_name, sink_name=sink_name,
+                                           source_port=source_port, sink_port=sink_port, desc=desc, volume=volume)
+
+
+async def pulse_load(config):
+    """
+    Loads the specified configuration and returns the profile, without blocking the event loop.
+
+    :param config: the configuration name or file
+    :type config: str
+    :return: the profile
+    :rtype: dictionary
+    """
+
+    return await asyncio.get_running_loop().run_in_executor(None, core.pulse_load, config)
+
+
+async def _submit(pulse, operation):
+    """
+    Performs the operation.
+
+    :param pulse: the connection to use
+    :type pulse: pulsectl_asyncio.PulseAsync
+    :param operation: the operation to perform
+    :type operation: PulseOperation
+    """
+
+    start = time.perf_counter()
+    if operation.action == "default":
+        await pulse.default_set(operation.device)
+    elif operation.action == "port":
+        await pulse.port_set(operation.device, operation.value)
+    elif operation.action == "volume":
+        await pulse.volume_set(operation.device, operation.volume_info())
+    elif operation.action == "mute":
+        await pulse.mute(operation.device, operation.value)
+    else:
+        raise Exception("Unknown action: %s" % operation.action)
+    operation.time = time.perf_counter() - start
+
+
+async def pulse_apply_profile(profile, volume=False, session=None, rollback=True):
+    """
+    Applies the profile dictionary. Only the changes that are necessary get
+    sent to the server, all of them concurrently. If any of them fails, the
+    previous state only gets restored once all of them have completed. Card
+    sections are not supported (see pypulseprofiles.core.pulse_apply_profile).
+
+    :param profile: the dictionary with source/sink information.
+    :type profile: dict
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseAsyncSession
+    :param rollback: whether to restore the previous state if applying fails
+    :type rollback: bool
+    :return: the report with the operations and their timings, see pypulseprofiles.plan.pulse_execute
+    :rtype: dict
+    """
+
+    if "card" in profile:
+        raise Exception("Profiles with 'card' section are not supported by the asyncio API!")
+
+    async with pulse_async_session(session) as session:
+        snapshot = await session.snapshot()
+        operations = pulse_plan(profile, snapshot, volume=volume)
+        restore = pulse_rollback_plan(operations, snapshot) if rollback else []
+        pulse = await session.pulse()
+        start = time.perf_counter()
+        try:
+            # the operations still in flight must not overlap with the rollback, i.e., wait for all of them
+            results = await asyncio.gather(*[_submit(pulse, op) for op in operations if not op.noop],
+                                           return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if len(errors) > 0:
+                e = errors[0]
+                if len(restore) == 0:
+                    raise e
+                rollback_start = time.perf_counter()
+                results = await asyncio.gather(*[_submit(pulse, op) for op in restore], return_exceptions=True)
+                rollback_errors = [r for r in results if isinstance(r, BaseException)]
+                if len(rollback_errors) > 0:
+                    raise Exception("Failed to apply profile (%s), failed to restore previous state as well: %s"
+                                    % (str(e), str(rollback_errors[0]))) from e
+                raise Exception("Failed to apply profile, restored previous state (%.2f ms): %s"
+                                % ((time.perf_counter() - rollback_start) * 1000.0, str(e))) from e
+        finally:
+            session.invalidate()
+
+    return pulse_report(operations, 0.0, time.perf_counter() - start)
+
+
+async def pulse_apply(config, volume=False, session=None):
+    """
+    Applies the specified configuration.
+
+    :param config: the configuration name or file
+    :type config: str
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseAsyncSession
+    :return: the report with the operations and their timings
+    :rtype: dict
+    """
+
+    profile = await pulse_load(config)
+    return await pulse_apply_profile(profile, volume=volume, session=session)
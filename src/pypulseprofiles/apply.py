@@ -1,6 +1,34 @@
 import argparse
 import traceback
-from pypulseprofiles.core import pulse_apply
+from pypulseprofiles.core import pulse_apply, pulse_apply_auto
+from pypulseprofiles.control import control_request, control_config, ControlUnavailable
+from pypulseprofiles.metrics import cli_timings
+
+NOOP_SUFFIX = " (no-op)"
+""" the suffix of the descriptions of operations that don't change anything. """
+
+
+def output_plan(report, indent=""):
+    """
+    Outputs the planned operations of a dry run (see pulse_plan_report), in
+    the order they would get executed, and the expected server round trips.
+
+    :param report: the report of the dry run
+    :type report: dict
+    :param indent: the prefix for the lines
+    :type indent: str
+    """
+
+    for step in report['operations']:
+        operation = step['operation']
+        if step['noop'] and operation.endswith(NOOP_SUFFIX):
+            operation = operation[:-len(NOOP_SUFFIX)]
+        print("%s%-7s %s" % (indent, "no-op" if step['noop'] else "change", operation))
+    if report.get('deferred', False):
+        print("%s(source/sink operations get planned after activating the card profile)" % indent)
+    round_trips = report['round_trips']
+    print("%s%d change(s), %d round trip(s): %d snapshot + %d operations"
+          % (indent, report['changes'], round_trips['total'], round_trips['snapshot'], round_trips['operations']))
 
 
 def main(args=None):
@@ -15,10 +43,62 @@ def main(args=None):
     parser = argparse.ArgumentParser(
         description='Applies a PulseAudio profile in YAML format.',
         prog="ppp-apply")
-    parser.add_argument("--config", metavar="NAME_OR_FILE", dest="config", required=True, help="the file (or config name) to load the profile from, outputs it to stdout if not provided")
-    parser.add_argument("--volume", action="store_true", dest="volume", help="whether to set the (average) volume across all channels")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--config", metavar="NAME_OR_FILE", dest="config", default=None, help="the file (or config name) to load the profile from, outputs it to stdout if not provided")
+    group.add_argument("--auto", action="store_true", dest="auto", help="applies the stored profile that matches the available devices and ports best")
+    parser.add_argument("--volume", action="store_true", dest="volume", help="whether to set the volume (per channel if stored, otherwise the average across all channels) and the mute state")
+    parser.add_argument("--move", action="store_true", dest="move", help="whether to move the running playback/recording streams to the new default sink/source")
+    parser.add_argument("--move_apps", metavar="PATTERN", dest="move_apps", nargs="+", default=None, help="the glob patterns for the application names or binaries of the streams to move (e.g., firefox or 'Zoom*'), moves all streams if not provided; implies --move")
+    parser.add_argument("--dry_run", action="store_true", dest="dry_run", help="only outputs the operations that applying the profile would perform (no-op or change, in order) and the expected number of server round trips, without changing anything")
+    parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to output the performed operations and their timings")
+    parser.add_argument("--server", metavar="SERVER", dest="servers", nargs="+", default=None, help="the PulseAudio servers to apply the profile to concurrently (e.g., unix:/path/to/socket or tcp:host), outputs the time and outcome per server")
+    parser.add_argument("--workers", metavar="NUM", dest="workers", type=int, default=None, help="the maximum number of servers to apply the profile to at the same time, all at once if not provided")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
     parsed = parser.parse_args(args=args)
-    pulse_apply(config=parsed.config, volume=parsed.volume)
+    with cli_timings(parsed.timings):
+        options = dict(volume=parsed.volume, move=parsed.move or (parsed.move_apps is not None), move_apps=parsed.move_apps,
+                       dry_run=parsed.dry_run)
+        if parsed.servers is not None:
+            from pypulseprofiles.multi import pulse_apply_servers
+            result = pulse_apply_servers(parsed.config, parsed.servers, workers=parsed.workers, **options)
+            for outcome in result['servers']:
+                if outcome['success']:
+                    status = "OK" if not parsed.auto else outcome['result']['profile']
+                else:
+                    status = outcome['error']
+                print("%8.2f ms  %s: %s" % (outcome['time'] * 1000.0, outcome['server'], status))
+                if parsed.dry_run and outcome['success']:
+                    output_plan(outcome['result'], indent="            ")
+                elif parsed.verbose and outcome['success']:
+                    for step in outcome['result']['operations']:
+                        print("%8.2f ms    %s" % (step['time'] * 1000.0, step['operation']))
+            print("%8.2f ms  total" % (result['total'] * 1000.0))
+            if result['failed'] > 0:
+                raise Exception("Failed to apply profile to %d of %d server(s)" % (result['failed'], len(result['servers'])))
+            return
+        if parsed.auto:
+            try:
+                report = control_request("apply_auto", **options)
+            except ControlUnavailable:
+                report = pulse_apply_auto(**options)
+        else:
+            try:
+                report = control_request("apply", config=control_config(parsed.config), **options)
+            except ControlUnavailable:
+                report = pulse_apply(config=parsed.config, **options)
+        if parsed.dry_run:
+            if parsed.auto:
+                print("profile: %s" % report['profile'])
+            output_plan(report)
+        elif parsed.verbose:
+            if parsed.auto:
+                print("profile: %s" % report['profile'])
+            for step in report['operations']:
+                print("%8.2f ms  %s" % (step['time'] * 1000.0, step['operation']))
+            if "devices" in report:
+                print("%8.2f ms  devices" % (report['devices'] * 1000.0))
+            print("%8.2f ms  wait" % (report['wait'] * 1000.0))
+            print("%8.2f ms  total" % (report['total'] * 1000.0))
 
 
 def sys_main():
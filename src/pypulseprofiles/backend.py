@@ -0,0 +1,160 @@
+import os
+from pypulseprofiles.config import APPLICATION_NAME
+from pypulseprofiles.metrics import timer, instrument_connection
+
+BACKEND_ENV = "PPP_BACKEND"
+""" the environment variable for selecting the backend. """
+
+DEFAULT_BACKEND = "pulsectl"
+""" the default backend. """
+
+BACKENDS = dict()
+""" the registered backends (name -> function returning a new connection for a server). """
+
+_backend = None
+""" the backend selected via set_backend(). """
+
+
+def register_backend(name, factory):
+    """
+    Registers a backend. The connections that the factory returns must offer
+    the subset of the pulsectl.Pulse API used by this library (server_info,
+    source_list, sink_list, card_list, default_set, port_set, volume_set, mute,
+    card_profile_set, close, connected and the event methods).
+
+    :param name: the name of the backend
+    :type name: str
+    :param factory: the function that returns a new connection, with the server to connect to (None for the default one) as argument
+    :type factory: function
+    """
+
+    BACKENDS[name] = factory
+
+
+def backend_names():
+    """
+    Returns the names of the registered backends.
+
+    :return: the sorted list of names
+    :rtype: list
+    """
+
+    return sorted(BACKENDS)
+
+
+def set_backend(name):
+    """
+    Selects the backend to use for new connections.
+
+    :param name: the name of the backend, None to fall back on $PPP_BACKEND or the default backend
+    :type name: str
+    """
+
+    global _backend
+
+    if (name is not None) and (name not in BACKENDS):
+        raise Exception("Unknown backend: %s" % name)
+    _backend = name
+
+
+def current_backend():
+    """
+    Returns the name of the backend to use: the one selected via set_backend(),
+    the one specified by the $PPP_BACKEND environment variable or the default one.
+
+    :return: the name of the backend
+    :rtype: str
+    """
+
+    if _backend is not None:
+        return _backend
+    result = os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+    if result not in BACKENDS:
+        raise Exception("Unknown backend in $%s: %s" % (BACKEND_ENV, result))
+    return result
+
+
+def backend_instance(server=None):
+    """
+    Opens a new connection with the current backend. If the metrics are
+    enabled, the connection gets instrumented (see pypulseprofiles.metrics).
+
+    :param server: the server to connect to (e.g., unix:/path/to/socket or tcp:host), None for the default one
+    :type server: str
+    :return: the connection
+    :rtype: pulsectl.Pulse
+    """
+
+    name = current_backend()
+    with timer("connect", name):
+        pulse = BACKENDS[name](server)
+    return instrument_connection(pulse)
+
+
+def loop_stop():
+    """
+    Returns the exception that event callbacks raise for stopping event_listen().
+
+    :return: pulsectl.PulseLoopStop if available, otherwise FakeLoopStop
+    :rtype: type
+    """
+
+    try:
+        import pulsectl
+        return pulsectl.PulseLoopStop
+    except ImportError:
+        from pypulseprofiles.fake import FakeLoopStop
+        return FakeLoopStop
+
+
+def connection_errors():
+    """
+    Returns the exceptions that connections raise for failed calls and for
+    lost connections, the ones of pulsectl (if available) and of the fake backend.
+
+    :return: tuple of the tuple of exceptions for errors and the tuple of exceptions for lost connections
+    :rtype: tuple
+    """
+
+    from pypulseprofiles.fake import FakePulseError, FakePulseDisconnected
+    errors = [FakePulseError]
+    disconnected = [FakePulseDisconnected]
+    try:
+        import pulsectl
+        errors.append(pulsectl.PulseError)
+        disconnected.append(pulsectl.PulseDisconnected)
+    except ImportError:
+        pass
+    return tuple(errors), tuple(disconnected)
+
+
+def _pulsectl_instance(server=None):
+    """
+    Connects to the PulseAudio server via pulsectl.
+
+    :param server: the server to connect to, None for the default one ($PULSE_SERVER or local)
+    :type server: str
+    :return: the connection
+    :rtype: pulsectl.Pulse
+    """
+
+    import pulsectl
+    return pulsectl.Pulse(APPLICATION_NAME, server=server)
+
+
+def _fake_instance(server=None):
+    """
+    Connects to the in-process fake server (see pypulseprofiles.fake).
+
+    :param server: the name of the fake server, None for the default one
+    :type server: str
+    :return: the connection
+    :rtype: FakePulse
+    """
+
+    from pypulseprofiles.fake import fake_server
+    return fake_server(server).connect()
+
+
+register_backend("pulsectl", _pulsectl_instance)
+register_backend("fake", _fake_instance)
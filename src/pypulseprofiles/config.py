@@ -1,4 +1,5 @@
 import os
+from pypulseprofiles.storage import format_extensions
 
 APPLICATION_NAME = "python-pulseaudio-profiles"
 """ the name of the application and pulseaudio client. """
@@ -35,7 +36,7 @@ def expand_config(file_or_name):
     """
     Expands the configuration file or name.
 
-    :param file_or_name: the file or name (beneath $HOME/.config/python-pulseaudio-profiles)
+    :param file_or_name: the file or name (beneath $HOME/.config/python-pulseaudio-profiles), for names the existing file in any of the supported formats is used (YAML if none exists yet)
     :type file_or_name: str
     :return: the absolute file name
     :rtype: str
@@ -44,11 +45,78 @@ def expand_config(file_or_name):
     root, ext = os.path.splitext(file_or_name)
     head, tail = os.path.split(file_or_name)
     if (ext == "") and (head == ""):
-        return os.path.join(config_dir(), tail + ".yaml")
+        files = config_files(tail)
+        if len(files) > 0:
+            return files[0]
+        return os.path.join(config_dir(), tail + format_extensions()[0])
     else:
         return os.path.abspath(os.path.expanduser(file_or_name))
 
 
+def config_files(name):
+    """
+    Returns the existing files for the config name, in any of the supported formats.
+
+    :param name: the config name
+    :type name: str
+    :return: the files, in order of precedence of their formats
+    :rtype: list
+    """
+
+    result = []
+    for ext in format_extensions():
+        f = os.path.join(config_dir(), name + ext)
+        if os.path.exists(f):
+            result.append(f)
+    return result
+
+
+def config_name(config_filename):
+    """
+    Returns the config name for the file in the config directory.
+
+    :param config_filename: the config file
+    :type config_filename: str
+    :return: the config name
+    :rtype: str
+    """
+
+    return os.path.splitext(os.path.basename(config_filename))[0]
+
+
+def derive_config_name(*parts):
+    """
+    Derives a config name from descriptions, e.g., of devices and ports: the
+    parts are lower-cased, runs of characters other than letters and digits
+    get replaced by '-' and the parts get joined by '_'. A part can also be
+    a tuple of alternatives (e.g., description, name and index of a device),
+    the first one that leaves anything after the replacement gets used, e.g.,
+    for descriptions that only consist of non-ASCII characters or punctuation.
+
+    :param parts: the descriptions (or tuples of alternatives) to derive the name from, None entries are skipped
+    :type parts: str or tuple
+    :return: the config name
+    :rtype: str
+    :raises Exception: if no name can be derived from the parts
+    """
+
+    import re
+
+    result = []
+    for part in parts:
+        alternatives = part if isinstance(part, tuple) else (part,)
+        for alternative in alternatives:
+            if alternative is None:
+                continue
+            alternative = re.sub(r"[^a-z0-9]+", "-", str(alternative).lower()).strip("-")
+            if len(alternative) > 0:
+                result.append(alternative)
+                break
+    if len(result) == 0:
+        raise Exception("Cannot derive a config name from: %s" % ", ".join([str(p) for p in parts]))
+    return "_".join(result)
+
+
 def is_config_name(file_or_name):
     """
     Checks whether the string represents a file or just a config name.
@@ -73,16 +141,16 @@ def list_configs():
     :rtype: list
     """
 
-    result = []
-
     if not os.path.exists(config_dir()):
         init_config_dir()
 
+    exts = tuple(format_extensions())
+    names = set()
     for f in os.listdir(config_dir()):
-        if f.endswith(".yaml"):
-            result.append(os.path.splitext(f)[0])
+        if f.endswith(exts) and not f.startswith("."):
+            names.add(os.path.splitext(f)[0])
 
-    result.sort()
+    result = sorted(names)
 
     return result
 
@@ -96,7 +164,10 @@ def delete_config(config):
     """
 
     if is_config_name(config):
-        fname = expand_config(config)
-        os.remove(fname)
+        files = config_files(config_name(expand_config(config)))
+        if len(files) == 0:
+            os.remove(expand_config(config))
+        for fname in files:
+            os.remove(fname)
     else:
         raise Exception("Unknown profile: %s" % config)
@@ -0,0 +1,472 @@
+import itertools
+import os
+import time
+from pypulseprofiles.config import APPLICATION_NAME, is_config_name, config_dir
+
+SERVER_ENV = "PPP_SERVER"
+""" the environment variable for overriding the socket file of the control server (empty string disables it). """
+
+EVENT_MASKS = ["sink", "source", "server", "card"]
+""" the event facilities that invalidate the snapshot of the control server. """
+
+CONTROL_TIMEOUT = 30.0
+""" the time in seconds to wait for the control server to respond (switching card profiles can take a while). """
+
+CONTEXT_COMMANDS = ["info", "info_stream", "create_profile", "create_all", "apply", "apply_auto"]
+""" the commands that depend on the PulseAudio server, the backend and the config dir. """
+
+MUTATING_COMMANDS = ["apply", "apply_auto"]
+""" the commands that change the server state, get planned against a freshly retrieved state. """
+
+
+class ControlUnavailable(Exception):
+    """
+    Raised if the control server is not running.
+    """
+    pass
+
+
+def socket_dir():
+    """
+    Returns the private directory (only accessible by the user) for the socket
+    of the control server: python-pulseaudio-profiles in the user runtime dir
+    ($XDG_RUNTIME_DIR), falls back on python-pulseaudio-profiles-<uid> in the temp dir.
+
+    :return: the directory
+    :rtype: str
+    """
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if (runtime_dir is None) or (not os.path.isdir(runtime_dir)):
+        import tempfile
+        return os.path.join(tempfile.gettempdir(), "%s-%d" % (APPLICATION_NAME, os.getuid()))
+    return os.path.join(runtime_dir, APPLICATION_NAME)
+
+
+def socket_file():
+    """
+    Returns the Unix domain socket of the control server: $PPP_SERVER if set,
+    otherwise control.sock in socket_dir().
+
+    :return: the socket file, None if disabled
+    :rtype: str
+    """
+
+    if SERVER_ENV in os.environ:
+        result = os.environ[SERVER_ENV]
+        return result if len(result) > 0 else None
+    return os.path.join(socket_dir(), "control.sock")
+
+
+def _private_dir(dirname):
+    """
+    Creates the directory with mode 0700 if necessary and ensures that it is
+    a directory (not a symlink) owned by the user and not accessible by others.
+
+    :param dirname: the directory
+    :type dirname: str
+    """
+
+    import stat
+
+    if not os.path.lexists(dirname):
+        os.mkdir(dirname, 0o700)
+    st = os.lstat(dirname)
+    if not stat.S_ISDIR(st.st_mode):
+        raise Exception("Not a directory: %s" % dirname)
+    if st.st_uid != os.getuid():
+        raise Exception("Directory not owned by current user: %s" % dirname)
+    if (st.st_mode & 0o077) != 0:
+        raise Exception("Directory accessible by other users (mode %o): %s" % (stat.S_IMODE(st.st_mode), dirname))
+
+
+def control_context():
+    """
+    Returns what the commands depend on besides their arguments: the PulseAudio
+    server ($PULSE_SERVER), the backend and the config dir. The control server
+    only executes requests with the same context as its own.
+
+    :return: the dictionary with pulse_server, backend and config_dir
+    :rtype: dict
+    """
+
+    from pypulseprofiles.backend import current_backend
+    return {
+        'pulse_server': os.environ.get("PULSE_SERVER"),
+        'backend': current_backend(),
+        'config_dir': config_dir(),
+    }
+
+
+def _control_connect(socket_filename=None):
+    """
+    Connects to the control server. Only connects to sockets owned by the user.
+    Waits at most CONTROL_TIMEOUT for connecting and for every response.
+
+    :param socket_filename: the socket to connect to, uses socket_file() if None
+    :type socket_filename: str
+    :return: the connected socket
+    :rtype: socket.socket
+    """
+
+    if socket_filename is None:
+        socket_filename = socket_file()
+    if (socket_filename is None) or (not os.path.exists(socket_filename)):
+        raise ControlUnavailable("Control server not running")
+    if os.stat(socket_filename).st_uid != os.getuid():
+        raise ControlUnavailable("Control server socket not owned by current user: %s" % socket_filename)
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONTROL_TIMEOUT)
+    try:
+        sock.connect(socket_filename)
+    except OSError as e:
+        sock.close()
+        raise ControlUnavailable("Failed to connect to control server: %s" % str(e))
+    return sock
+
+
+def _control_responses(sock, command, args):
+    """
+    Sends the request (along with the context) and yields the responses (one
+    JSON object per line).
+
+    :param sock: the connected socket, gets closed at the end
+    :type sock: socket.socket
+    :param command: the command to execute
+    :type command: str
+    :param args: the arguments for the command
+    :type args: dict
+    :return: generator of the responses
+    :rtype: generator
+    :raises ControlUnavailable: if the server rejected the context or did not respond in time
+    """
+
+    import json
+    import socket
+
+    try:
+        request = {'command': command, 'args': args, 'context': control_context()}
+        with sock.makefile("r", encoding="utf-8") as reader:
+            try:
+                sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+                line = reader.readline()
+            except socket.timeout:
+                raise ControlUnavailable("Control server did not respond within %.1f s" % CONTROL_TIMEOUT)
+            while len(line) > 0:
+                response = json.loads(line)
+                if 'unavailable' in response:
+                    raise ControlUnavailable(response['unavailable'])
+                if 'error' in response:
+                    raise Exception(response['error'])
+                yield response
+                line = reader.readline()
+    finally:
+        sock.close()
+
+
+def control_request(command, socket_filename=None, **kwargs):
+    """
+    Executes the command on the control server.
+
+    :param command: the command to execute (ping|info|create_profile|create_all|apply|apply_auto|metrics|shutdown)
+    :type command: str
+    :param socket_filename: the socket to connect to, uses socket_file() if None
+    :type socket_filename: str
+    :return: the result of the command
+    :raises ControlUnavailable: if the server is not running
+    """
+
+    from pypulseprofiles.metrics import timer
+    sock = _control_connect(socket_filename)
+    with timer("request", command):
+        for response in _control_responses(sock, command, kwargs):
+            if 'result' in response:
+                return response['result']
+    raise Exception("No result received from control server for command: %s" % command)
+
+
+def control_stream(command, socket_filename=None, **kwargs):
+    """
+    Executes the command on the control server and returns a generator for the
+    entries that the server sends (as soon as they arrive).
+
+    :param command: the command to execute (info_stream)
+    :type command: str
+    :param socket_filename: the socket to connect to, uses socket_file() if None
+    :type socket_filename: str
+    :return: generator of the entries
+    :rtype: generator
+    :raises ControlUnavailable: if the server is not running
+    """
+
+    sock = _control_connect(socket_filename)
+    responses = _control_responses(sock, command, kwargs)
+    # the first response tells whether the server executes the command at all
+    first = next(responses, None)
+
+    def entries():
+        if first is None:
+            return
+        for response in itertools.chain([first], responses):
+            if 'entry' in response:
+                yield response['entry']
+
+    return entries()
+
+
+def control_config(config):
+    """
+    Turns the configuration into one that the control server can resolve,
+    i.e., files get turned into absolute paths.
+
+    :param config: the configuration name or file
+    :type config: str
+    :return: the configuration name or absolute file
+    :rtype: str
+    """
+
+    if is_config_name(config):
+        return config
+    return os.path.abspath(config)
+
+
+class PulseControlServer(object):
+    """
+    Persistent server that executes the commands of the command-line tools
+    over a Unix domain socket. Keeps a warm connection, the snapshot of the
+    server state and the parsed profiles (via the profile index) in memory.
+    A second connection listens for events in the background and marks the
+    snapshot as outdated whenever devices, defaults, ports or volumes change.
+    Requests are handled one after the other.
+    """
+
+    def __init__(self, socket_filename=None, verbose=False):
+        """
+        Initializes the server.
+
+        :param socket_filename: the socket to listen on, uses socket_file() if None
+        :type socket_filename: str
+        :param verbose: whether to output the handled requests and their timings
+        :type verbose: bool
+        """
+
+        import threading
+
+        if socket_filename is None:
+            socket_filename = socket_file()
+        if socket_filename is None:
+            raise Exception("Control server disabled via empty $%s" % SERVER_ENV)
+        self.socket_filename = socket_filename
+        self.context = control_context()
+        self.verbose = verbose
+        self.session = None
+        self.requests = 0
+        self._server = None
+        self._events = None
+        self._dirty = threading.Event()
+        self._dirty.set()
+        self._thread = None
+        self._running = False
+
+    def _on_event(self, event):
+        """
+        The event callback, marks the snapshot as outdated.
+
+        :param event: the event
+        """
+
+        self._dirty.set()
+
+    def _listen(self):
+        """
+        Listens for events on a separate connection, reconnecting if necessary.
+        """
+
+        from pypulseprofiles.session import pulse_instance
+
+        while self._running:
+            try:
+                self._events = pulse_instance()
+                self._events.event_mask_set(*EVENT_MASKS)
+                self._events.event_callback_set(self._on_event)
+                self._dirty.set()
+                while self._running:
+                    self._events.event_listen()
+            except Exception as e:
+                if self.verbose and self._running:
+                    print("Event connection failed (%s), reconnecting" % str(e))
+                self._dirty.set()
+                time.sleep(1.0)
+            finally:
+                if self._events is not None:
+                    self._events.close()
+                    self._events = None
+
+    def _session(self, refresh=False):
+        """
+        Returns the session, discarding the snapshot if it is outdated. The
+        events only arrive asynchronously, i.e., the snapshot may not reflect
+        a device that just got plugged in yet, hence commands that change the
+        server state should refresh it.
+
+        :param refresh: whether to discard the snapshot regardless
+        :type refresh: bool
+        :return: the session
+        :rtype: PulseSession
+        """
+
+        from pypulseprofiles.session import PulseSession
+
+        if self.session is None:
+            self.session = PulseSession()
+        if refresh or self._dirty.is_set():
+            self._dirty.clear()
+            self.session.invalidate()
+        return self.session
+
+    def execute(self, command, args, write):
+        """
+        Executes the command.
+
+        :param command: the command to execute
+        :type command: str
+        :param args: the arguments of the command
+        :type args: dict
+        :param write: the function for sending a response object
+        :type write: function
+        """
+
+        from pypulseprofiles import core
+
+        if command in MUTATING_COMMANDS:
+            self._session(refresh=True)
+        if command == "ping":
+            write({'result': {'pid': os.getpid(), 'requests': self.requests}})
+        elif command == "info":
+            write({'result': core.pulse_info(session=self._session(), **args)})
+        elif command == "info_stream":
+            for entry in core.pulse_info_stream(session=self._session(), **args):
+                write({'entry': entry})
+            write({'result': None})
+        elif command == "create_profile":
+            write({'result': core.pulse_create_profile(session=self._session(), **args)})
+        elif command == "create_all":
+            write({'result': core.pulse_create_all(session=self._session(), **args)})
+        elif command == "apply":
+            write({'result': core.pulse_apply(session=self._session(), **args)})
+        elif command == "apply_auto":
+            write({'result': core.pulse_apply_auto(session=self._session(), **args)})
+        elif command == "metrics":
+            from pypulseprofiles.metrics import metrics_dumps
+            write({'result': metrics_dumps(**args)})
+        elif command == "shutdown":
+            write({'result': None})
+            self.shutdown()
+        else:
+            raise Exception("Unknown command: %s" % command)
+
+    def handle(self, reader, writer):
+        """
+        Handles a single request.
+
+        :param reader: the stream to read the request from
+        :param writer: the stream to write the responses to
+        """
+
+        import json
+
+        start = time.perf_counter()
+        command = None
+
+        def write(response):
+            writer.write((json.dumps(response) + "\n").encode("utf-8"))
+            writer.flush()
+
+        try:
+            request = json.loads(reader.readline().decode("utf-8"))
+            command = request['command']
+            if (command in CONTEXT_COMMANDS) and (request.get('context') != self.context):
+                # e.g., a different PulseAudio server or config dir, the client executes it in-process
+                write({'unavailable': "Control server runs with a different context: %s" % self.context})
+            else:
+                self.execute(command, request.get('args', dict()), write)
+        except Exception as e:
+            if (self.session is not None) and not self.session.connected:
+                self.session.close()
+            write({'error': str(e)})
+        self.requests += 1
+        if self.verbose:
+            print("%-15s %8.2f ms" % (command, (time.perf_counter() - start) * 1000.0))
+
+    def _check_socket(self):
+        """
+        Ensures that no other server is running and removes a stale socket file.
+        """
+
+        if not os.path.exists(self.socket_filename):
+            return
+        if os.stat(self.socket_filename).st_uid != os.getuid():
+            raise Exception("Socket file not owned by current user: %s" % self.socket_filename)
+        try:
+            control_request("ping", socket_filename=self.socket_filename)
+        except ControlUnavailable:
+            os.remove(self.socket_filename)
+            return
+        raise Exception("Control server already running: %s" % self.socket_filename)
+
+    def run(self):
+        """
+        Listens on the socket and handles the requests until shutdown() gets called.
+        """
+
+        import socketserver
+        import threading
+
+        control = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                control.handle(self.rfile, self.wfile)
+
+        if os.path.dirname(os.path.abspath(self.socket_filename)) == socket_dir():
+            _private_dir(socket_dir())
+        self._check_socket()
+        self._running = True
+        # the socket must not be accessible by others at any point, i.e., not only after a chmod
+        umask = os.umask(0o077)
+        try:
+            self._server = socketserver.UnixStreamServer(self.socket_filename, Handler)
+        finally:
+            os.umask(umask)
+        try:
+            self._thread = threading.Thread(target=self._listen, daemon=True)
+            self._thread.start()
+            # connect and retrieve the server state ahead of the first request
+            self._session().snapshot()
+            if self.verbose:
+                print("Listening on: %s" % self.socket_filename)
+            self._server.serve_forever()
+        finally:
+            self._running = False
+            self._server.server_close()
+            if os.path.exists(self.socket_filename):
+                os.remove(self.socket_filename)
+            if self._events is not None:
+                if hasattr(self._events, "event_listen_stop"):
+                    self._events.event_listen_stop()
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def shutdown(self):
+        """
+        Stops the server, can be called from a request or another thread.
+        """
+
+        import threading
+
+        self._running = False
+        if self._server is not None:
+            # serve_forever() must not get shut down from the thread that runs it
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
@@ -0,0 +1,48 @@
+import argparse
+import traceback
+from pypulseprofiles.core import pulse_convert, format_names, APPLICATION_NAME
+from pypulseprofiles.metrics import cli_timings
+
+
+def main(args=None):
+    """
+    Converts the profiles to another format.
+    Use -h to see all options.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Converts the profiles stored in %s to another format.' % ("$HOME/.config/" + APPLICATION_NAME),
+        prog="ppp-convert")
+    parser.add_argument("--format", dest="format", choices=format_names(), required=True, help="the format to convert the profiles to")
+    parser.add_argument("--config", metavar="NAME", dest="config", default=None, nargs="+", help="the config name(s) to convert, converts all if not provided")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
+    parsed = parser.parse_args(args=args)
+    with cli_timings(parsed.timings):
+        pulse_convert(parsed.format, configs=parsed.config)
+
+
+def sys_main():
+    """
+    Runs the main function using the system cli arguments, and
+    returns a system error code.
+
+    :return: 0 for success, 1 for failure.
+    :rtype: int
+    """
+
+    try:
+        main()
+        return 0
+    except Exception:
+        print(traceback.format_exc())
+        return 1
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception:
+        print(traceback.format_exc())
@@ -1,22 +1,49 @@
 import os
-import pulsectl
-import yaml
+import time
 from pypulseprofiles.config import *
+from pypulseprofiles.storage import *
+from pypulseprofiles.output import *
+from pypulseprofiles.backend import *
+from pypulseprofiles.session import *
+from pypulseprofiles.plan import *
+from pypulseprofiles.index import *
+from pypulseprofiles.selection import *
+from pypulseprofiles.records import *
 
+INFO_FIELDS = ["device", "port", "volume"]
+""" the fields that can be selected for the source/sink information. """
 
-def pulse_instance():
+CARD_TIMEOUT = 10.0
+""" the time in seconds to wait for the source/sink to appear after activating a card profile. """
+
+
+def info_fields(fields=None, volume=False):
     """
-    Returns an Pulse instance.
+    Determines the fields to output for sources/sinks.
 
-    :return: the instance
-    :rtype: pulsectl.Pulse
+    :param fields: the selected fields (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param volume: whether to include the volume by default
+    :type volume: bool
+    :return: the set of fields
+    :rtype: set
     """
-    return pulsectl.Pulse(APPLICATION_NAME)
+
+    if fields is None:
+        result = {"device", "port"}
+        if volume:
+            result.add("volume")
+        return result
+    for field in fields:
+        if field not in INFO_FIELDS:
+            raise Exception("Unknown field '%s', available: %s" % (field, ", ".join(INFO_FIELDS)))
+    return set(fields)
 
 
-def pulse_source_info(source, volume=False, verbose=False):
+def pulse_source_info(source, volume=False, verbose=False, fields=None):
     """
-    Generates a dictionary from the PulseSourceInfo object.
+    Generates a dictionary from the PulseSourceInfo object (see DeviceRecord).
+    Only the attributes of the selected fields get accessed.
 
     :param source: the PulseSourceInfo object to use
     :type source: pulsectl.PulseSourceInfo
@@ -24,35 +51,20 @@ def pulse_source_info(source, volume=False, verbose=False):
     :type volume: bool
     :param verbose: whether to generate a verbose result
     :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), uses device and port (and volume if requested) if None
+    :type fields: list
     :return: dictionary of info
     :rtype: dict
     """
 
-    result = {}
+    fields = info_fields(fields, volume)
+    return device_record(source, fields).info(fields, verbose)
 
-    if verbose:
-        result['device'] = {}
-        result['device']['name'] = source.name
-        result['device']['description'] = source.description
-        if volume:
-            result['device']['volume'] = source.volume.value_flat
-        if source.port_active is not None:
-            result['port'] = {}
-            result['port']['name'] = source.port_active.name
-            result['port']['description'] = source.port_active.description
-    else:
-        result['device'] = source.description
-        if source.port_active is not None:
-            result['port'] = source.port_active.description
-        if volume:
-            result['volume'] = source.volume.value_flat
-
-    return result
 
-
-def pulse_sink_info(sink, volume=False, verbose=False):
+def pulse_sink_info(sink, volume=False, verbose=False, fields=None):
     """
-    Generates a dictionary from the PulseSinkInfo object.
+    Generates a dictionary from the PulseSinkInfo object (see DeviceRecord).
+    Only the attributes of the selected fields get accessed.
 
     :param sink: the PulseSinkInfo object to use
     :type sink: pulsectl.PulseSinkInfo
@@ -60,33 +72,66 @@ def pulse_sink_info(sink, volume=False, verbose=False):
     :type volume: bool
     :param verbose: whether to generate a verbose result
     :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), uses device and port (and volume if requested) if None
+    :type fields: list
     :return: dictionary of info
     :rtype: dict
     """
 
-    result = {}
+    fields = info_fields(fields, volume)
+    return device_record(sink, fields).info(fields, verbose)
 
-    if verbose:
-        result['device'] = {}
-        result['device']['name'] = sink.name
-        result['device']['description'] = sink.description
-        if volume:
-            result['device']['volume'] = sink.volume.value_flat
-        if sink.port_active is not None:
-            result['port'] = {}
-            result['port']['name'] = sink.port_active.name
-            result['port']['description'] = sink.port_active.description
-    else:
-        result['device'] = sink.description
-        if sink.port_active is not None:
-            result['port'] = sink.port_active.description
-        if volume:
-            result['volume'] = sink.volume.value_flat
 
-    return result
+def pulse_snapshot_entries(snapshot, list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None):
+    """
+    Generates the information about the setup captured by the snapshot
+    entry by entry, each source/sink only gets converted when its entry is
+    requested (see stream_entries).
+
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :return: generator of (key, info) tuples, with key being default_source, default_sink, source or sink
+    :rtype: generator
+    """
 
+    return stream_entries(snapshot, info_fields(fields, volume), list_sources=list_sources, list_sinks=list_sinks,
+                          verbose=verbose)
 
-def pulse_info(list_sources=False, list_sinks=False, volume=False, verbose=False):
+
+def pulse_snapshot_info(snapshot, list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None):
+    """
+    Returns a dictionary with information about the setup captured by the snapshot,
+    collected as records in a single pass (see collect_records).
+
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    """
+
+    records = collect_records(snapshot, info_fields(fields, volume), list_sources=list_sources, list_sinks=list_sinks)
+    return records.to_dict(verbose)
+
+
+def pulse_info(list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None, session=None):
     """
     Returns a dictionary with information about the setup.
 
@@ -98,75 +143,99 @@ def pulse_info(list_sources=False, list_sinks=False, volume=False, verbose=False
     :type volume: bool
     :param verbose: whether to be verbose
     :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
     """
 
-    pulse = pulse_instance()
+    with pulse_session(session) as session:
+        return pulse_snapshot_info(session.snapshot(), list_sources=list_sources, list_sinks=list_sinks,
+                                   volume=volume, verbose=verbose, fields=fields)
 
-    info = dict()
-    info['default_source'] = pulse_source_info(pulse_source(), volume=volume, verbose=verbose)
-    info['default_sink'] = pulse_sink_info(pulse_sink(), volume=volume, verbose=verbose)
 
-    if list_sources:
-        sources = []
-        for s in pulse.source_list():
-            sources.append(pulse_source_info(s, volume=volume, verbose=verbose))
-        info['sources'] = sources
+def pulse_info_records(list_sources=False, list_sinks=False, volume=False, fields=None, session=None):
+    """
+    Returns the information about the setup as compact records, which don't
+    keep any references to the server state. Use to_dict() or entries() of
+    the result for converting them to dictionaries at output time.
 
-    if list_sinks:
-        sinks = []
-        for s in pulse.source_list():
-            sinks.append(pulse_sink_info(s, volume=volume, verbose=verbose))
-        info['sinks'] = sinks
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :return: the records
+    :rtype: PulseInfoRecords
+    """
 
-    return info
+    with pulse_session(session) as session:
+        return collect_records(session.snapshot(), info_fields(fields, volume),
+                               list_sources=list_sources, list_sinks=list_sinks)
 
 
-def pulse_source(name_or_desc=None):
+def pulse_info_stream(list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None, session=None):
+    """
+    Generates the information about the setup entry by entry, so that
+    consumers can start processing before all devices have been converted.
+
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :return: generator of single-key dictionaries (default_source, default_sink, source or sink -> info)
+    :rtype: generator
+    """
+
+    with pulse_session(session) as session:
+        for key, entry in pulse_snapshot_entries(session.snapshot(), list_sources=list_sources, list_sinks=list_sinks,
+                                                 volume=volume, verbose=verbose, fields=fields):
+            yield {key: entry}
+
+
+def pulse_source(name_or_desc=None, session=None):
     """
     Returns the PulseSourceInfo that matches the string, either against the name or the description.
 
     :param name_or_desc: the name or description string to look for, uses default source if None
     :type name_or_desc: str
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
     :return: the PulseSourceInfo object or None if not found
     :rtype: pulsectl.PulseSourceInfo
     """
 
-    result = None
-    pulse = pulse_instance()
+    with pulse_session(session) as session:
+        return session.snapshot().source(name_or_desc)
 
-    if name_or_desc is None:
-        name_or_desc = pulse.server_info().default_source_name
-
-    for s in pulse.source_list():
-        if (s.name == name_or_desc) or (s.description == name_or_desc):
-            result = s
-            break
-
-    return result
 
-
-def pulse_sink(name_or_desc=None):
+def pulse_sink(name_or_desc=None, session=None):
     """
     Returns the PulseSinkInfo that matches the string, either against the name or the description.
 
     :param name_or_desc: the name or description string to look for, uses default sink if None
     :type name_or_desc: str
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
     :return: the PulseSinkInfo object or None if not found
     :rtype: pulsectl.PulseSinkInfo
     """
 
-    result = None
-    pulse = pulse_instance()
-
-    if name_or_desc is None:
-        name_or_desc = pulse.server_info().default_sink_name
-
-    for s in pulse.sink_list():
-        if (s.name == name_or_desc) or (s.description == name_or_desc):
-            result = s
-            break
-
-    return result
+    with pulse_session(session) as session:
+        return session.snapshot().sink(name_or_desc)
 
 
 def pulse_source_port(source, name_or_desc):
@@ -227,10 +296,12 @@ def pulse_sink_port(sink, name_or_desc):
     return result
 
 
-def pulse_create_profile(source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False):
+def pulse_snapshot_profile(snapshot, source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False):
     """
-    Creates and returns a profile.
+    Creates and returns a profile from the server state captured by the snapshot.
 
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
     :param source_name: the name or description of the pulseaudio source to use, uses current default if None
     :type source_name: str
     :param sink_name: the name or description of the pulseaudio sink to use, uses current default if None
@@ -241,37 +312,37 @@ def pulse_create_profile(source_name=None, sink_name=None, source_port=None, sin
     :type sink_port: str
     :param desc: the optional description for this profile
     :type desc: str
-    :param volume: whether to include the (average) volume across all channels
+    :param volume: whether to include the volume (average and per channel), the channel map and the mute state
     :type volume: bool
     """
 
-    source_obj = pulse_source(source_name)
+    source_obj = snapshot.source(source_name)
     if source_obj is None:
         if source_name is None:
             raise Exception("No default source available!")
         else:
             raise Exception("Unknown source: %s" % source_name)
-    source_port_obj = pulse_source_port(source_obj, source_port)
+    source_port_obj = snapshot.port(source_obj, source_port)
 
-    sink_obj = pulse_sink(sink_name)
+    sink_obj = snapshot.sink(sink_name)
     if sink_obj is None:
         if sink_name is None:
             raise Exception("No default sink available!")
         else:
             raise Exception("Unknown sink: %s" % sink_name)
-    sink_port_obj = pulse_sink_port(sink_obj, sink_port)
+    sink_port_obj = snapshot.port(sink_obj, sink_port)
 
     result = {}
     result['source'] = {}
     result['source']['device'] = source_obj.name
     if volume:
-        result['source']['volume'] = source_obj.volume.value_flat
+        result['source'].update(volume_capture(source_obj))
     if source_port_obj is not None:
         result['source']['port'] = source_port_obj.name
     result['sink'] = {}
     result['sink']['device'] = sink_obj.name
     if volume:
-        result['sink']['volume'] = sink_obj.volume.value_flat
+        result['sink'].update(volume_capture(sink_obj))
     if sink_port_obj is not None:
         result['sink']['port'] = sink_port_obj.name
 
@@ -281,7 +352,210 @@ def pulse_create_profile(source_name=None, sink_name=None, source_port=None, sin
     return result
 
 
-def pulse_create(config=None, source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False):
+def _device_choices(devices, patterns, port_patterns, volume):
+    """
+    Returns the devices and ports that match the glob patterns, skipping monitor sources.
+
+    :param devices: the sources or sinks to choose from
+    :type devices: list
+    :param patterns: the glob patterns for the names/descriptions of the devices, None for all
+    :type patterns: list
+    :param port_patterns: the glob patterns for the names/descriptions of the ports, None for all
+    :type port_patterns: list
+    :param volume: whether to include the volume (average and per channel), the channel map and the mute state
+    :type volume: bool
+    :return: list of (profile section, description parts, name parts) tuples, the name parts being the alternatives for derive_config_name
+    :rtype: list
+    """
+
+    import fnmatch
+
+    def matches(obj, patterns):
+        return (patterns is None) or any(fnmatch.fnmatchcase(obj.name, pattern)
+                                         or fnmatch.fnmatchcase(obj.description, pattern) for pattern in patterns)
+
+    result = []
+    for device in devices:
+        if getattr(device, "monitor_of_sink_name", None) or not matches(device, patterns):
+            continue
+        section = {'device': device.name}
+        if volume:
+            section.update(volume_capture(device))
+        device_name = (device.description, device.name, "device-%d" % device.index)
+        ports = [port for port in device.port_list if matches(port, port_patterns)]
+        if len(device.port_list) == 0:
+            if port_patterns is None:
+                result.append((section, [device.description], [device_name]))
+            continue
+        for port in ports:
+            port_section = dict(section)
+            port_section['port'] = port.name
+            port_name = (port.description, port.name, "port-%d" % (device.port_list.index(port) + 1))
+            result.append((port_section, [device.description, port.description], [device_name, port_name]))
+    return result
+
+
+def pulse_snapshot_profiles(snapshot, sources=None, sinks=None, source_ports=None, sink_ports=None, volume=False):
+    """
+    Creates the profiles for all the combinations of source port and sink port
+    from the server state captured by the snapshot. The names get derived from
+    the descriptions of the devices and ports (see derive_config_name).
+
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
+    :param sources: the glob patterns for the names/descriptions of the sources to use, None for all (monitor sources are always skipped)
+    :type sources: list
+    :param sinks: the glob patterns for the names/descriptions of the sinks to use, None for all
+    :type sinks: list
+    :param source_ports: the glob patterns for the names/descriptions of the source ports to use, None for all
+    :type source_ports: list
+    :param sink_ports: the glob patterns for the names/descriptions of the sink ports to use, None for all
+    :type sink_ports: list
+    :param volume: whether to include the current volume (average and per channel), the channel map and the mute state
+    :type volume: bool
+    :return: the list of (name, profile) tuples, sorted by name
+    :rtype: list
+    """
+
+    source_choices = _device_choices(snapshot.sources, sources, source_ports, volume)
+    sink_choices = _device_choices(snapshot.sinks, sinks, sink_ports, volume)
+    result = dict()
+    for source, source_parts, source_names in source_choices:
+        for sink, sink_parts, sink_names in sink_choices:
+            name = derive_config_name(*(source_names + sink_names))
+            unique = name
+            i = 1
+            while unique in result:
+                i += 1
+                unique = "%s-%d" % (name, i)
+            profile = {'source': dict(source), 'sink': dict(sink),
+                       'description': "%s / %s" % (" - ".join(source_parts), " - ".join(sink_parts))}
+            result[unique] = profile
+    return sorted(result.items())
+
+
+def pulse_create_all(sources=None, sinks=None, source_ports=None, sink_ports=None, volume=False, session=None, storage=None):
+    """
+    Creates the profiles for all the combinations of source port and sink port
+    (or the ones matching the glob patterns) from a single snapshot of the server
+    state and stores them in the config dir (see pulse_store_all).
+
+    :param sources: the glob patterns for the names/descriptions of the sources to use, None for all
+    :type sources: list
+    :param sinks: the glob patterns for the names/descriptions of the sinks to use, None for all
+    :type sinks: list
+    :param source_ports: the glob patterns for the names/descriptions of the source ports to use, None for all
+    :type source_ports: list
+    :param sink_ports: the glob patterns for the names/descriptions of the sink ports to use, None for all
+    :type sink_ports: list
+    :param volume: whether to include the current volume (average and per channel), the channel map and the mute state
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param storage: the format to store the profiles in (yaml|json|marshal), see pulse_store
+    :type storage: str
+    :return: the files the profiles were written to
+    :rtype: list
+    """
+
+    with pulse_session(session) as session:
+        profiles = pulse_snapshot_profiles(session.snapshot(), sources=sources, sinks=sinks,
+                                           source_ports=source_ports, sink_ports=sink_ports, volume=volume)
+    return pulse_store_all(profiles, storage=storage)
+
+
+def pulse_create_profile(source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False, session=None):
+    """
+    Creates and returns a profile.
+
+    :param source_name: the name or description of the pulseaudio source to use, uses current default if None
+    :type source_name: str
+    :param sink_name: the name or description of the pulseaudio sink to use, uses current default if None
+    :type sink_name: str
+    :param source_port: the name or description of the source port to use, uses first one of source if None
+    :type source_port: str
+    :param sink_port: the name or description of the sink port to use, uses first one of sink if None
+    :type sink_port: str
+    :param desc: the optional description for this profile
+    :type desc: str
+    :param volume: whether to include the volume (average and per channel), the channel map and the mute state
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    """
+
+    with pulse_session(session) as session:
+        return pulse_snapshot_profile(session.snapshot(), source_name=source_name, sink_name=sink_name,
+                                      source_port=source_port, sink_port=sink_port, desc=desc, volume=volume)
+
+
+def pulse_store(profile, config, storage=None):
+    """
+    Stores the profile under the specified file name (or name in config dir).
+
+    :param profile: the profile to store
+    :type profile: dict
+    :param config: the file (or name) to store the profile in
+    :type config: str
+    :param storage: the format to use for config names (yaml|json|marshal), uses the format of the existing file (or YAML) if None; the format of files is determined by their extension
+    :type storage: str
+    :return: the file the profile was written to
+    :rtype: str
+    """
+
+    if not is_config_name(config):
+        config_filename = expand_config(config)
+        profile_write(profile, config_filename)
+        return config_filename
+    return pulse_store_all([(config_name(expand_config(config)), profile)], storage=storage)[0]
+
+
+def pulse_store_all(profiles, storage=None):
+    """
+    Stores the profiles in the config dir in one pass, updating the profile
+    index only once. Each file gets written atomically (see profile_write).
+
+    :param profiles: the list of (config name, profile) tuples to store
+    :type profiles: list
+    :param storage: the format to use (yaml|json|marshal), uses the format of the existing file (or YAML) if None
+    :type storage: str
+    :return: the files the profiles were written to
+    :rtype: list
+    """
+
+    if not init_config_dir():
+        raise Exception("Cannot access/create config directory: %s" % config_dir())
+    directory = config_dir()
+    exts = format_extensions()
+    # a single scan rather than looking up the files of every name
+    files = dict()
+    for entry in os.scandir(directory):
+        root, ext = os.path.splitext(entry.name)
+        if ext in exts:
+            files.setdefault(root, []).append(entry.path)
+    index = profile_index()
+    result = []
+    for name, profile in profiles:
+        existing = sorted(files.get(name, []), key=lambda f: exts.index(os.path.splitext(f)[1]))
+        if storage is not None:
+            config_filename = os.path.join(directory, name + format_extension(storage))
+        elif len(existing) > 0:
+            config_filename = existing[0]
+        else:
+            config_filename = os.path.join(directory, name + exts[0])
+        profile_write(profile, config_filename)
+        # remove the profile stored in other formats
+        for f in existing:
+            if f != config_filename:
+                os.remove(f)
+        index.update(name, profile, st=os.stat(config_filename))
+        result.append(config_filename)
+    index.save()
+    return result
+
+
+def pulse_create(config=None, source_name=None, sink_name=None, source_port=None, sink_port=None, desc=None, volume=False, session=None, storage=None,
+                 output_format=DEFAULT_OUTPUT_FORMAT):
     """
     Creates a profile and stores it under the specified file name (or name in config dir) or to stdout if config is None.
 
@@ -297,30 +571,59 @@ def pulse_create(config=None, source_name=None, sink_name=None, source_port=None
     :type sink_port: str
     :param desc: the optional description for this profile
     :type desc: str
-    :param volume: whether to include the (average) volume across all channels
+    :param volume: whether to include the volume (average and per channel), the channel map and the mute state
     :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param storage: the format to store config names in (yaml|json|marshal), see pulse_store
+    :type storage: str
+    :param output_format: the format for outputting the profile on stdout (yaml|json|jsonl)
+    :type output_format: str
     """
 
     profile = pulse_create_profile(source_name=source_name, sink_name=sink_name,
                                    source_port=source_port, sink_port=sink_port,
-                                   desc=desc, volume=volume)
+                                   desc=desc, volume=volume, session=session)
+    pulse_output(profile, config=config, storage=storage, output_format=output_format)
+
+
+def pulse_output(profile, config=None, storage=None, output_format=DEFAULT_OUTPUT_FORMAT):
+    """
+    Stores the profile under the specified file name (or name in config dir) or outputs it to stdout if config is None.
+
+    :param profile: the profile to output
+    :type profile: dict
+    :param config: the file (or name) to store the profile in, output on stdout if None
+    :type config: str
+    :param storage: the format to store config names in (yaml|json|marshal), see pulse_store
+    :type storage: str
+    :param output_format: the format for outputting the profile on stdout (yaml|json|jsonl)
+    :type output_format: str
+    """
 
     if config is None:
-        print(yaml.dump(profile))
+        output_data(profile, output_format)
     else:
-        config_filename = expand_config(config)
-        is_config = is_config_name(config)
-        if is_config:
-            if not init_config_dir():
-                raise Exception("Cannot access/create config directory: %s" % config_dir())
-        with open(config_filename, 'w') as config_file:
-            yaml.dump(profile, config_file)
-        if is_config:
+        config_filename = pulse_store(profile, config, storage=storage)
+        if is_config_name(config):
             print("Profile written: %s" % config)
         else:
             print("Profile written to: %s" % config_filename)
 
 
+def pulse_parse(config_filename):
+    """
+    Parses the profile file, using the format associated with its extension.
+
+    :param config_filename: the file to parse
+    :type config_filename: str
+    :return: the profile
+    :rtype: dictionary
+    """
+
+    return profile_read(config_filename)
+
+
 def pulse_load(config):
     """
     Loads the specified configuration and returns the profile.
@@ -338,107 +641,426 @@ def pulse_load(config):
         else:
             raise Exception("Profile file does not exist: %s (expanded to %s)" % (config, config_filename))
 
-    with open(config_filename, "r") as config_file:
-        profile = yaml.safe_load(config_file)
+    if is_config_name(config):
+        index = profile_index()
+        profile = index.profile(config_name(config_filename), pulse_parse)
+        index.save()
         return profile
+    else:
+        return pulse_parse(config_filename)
+
+
+def pulse_previous_state(snapshot):
+    """
+    Captures the default source/sink with their ports, volumes and mute states
+    as profile, for restoring them after reverting a card profile: switching
+    the card profile replaces the devices of the card, after which the server
+    falls back on other defaults (see pulse_restore_card).
+
+    :param snapshot: the server state before switching the card profile
+    :type snapshot: PulseSnapshot
+    :return: the profile, None if there is no default source or sink
+    :rtype: dict
+    """
+
+    if (snapshot.source() is None) or (snapshot.sink() is None):
+        return None
+    return pulse_snapshot_profile(snapshot, volume=True)
 
 
-def pulse_apply_profile(profile, volume=False):
+def _device_listener(session):
     """
-    Applies the profile dictionary.
+    Opens a separate connection that is subscribed to source/sink events, for
+    waiting for devices to appear without replacing the event callback and
+    subscriptions of the session's connection (e.g., of ppp-watch or ppp-server).
 
-    :param profile: the dictionary with source/sink information.
+    :param session: the session to open the connection for (same server)
+    :type session: PulseSession
+    :return: the connection
+    :rtype: pulsectl.Pulse
+    """
+
+    result = pulse_instance(session.server)
+    try:
+        result.event_mask_set("source", "sink")
+    except Exception:
+        result.close()
+        raise
+    return result
+
+
+def _wait_for_devices(session, listener, profile, deadline):
+    """
+    Waits until the source and sink of the profile are available. Rather than
+    polling, the devices only get re-checked when new ones appeared.
+
+    :param session: the session to check the devices with
+    :type session: PulseSession
+    :param listener: the connection subscribed to source/sink events, see _device_listener
+    :type listener: pulsectl.Pulse
+    :param profile: the dictionary with source/sink information
     :type profile: dict
-    :param volume: whether to set the volume across all channels (if present)
+    :param deadline: the time (perf_counter) until which to wait
+    :type deadline: float
+    :return: True if the devices became available before the deadline
+    :rtype: bool
+    """
+
+    stop = loop_stop()
+
+    def on_event(event):
+        if event.t == "new":
+            raise stop()
+
+    listener.event_callback_set(on_event)
+    while True:
+        snapshot = session.refresh()
+        if (snapshot.source(profile['source']['device']) is not None) \
+                and (snapshot.sink(profile['sink']['device']) is not None):
+            return True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        listener.event_listen(timeout=remaining)
+
+
+def _restore_card(session, listener, restore, previous, timeout):
+    """
+    Restores the previous card profile and then, once they are available
+    again, the previous default source/sink with their ports, volumes and
+    mute states.
+
+    :param session: the session to use
+    :type session: PulseSession
+    :param listener: the connection subscribed to source/sink events, see _device_listener
+    :type listener: pulsectl.Pulse
+    :param restore: the operations for restoring the previous card profile
+    :type restore: list
+    :param previous: the previous default source/sink, see pulse_previous_state; None to only restore the card profile
+    :type previous: dict
+    :param timeout: the maximum time in seconds to wait for the source/sink
+    :type timeout: float
+    """
+
+    try:
+        pulse_execute(session.pulse, restore)
+    finally:
+        session.invalidate()
+    if previous is None:
+        return
+    if not _wait_for_devices(session, listener, previous, time.perf_counter() + timeout):
+        raise Exception("Previous source/sink did not become available within %.1f s after restoring card profile"
+                        % timeout)
+    try:
+        pulse_execute(session.pulse, pulse_plan(previous, session.snapshot(), volume=True))
+    finally:
+        session.invalidate()
+
+
+def pulse_restore_card(restore, previous, session, timeout=CARD_TIMEOUT):
+    """
+    Restores the previous card profile and then, once they are available
+    again, the previous default source/sink with their ports, volumes and
+    mute states.
+
+    :param restore: the operations for restoring the previous card profile, see pulse_switch_card
+    :type restore: list
+    :param previous: the previous default source/sink, see pulse_previous_state; None to only restore the card profile
+    :type previous: dict
+    :param session: the session to use
+    :type session: PulseSession
+    :param timeout: the maximum time in seconds to wait for the source/sink
+    :type timeout: float
+    """
+
+    if len(restore) == 0:
+        return
+    listener = _device_listener(session)
+    try:
+        _restore_card(session, listener, restore, previous, timeout)
+    finally:
+        listener.close()
+
+
+def pulse_switch_card(profile, session, timeout=CARD_TIMEOUT, previous=None):
+    """
+    Activates the card profile of the 'card' section of the profile and waits
+    until the source and sink of the profile are available. Rather than polling,
+    a separate connection subscribes to source/sink events and the devices only
+    get re-checked when new ones appeared. If they don't appear in time, the
+    previous card profile (and default source/sink) get restored.
+
+    :param profile: the dictionary with card/source/sink information.
+    :type profile: dict
+    :param session: the session to use
+    :type session: PulseSession
+    :param timeout: the maximum time in seconds to wait for the source/sink
+    :type timeout: float
+    :param previous: the default source/sink before switching, see pulse_previous_state; None to only restore the card profile
+    :type previous: dict
+    :return: tuple of the card operations, the operations for restoring the previous card profile and the time waited for the devices (in seconds)
+    :rtype: tuple
+    """
+
+    check_profile(profile)
+    snapshot = session.snapshot()
+    operations = pulse_plan_card(profile, snapshot)
+    restore = pulse_rollback_plan(operations, snapshot)
+    if all(op.noop for op in operations):
+        return operations, restore, 0.0
+
+    # subscribed before switching, so that no device events get missed
+    listener = _device_listener(session)
+    try:
+        try:
+            pulse_execute(session.pulse, operations)
+        finally:
+            session.invalidate()
+        start = time.perf_counter()
+        if not _wait_for_devices(session, listener, profile, start + timeout):
+            if len(restore) > 0:
+                _restore_card(session, listener, restore, previous, timeout)
+            raise Exception("Source/sink did not become available within %.1f s after activating card profile: %s"
+                            % (timeout, profile['card']['profile']))
+        return operations, restore, time.perf_counter() - start
+    finally:
+        listener.close()
+
+
+def pulse_apply_profile(profile, volume=False, session=None, rollback=True, move=False, move_apps=None, dry_run=False):
+    """
+    Applies the profile dictionary. Only the changes that are necessary get sent
+    to the server, in a single batch. If the profile has a 'card' section, the
+    card profile gets activated first, waiting for the source/sink to appear
+    (see pulse_switch_card).
+
+    :param profile: the dictionary with (card/)source/sink information.
+    :type profile: dict
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
     :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param rollback: whether to restore the previous state (including the card profile and the default source/sink before switching it) if applying fails
+    :type rollback: bool
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report with the operations and their timings, see pulse_execute; with a card section, also the time waited for the source/sink under 'devices', with 'total' covering the complete switch; for dry_run see pulse_plan_report, with 'deferred' set if the card profile still needs activating
+    :rtype: dict
     """
 
-    # sanity checks
-    if not "source" in profile:
-        raise Exception("No 'source' section in profile!")
-    if not "device" in profile['source']:
-        raise Exception("No 'device' in 'source' section of profile!")
-    if not "sink" in profile:
-        raise Exception("No 'sink' section in profile!")
-    if not "device" in profile['sink']:
-        raise Exception("No 'device' in 'sink' section of profile!")
+    with pulse_session(session) as session:
+        if "card" not in profile:
+            snapshot = session.snapshot()
+            return _apply_operations(session, snapshot, pulse_plan(profile, snapshot, volume=volume), rollback,
+                                     move, move_apps, dry_run)
+
+        if dry_run:
+            snapshot = session.snapshot()
+            card_operations = pulse_plan_card(profile, snapshot)
+            if all(op.noop for op in card_operations):
+                result = _apply_operations(session, snapshot, pulse_plan(profile, snapshot, volume=volume), rollback,
+                                           move, move_apps, dry_run)
+                result['operations'] = pulse_plan_report(card_operations, snapshot)['operations'] + result['operations']
+            else:
+                # the source/sink only become available after activating the card profile
+                result = pulse_plan_report(card_operations, snapshot, session.pulse)
+                result['deferred'] = True
+            return result
+
+        start = time.perf_counter()
+        # the defaults get lost when the devices of the card get replaced, i.e., capture them beforehand
+        previous = pulse_previous_state(session.snapshot()) if rollback else None
+        card_operations, restore, devices = pulse_switch_card(profile, session, previous=previous)
+        try:
+            snapshot = session.snapshot()
+            result = _apply_operations(session, snapshot, pulse_plan(profile, snapshot, volume=volume), rollback,
+                                       move, move_apps)
+        except Exception as e:
+            if rollback and (len(restore) > 0):
+                try:
+                    pulse_restore_card(restore, previous, session)
+                except Exception as restore_e:
+                    raise Exception("%s; failed to restore previous card profile as well: %s"
+                                    % (str(e), str(restore_e))) from e
+            raise
+        result['operations'] = pulse_report(card_operations, 0.0, 0.0)['operations'] + result['operations']
+        result['devices'] = devices
+        result['total'] = time.perf_counter() - start
+        return result
+
+
+def pulse_apply_compiled(compiled, volume=False, session=None, rollback=True, move=False, move_apps=None, dry_run=False):
+    """
+    Applies the compiled profile, without resolving device or port names/descriptions.
 
-    # get source
-    source = pulse_source(profile['source']['device'])
-    if source is None:
-        raise Exception("Source device is not available: %s" % profile['source']['device'])
-    source_volume = None
-    if "volume" in profile['source']:
-        source_volume = float(profile['source']['volume'])
-    source_port = None
-    if "port" in profile['source']:
-        source_port = pulse_source_port(source, profile['source']['port'])
-        if source_port is None:
-            raise Exception("Source port is not available: %s" % profile['source']['port'])
-
-    # get sink
-    sink = pulse_sink(profile['sink']['device'])
-    if sink is None:
-        raise Exception("Sink device is not available: %s" % profile['sink']['device'])
-    sink_volume = None
-    if "volume" in profile['sink']:
-        sink_volume = float(profile['sink']['volume'])
-    sink_port = None
-    if "port" in profile['sink']:
-        sink_port = pulse_sink_port(sink, profile['sink']['port'])
-        if sink_port is None:
-            raise Exception("Sink port is not available: %s" % profile['sink']['port'])
-        sink.port_active = sink_port
-
-    pulse = pulse_instance()
-    pulse.default_set(source)
-    if volume and source_volume is not None:
-        source.volume.value_flat = source_volume
-        pulse.volume_set(source, source.volume)
-    if source_port is not None:
-        pulse.port_set(source, source_port)
-    pulse.default_set(sink)
-    if volume and sink_volume is not None:
-        sink.volume.value_flat = sink_volume
-        pulse.volume_set(sink, sink.volume)
-    if sink_port is not None:
-        pulse.port_set(sink, sink_port)
-
-
-def pulse_apply(config, volume=False):
+    :param compiled: the compiled profile (see compile_profile), must match the available devices
+    :type compiled: dict
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param rollback: whether to restore the previous state if applying fails
+    :type rollback: bool
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report with the operations and their timings, see pulse_execute (pulse_plan_report for dry_run)
+    :rtype: dict
+    """
+
+    with pulse_session(session) as session:
+        snapshot = session.snapshot()
+        return _apply_operations(session, snapshot, pulse_plan_compiled(compiled, snapshot, volume=volume), rollback,
+                                 move, move_apps, dry_run)
+
+
+def _apply_operations(session, snapshot, operations, rollback, move=False, move_apps=None, dry_run=False):
+    """
+    Executes the planned operations and discards the snapshot of the session afterwards.
+    With dry_run, only the report of the plan gets returned instead.
+
+    :param session: the session to use
+    :type session: PulseSession
+    :param snapshot: the server state the operations were planned against
+    :type snapshot: PulseSnapshot
+    :param operations: the list of PulseOperation objects
+    :type operations: list
+    :param rollback: whether to restore the previous state if applying fails
+    :type rollback: bool
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report with the operations and their timings, see pulse_execute (pulse_plan_report for dry_run)
+    :rtype: dict
+    """
+
+    if move:
+        operations = operations + pulse_plan_moves(operations, snapshot, apps=move_apps)
+    if dry_run:
+        return pulse_plan_report(operations, snapshot, session.pulse)
+    restore = pulse_rollback_plan(operations, snapshot) if rollback else None
+    try:
+        return pulse_execute(session.pulse, operations, rollback=restore)
+    finally:
+        session.invalidate()
+
+
+def pulse_apply(config, volume=False, session=None, move=False, move_apps=None, dry_run=False):
     """
     Applies the specified configuration.
 
     :param config: the configuration name or file
     :type config: str
-    :param volume: whether to set the volume across all channels (if present)
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report with the operations and their timings, see pulse_execute (pulse_plan_report for dry_run)
+    :rtype: dict
+    """
+
+    profile = pulse_load(config)
+    # the devices of profiles with a card section only get resolved after activating the card profile
+    if (not is_config_name(config)) or ("card" in profile):
+        return pulse_apply_profile(profile, volume=volume, session=session, move=move, move_apps=move_apps,
+                                   dry_run=dry_run)
+
+    # profiles from the config dir get compiled once per device setup
+    with pulse_session(session) as session:
+        snapshot = session.snapshot()
+        index = profile_index()
+        config_filename = expand_config(config)
+        name = config_name(config_filename)
+        compiled = None
+        if os.path.exists(config_filename):
+            compiled = index.compiled(name, snapshot.fingerprint)
+        if (compiled is None) or not compiled_matches(compiled, snapshot):
+            compiled = compile_profile(profile, snapshot)
+            index.update_compiled(name, compiled)
+            index.save()
+        return pulse_apply_compiled(compiled, volume=volume, session=session, move=move, move_apps=move_apps,
+                                    dry_run=dry_run)
+
+
+def pulse_apply_auto(volume=False, session=None, move=False, move_apps=None, dry_run=False):
+    """
+    Applies the stored profile that matches the available devices best (see
+    pulse_best_profile), using the selection index of the config dir.
+
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
     :type volume: bool
+    :param session: the session to use, uses a temporary one if None
+    :type session: PulseSession
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report with the operations and their timings (see pulse_execute, pulse_plan_report for dry_run) and the name of the applied profile under 'profile'
+    :rtype: dict
     """
 
-    pulse_apply_profile(pulse_load(config), volume=volume)
+    with pulse_session(session) as session:
+        name = selection_index().best(session.snapshot())
+        if name is None:
+            raise Exception("No stored profile matches the available devices")
+        result = pulse_apply(name, volume=volume, session=session, move=move, move_apps=move_apps, dry_run=dry_run)
+        result['profile'] = name
+        return result
 
 
-def pulse_list(verbose=False):
+def pulse_list(verbose=False, output_format=None):
     """
     Lists all the available profiles in the config dir.
 
     :param verbose: if True the content of the profiles is output as well
     :rtype: bool
+    :param output_format: the machine-readable format to output the profiles in (yaml|json|jsonl), one entry with 'name' (and 'profile' if verbose) per profile; outputs plain text if None
+    :type output_format: str
     """
 
     profiles = list_configs()
-    if len(profiles) == 0:
+    index = profile_index() if verbose else None
+    if output_format is not None:
+        entries = []
+        for profile in profiles:
+            entry = {'name': profile}
+            if verbose:
+                entry['profile'] = index.profile(profile, pulse_parse)
+            entries.append(entry)
+        output_entries(entries, output_format)
+    elif len(profiles) == 0:
         print("No profiles available")
     else:
         print("Available profile(s):")
         for profile in profiles:
             print("-", profile)
             if verbose:
-                content = pulse_load(profile)
-                lines = yaml.dump(content).split("\n")
+                content = index.profile(profile, pulse_parse)
+                lines = yaml_dump(content).split("\n")
                 for i in range(len(lines)):
                     lines[i] = "  " + lines[i]
                 print("\n".join(lines) + "\n")
+    if verbose:
+        index.prune(profiles)
+        index.save()
 
 
 def pulse_delete(config):
@@ -450,4 +1072,34 @@ def pulse_delete(config):
     """
 
     delete_config(config)
+    index = profile_index()
+    index.remove(config_name(expand_config(config)))
+    index.save()
     print("Deleted profile: %s" % config)
+
+
+def pulse_convert(storage, configs=None):
+    """
+    Converts the profiles in the config dir to the specified format.
+
+    :param storage: the format to convert to (yaml|json|marshal)
+    :type storage: str
+    :param configs: the names of the configs to convert, all if None
+    :type configs: list
+    """
+
+    # fails for unknown formats before any profile gets converted
+    format_extension(storage)
+    if configs is None:
+        configs = list_configs()
+    for config in configs:
+        if not is_config_name(config):
+            raise Exception("Unknown profile: %s" % config)
+        name = config_name(expand_config(config))
+        files = config_files(name)
+        if len(files) == 0:
+            raise Exception("Profile does not exist: %s" % config)
+        if (len(files) == 1) and (format_of(files[0]) == storage):
+            continue
+        pulse_store(pulse_load(name), name, storage=storage)
+        print("Converted profile: %s" % name)
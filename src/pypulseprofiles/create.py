@@ -1,6 +1,21 @@
 import argparse
 import traceback
-from pypulseprofiles.core import pulse_create
+from pypulseprofiles.core import pulse_create_profile, pulse_create_all, pulse_output, format_names, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from pypulseprofiles.control import control_request, ControlUnavailable
+from pypulseprofiles.metrics import cli_timings
+
+
+def _patterns(pattern):
+    """
+    Turns the optional glob pattern into a list.
+
+    :param pattern: the pattern, can be None
+    :type pattern: str
+    :return: the list with the pattern, None if no pattern
+    :rtype: list
+    """
+
+    return None if pattern is None else [pattern]
 
 
 def main(args=None):
@@ -21,11 +36,34 @@ def main(args=None):
     parser.add_argument("--sink", metavar="NAME_OR_DESC", dest="sink", default=None, help="the specific pulseaudio sink to use (name or description), otherwise current default is used")
     parser.add_argument("--sink_port", metavar="NAME_OR_DESC", dest="sink_port", default=None, help="the specific pulseaudio sink port to use (name or description), otherwise currently active one is used")
     parser.add_argument("--desc", metavar="DESC", dest="desc", default=None, help="the optional description for this profile")
-    parser.add_argument("--volume", action="store_true", dest="volume", help="whether to include the (average) volume across all channels")
+    parser.add_argument("--volume", action="store_true", dest="volume", help="whether to include the volume (average and per channel), the channel map and the mute state")
+    parser.add_argument("--storage", dest="storage", choices=format_names(), default=None, help="the format to store config names in, otherwise the format of the existing profile or YAML is used; the format of files is determined by their extension")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT, help="the format for outputting the profile to stdout")
+    parser.add_argument("--all", action="store_true", dest="all", help="creates profiles for all combinations of source port and sink port and stores them in the config dir, named after the descriptions of the devices and ports; --source/--sink/--source_port/--sink_port are then glob patterns for names or descriptions that restrict the combinations; outputs the written files")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
     parsed = parser.parse_args(args=args)
-    pulse_create(config=parsed.config, source_name=parsed.source, sink_name=parsed.sink,
-           source_port=parsed.source_port, sink_port=parsed.sink_port, desc=parsed.desc,
-                 volume=parsed.volume)
+    if parsed.all and (parsed.config is not None):
+        parser.error("--config cannot be used with --all, the names get derived from the descriptions")
+    with cli_timings(parsed.timings):
+        if parsed.all:
+            options = dict(sources=_patterns(parsed.source), sinks=_patterns(parsed.sink),
+                           source_ports=_patterns(parsed.source_port), sink_ports=_patterns(parsed.sink_port),
+                           volume=parsed.volume, storage=parsed.storage)
+            try:
+                files = control_request("create_all", **options)
+            except ControlUnavailable:
+                files = pulse_create_all(**options)
+            for f in files:
+                print(f)
+            return
+        options = dict(source_name=parsed.source, sink_name=parsed.sink,
+                       source_port=parsed.source_port, sink_port=parsed.sink_port, desc=parsed.desc,
+                       volume=parsed.volume)
+        try:
+            profile = control_request("create_profile", **options)
+        except ControlUnavailable:
+            profile = pulse_create_profile(**options)
+        pulse_output(profile, config=parsed.config, storage=parsed.storage, output_format=parsed.output_format)
 
 
 def sys_main():
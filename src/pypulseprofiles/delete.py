@@ -1,6 +1,7 @@
 import argparse
 import traceback
 from pypulseprofiles.core import pulse_delete, APPLICATION_NAME
+from pypulseprofiles.metrics import cli_timings
 
 
 def main(args=None):
@@ -16,8 +17,10 @@ def main(args=None):
         description='Deletes the specified profile stored in %s.' % ("$HOME/.config/" + APPLICATION_NAME),
         prog="ppp-rm")
     parser.add_argument("--config", metavar="NAME", dest="config", required=True, help="the config name to delete")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
     parsed = parser.parse_args(args=args)
-    pulse_delete(parsed.config)
+    with cli_timings(parsed.timings):
+        pulse_delete(parsed.config)
 
 
 def sys_main():
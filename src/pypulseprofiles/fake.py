@@ -0,0 +1,1237 @@
+import random
+import threading
+import time
+from pypulseprofiles.backend import loop_stop
+
+
+class FakePulseError(Exception):
+    """
+    Raised by the fake server for invalid operations, e.g., unknown devices or ports.
+    """
+    pass
+
+
+class FakePulseDisconnected(FakePulseError):
+    """
+    Raised when using a connection that got closed.
+    """
+    pass
+
+
+class FakeLoopStop(Exception):
+    """
+    Stops FakePulse.event_listen() if pulsectl is not available.
+    """
+    pass
+
+
+class FakeVolume(object):
+    """
+    The volume of a device, compatible with pulsectl.PulseVolumeInfo.
+    """
+
+    def __init__(self, values, channels=None):
+        """
+        Initializes the volume.
+
+        :param values: the list of per-channel values or a single value for all channels
+        :type values: list or float
+        :param channels: the number of channels if a single value was supplied
+        :type channels: int
+        """
+
+        if isinstance(values, list):
+            self.values = values
+        else:
+            if channels is None:
+                raise Exception("Channel count required if volume value is not a list!")
+            self.values = [values] * channels
+
+    @property
+    def value_flat(self):
+        """
+        Returns the average volume across all channels.
+
+        :return: the volume
+        :rtype: float
+        """
+
+        return (sum(self.values) / float(len(self.values))) if self.values else 0
+
+    @value_flat.setter
+    def value_flat(self, value):
+        """
+        Sets the same volume for all channels.
+
+        :param value: the volume
+        :type value: float
+        """
+
+        self.values = [value] * len(self.values)
+
+    def __repr__(self):
+        return "FakeVolume(%s)" % str(self.values)
+
+
+class FakePort(object):
+    """
+    A port of a source or sink.
+    """
+
+    def __init__(self, name, description, available="unknown"):
+        """
+        Initializes the port.
+
+        :param name: the name of the port
+        :type name: str
+        :param description: the description of the port
+        :type description: str
+        :param available: whether something is plugged in (yes|no|unknown)
+        :type available: str
+        """
+
+        self.name = name
+        self.description = description
+        self.available = available
+
+    def __repr__(self):
+        return "FakePort(%s)" % self.name
+
+
+CHANNEL_MAPS = {
+    1: ["mono"],
+    2: ["front-left", "front-right"],
+    4: ["front-left", "front-right", "rear-left", "rear-right"],
+    6: ["front-left", "front-right", "rear-left", "rear-right", "front-center", "lfe"],
+}
+""" the channel maps of the fake devices, per number of channels. """
+
+
+class FakeDevice(object):
+    """
+    Ancestor for fake sources and sinks, with the attributes of
+    pulsectl.PulseSourceInfo/PulseSinkInfo used by this library.
+    """
+
+    kind = None
+    """ the type of device (source|sink). """
+
+    def __init__(self, index, name, description, ports=None, channels=2, volume=1.0, proplist=None):
+        """
+        Initializes the device.
+
+        :param index: the index of the device
+        :type index: int
+        :param name: the name of the device
+        :type name: str
+        :param description: the description of the device
+        :type description: str
+        :param ports: the list of (name, description) tuples of the ports, the first one becomes active
+        :type ports: list
+        :param channels: the number of channels
+        :type channels: int
+        :param volume: the initial volume of all channels
+        :type volume: float
+        :param proplist: the properties of the device
+        :type proplist: dict
+        """
+
+        self.index = index
+        self.name = name
+        self.description = description
+        self.port_list = [FakePort(n, d) for n, d in (ports or [])]
+        self.port_active = self.port_list[0] if len(self.port_list) > 0 else None
+        self.channel_count = channels
+        self.channel_list = list(CHANNEL_MAPS.get(channels, ["aux%d" % i for i in range(channels)]))
+        self.volume = FakeVolume(volume, channels)
+        self.mute = 0
+        self.proplist = dict() if proplist is None else dict(proplist)
+        self.proplist.setdefault('device.description', description)
+
+    def copy(self):
+        """
+        Returns a copy of the device, like a client obtains when listing the devices.
+
+        :return: the copy
+        :rtype: FakeDevice
+        """
+
+        result = self.__class__(self.index, self.name, self.description, channels=self.channel_count,
+                                proplist=self.proplist)
+        result.port_list = [FakePort(p.name, p.description, p.available) for p in self.port_list]
+        for p in result.port_list:
+            if (self.port_active is not None) and (p.name == self.port_active.name):
+                result.port_active = p
+                break
+        else:
+            result.port_active = None
+        result.volume = FakeVolume(list(self.volume.values))
+        result.mute = self.mute
+        return result
+
+    def __repr__(self):
+        return "%s(%d, %s)" % (self.__class__.__name__, self.index, self.name)
+
+
+class FakeSourceInfo(FakeDevice):
+    """
+    A fake source.
+    """
+
+    kind = "source"
+
+
+class FakeSinkInfo(FakeDevice):
+    """
+    A fake sink.
+    """
+
+    kind = "sink"
+
+
+class FakeStream(object):
+    """
+    A fake playback (sink input) or recording (source output) stream, with the
+    attributes of pulsectl.PulseSinkInputInfo/PulseSourceOutputInfo used by this library.
+    """
+
+    def __init__(self, index, name, kind, device, proplist=None):
+        """
+        Initializes the stream.
+
+        :param index: the index of the stream
+        :type index: int
+        :param name: the name of the stream
+        :type name: str
+        :param kind: the type of device the stream is connected to (source|sink)
+        :type kind: str
+        :param device: the index of the source/sink the stream is connected to
+        :type device: int
+        :param proplist: the properties of the stream, e.g., application.name
+        :type proplist: dict
+        """
+
+        self.index = index
+        self.name = name
+        self.kind = kind
+        self.source = device if kind == "source" else None
+        self.sink = device if kind == "sink" else None
+        self.proplist = dict() if proplist is None else dict(proplist)
+
+    def copy(self):
+        """
+        Returns a copy of the stream, like a client obtains when listing the streams.
+
+        :return: the copy
+        :rtype: FakeStream
+        """
+
+        return FakeStream(self.index, self.name, self.kind, self.source if self.kind == "source" else self.sink,
+                          proplist=self.proplist)
+
+    def __repr__(self):
+        return "FakeStream(%d, %s)" % (self.index, self.name)
+
+
+class FakeCardProfile(object):
+    """
+    A profile of a card, compatible with pulsectl.PulseCardProfileInfo.
+    """
+
+    def __init__(self, name, description, n_sources=0, n_sinks=0):
+        """
+        Initializes the profile.
+
+        :param name: the name of the profile
+        :type name: str
+        :param description: the description of the profile
+        :type description: str
+        :param n_sources: the number of sources of the profile
+        :type n_sources: int
+        :param n_sinks: the number of sinks of the profile
+        :type n_sinks: int
+        """
+
+        self.name = name
+        self.description = description
+        self.n_sources = n_sources
+        self.n_sinks = n_sinks
+        self.priority = 0
+        self.available = 1
+
+    def __repr__(self):
+        return "FakeCardProfile(%s)" % self.name
+
+
+class FakeCardInfo(object):
+    """
+    A fake card, with the attributes of pulsectl.PulseCardInfo used by this library.
+    """
+
+    def __init__(self, index, name, description, profiles):
+        """
+        Initializes the card.
+
+        :param index: the index of the card
+        :type index: int
+        :param name: the name of the card
+        :type name: str
+        :param description: the description of the card
+        :type description: str
+        :param profiles: the list of (name, description, sources, sinks) tuples of the profiles, with sources/sinks being lists of (name, description[, ports]) tuples of the devices that the profile provides
+        :type profiles: list
+        """
+
+        self.index = index
+        self.name = name
+        self.proplist = {'device.description': description}
+        self.profile_list = [FakeCardProfile(p[0], p[1], len(p[2]), len(p[3])) for p in profiles]
+        self.profile_active = None
+        self.devices = {p[0]: (p[2], p[3]) for p in profiles}
+        self.timer = None
+
+    def copy(self):
+        """
+        Returns a copy of the card, like a client obtains when listing the cards.
+
+        :return: the copy
+        :rtype: FakeCardInfo
+        """
+
+        result = FakeCardInfo(self.index, self.name, self.proplist['device.description'], [])
+        result.profile_list = list(self.profile_list)
+        result.profile_active = self.profile_active
+        result.devices = self.devices
+        return result
+
+    def __repr__(self):
+        return "FakeCardInfo(%d, %s)" % (self.index, self.name)
+
+
+class FakeServerInfo(object):
+    """
+    The server information, as returned by server_info().
+    """
+
+    def __init__(self, default_source_name, default_sink_name):
+        """
+        Initializes the server information.
+
+        :param default_source_name: the name of the default source
+        :type default_source_name: str
+        :param default_sink_name: the name of the default sink
+        :type default_sink_name: str
+        """
+
+        self.server_name = "fake"
+        self.server_version = "0.0"
+        self.default_source_name = default_source_name
+        self.default_sink_name = default_sink_name
+
+
+class FakeEvent(object):
+    """
+    A subscription event, compatible with pulsectl.PulseEventInfo.
+    """
+
+    def __init__(self, facility, t, index):
+        """
+        Initializes the event.
+
+        :param facility: the facility (source|sink|card|...)
+        :type facility: str
+        :param t: the event type (new|change|remove)
+        :type t: str
+        :param index: the index of the affected object
+        :type index: int
+        """
+
+        self.facility = facility
+        self.t = t
+        self.index = index
+
+    def __repr__(self):
+        return "FakeEvent(%s, %s, %d)" % (self.facility, self.t, self.index)
+
+
+class FakePulseServer(object):
+    """
+    In-process stand-in for a PulseAudio server that models sources, sinks,
+    ports, volumes and defaults. Every call that a client makes counts as
+    one round trip and gets delayed by the configured latency.
+    """
+
+    def __init__(self, latency=0.0):
+        """
+        Initializes the server without any devices.
+
+        :param latency: the time in seconds that every call takes
+        :type latency: float
+        """
+
+        self.latency = latency
+        self.call_latency = dict()
+        self.card_delay = 0.0
+        self.sources = []
+        self.sinks = []
+        self.cards = []
+        self.streams = []
+        self.default_source_name = None
+        self.default_sink_name = None
+        self.calls = dict()
+        self._failures = dict()
+        self._next_index = {"source": 0, "sink": 0, "card": 0, "stream": 0}
+        self._connections = []
+        self._cond = threading.Condition()
+
+    def _add(self, cls, name, description, ports, channels, volume, proplist):
+        """
+        Adds a device.
+
+        :return: the new device
+        :rtype: FakeDevice
+        """
+
+        if description is None:
+            description = name
+        with self._cond:
+            device = cls(self._next_index[cls.kind], name, description, ports=ports, channels=channels,
+                         volume=volume, proplist=proplist)
+            self._next_index[cls.kind] += 1
+            if cls.kind == "source":
+                self.sources.append(device)
+                if self.default_source_name is None:
+                    self.default_source_name = name
+            else:
+                self.sinks.append(device)
+                if self.default_sink_name is None:
+                    self.default_sink_name = name
+            self._post(cls.kind, "new", device.index)
+        return device
+
+    def add_source(self, name, description=None, ports=None, channels=2, volume=1.0, proplist=None):
+        """
+        Adds a source, which becomes the default source if there is none.
+
+        :param name: the name of the source
+        :type name: str
+        :param description: the description, uses the name if None
+        :type description: str
+        :param ports: the list of (name, description) tuples of the ports
+        :type ports: list
+        :param channels: the number of channels
+        :type channels: int
+        :param volume: the initial volume
+        :type volume: float
+        :param proplist: the properties of the source
+        :type proplist: dict
+        :return: the source
+        :rtype: FakeSourceInfo
+        """
+
+        return self._add(FakeSourceInfo, name, description, ports, channels, volume, proplist)
+
+    def add_sink(self, name, description=None, ports=None, channels=2, volume=1.0, proplist=None):
+        """
+        Adds a sink, which becomes the default sink if there is none.
+
+        :param name: the name of the sink
+        :type name: str
+        :param description: the description, uses the name if None
+        :type description: str
+        :param ports: the list of (name, description) tuples of the ports
+        :type ports: list
+        :param channels: the number of channels
+        :type channels: int
+        :param volume: the initial volume
+        :type volume: float
+        :param proplist: the properties of the sink
+        :type proplist: dict
+        :return: the sink
+        :rtype: FakeSinkInfo
+        """
+
+        return self._add(FakeSinkInfo, name, description, ports, channels, volume, proplist)
+
+    def _remove(self, devices, name):
+        """
+        Removes the device with the specified name from the list.
+
+        :return: the removed device
+        :rtype: FakeDevice
+        """
+
+        with self._cond:
+            for i, device in enumerate(devices):
+                if device.name == name:
+                    del devices[i]
+                    self._post(device.kind, "remove", device.index)
+                    return device
+        raise FakePulseError("Unknown device: %s" % name)
+
+    def remove_source(self, name):
+        """
+        Removes the source. If it was the default source, the first remaining source becomes the default one.
+
+        :param name: the name of the source
+        :type name: str
+        """
+
+        self._remove(self.sources, name)
+        if self.default_source_name == name:
+            self.default_source_name = self.sources[0].name if len(self.sources) > 0 else None
+
+    def remove_sink(self, name):
+        """
+        Removes the sink. If it was the default sink, the first remaining sink becomes the default one.
+
+        :param name: the name of the sink
+        :type name: str
+        """
+
+        self._remove(self.sinks, name)
+        if self.default_sink_name == name:
+            self.default_sink_name = self.sinks[0].name if len(self.sinks) > 0 else None
+
+    def add_card(self, name, description=None, profiles=None, active=None):
+        """
+        Adds a card. Activating a profile of the card (see FakePulse.card_profile_set)
+        replaces the sources/sinks of the previous profile with the ones of the new
+        profile, which appear after card_delay seconds (e.g., for Bluetooth devices).
+
+        :param name: the name of the card
+        :type name: str
+        :param description: the description of the card, uses the name if None
+        :type description: str
+        :param profiles: the list of (name, description, sources, sinks) tuples of the profiles, see FakeCardInfo
+        :type profiles: list
+        :param active: the name of the initially active profile, uses the first one if None
+        :type active: str
+        :return: the card
+        :rtype: FakeCardInfo
+        """
+
+        with self._cond:
+            card = FakeCardInfo(self._next_index["card"], name, description or name, profiles or [])
+            self._next_index["card"] += 1
+            self.cards.append(card)
+            self._post("card", "new", card.index)
+        if len(card.profile_list) > 0:
+            self._activate(card, card.profile_list[0].name if active is None else active, 0.0)
+        return card
+
+    def _activate(self, card, profile, delay):
+        """
+        Activates the profile of the card, replacing the devices of the previous profile.
+
+        :param card: the server-side card
+        :type card: FakeCardInfo
+        :param profile: the name of the profile to activate
+        :type profile: str
+        :param delay: the time in seconds after which the devices of the new profile appear
+        :type delay: float
+        """
+
+        for p in card.profile_list:
+            if p.name == profile:
+                break
+        else:
+            raise FakePulseError("No such card profile: %s" % profile)
+        if card.timer is not None:
+            card.timer.cancel()
+            card.timer = None
+        if card.profile_active is not None:
+            sources, sinks = card.devices[card.profile_active.name]
+            for spec in sources:
+                if self.source(spec[0]) is not None:
+                    self.remove_source(spec[0])
+            for spec in sinks:
+                if self.sink(spec[0]) is not None:
+                    self.remove_sink(spec[0])
+        card.profile_active = p
+        self._post("card", "change", card.index)
+
+        def add():
+            sources, sinks = card.devices[profile]
+            for spec in sources:
+                self.add_source(spec[0], spec[1], ports=spec[2] if len(spec) > 2 else None)
+            for spec in sinks:
+                self.add_sink(spec[0], spec[1], ports=spec[2] if len(spec) > 2 else None)
+
+        if delay > 0:
+            card.timer = threading.Timer(delay, add)
+            card.timer.daemon = True
+            card.timer.start()
+        else:
+            add()
+
+    def add_stream(self, kind, device, name=None, application=None):
+        """
+        Adds a stream, i.e., a sink input (playback) or source output (recording).
+
+        :param kind: the type of device to connect the stream to (source|sink)
+        :type kind: str
+        :param device: the name of the source/sink
+        :type device: str
+        :param name: the name of the stream, uses the application name if None
+        :type name: str
+        :param application: the name (and binary) of the application
+        :type application: str
+        :return: the stream
+        :rtype: FakeStream
+        """
+
+        target = self.source(device) if kind == "source" else self.sink(device)
+        if target is None:
+            raise FakePulseError("Unknown %s: %s" % (kind, device))
+        proplist = dict()
+        if application is not None:
+            proplist['application.name'] = application
+            proplist['application.process.binary'] = application.lower()
+        with self._cond:
+            stream = FakeStream(self._next_index["stream"], name or application or "stream", kind, target.index,
+                                proplist=proplist)
+            self._next_index["stream"] += 1
+            self.streams.append(stream)
+            self._post("source_output" if kind == "source" else "sink_input", "new", stream.index)
+        return stream
+
+    def card(self, name):
+        """
+        Returns the (server-side) card with the specified name.
+
+        :param name: the name of the card
+        :type name: str
+        :return: the card, None if not found
+        :rtype: FakeCardInfo
+        """
+
+        for card in self.cards:
+            if card.name == name:
+                return card
+        return None
+
+    def source(self, name):
+        """
+        Returns the (server-side) source with the specified name.
+
+        :param name: the name of the source
+        :type name: str
+        :return: the source, None if not found
+        :rtype: FakeSourceInfo
+        """
+
+        for device in self.sources:
+            if device.name == name:
+                return device
+        return None
+
+    def sink(self, name):
+        """
+        Returns the (server-side) sink with the specified name.
+
+        :param name: the name of the sink
+        :type name: str
+        :return: the sink, None if not found
+        :rtype: FakeSinkInfo
+        """
+
+        for device in self.sinks:
+            if device.name == name:
+                return device
+        return None
+
+    def fail(self, call, error=None, times=1):
+        """
+        Makes the next call(s) of the specified type fail, e.g., for testing the rollback.
+
+        :param call: the name of the call, e.g., port_set
+        :type call: str
+        :param error: the exception to raise, uses a FakePulseError if None
+        :type error: Exception
+        :param times: the number of calls to fail
+        :type times: int
+        """
+
+        if error is None:
+            error = FakePulseError("Injected failure: %s" % call)
+        self._failures[call] = (error, times)
+
+    @property
+    def round_trips(self):
+        """
+        Returns the total number of calls that clients made.
+
+        :return: the number of calls
+        :rtype: int
+        """
+
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        """
+        Resets the call counters.
+        """
+
+        self.calls = dict()
+
+    def delay(self, name):
+        """
+        Returns the time that the call takes: the latency configured for the
+        call in call_latency (e.g., for slow port switches) or the latency.
+
+        :param name: the name of the call
+        :type name: str
+        :return: the time in seconds
+        :rtype: float
+        """
+
+        return self.call_latency.get(name, self.latency)
+
+    def _call(self, name, blocking=True):
+        """
+        Accounts for a call: counts it, delays it by the latency and raises an injected failure.
+
+        :param name: the name of the call
+        :type name: str
+        :param blocking: whether to sleep for the latency, asynchronous connections await it themselves
+        :type blocking: bool
+        """
+
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.delay(name)
+        if blocking and (delay > 0):
+            time.sleep(delay)
+        if name in self._failures:
+            error, times = self._failures[name]
+            if times <= 1:
+                del self._failures[name]
+            else:
+                self._failures[name] = (error, times - 1)
+            raise error
+
+    def _device(self, obj):
+        """
+        Returns the server-side device for the client-side one.
+
+        :param obj: the client-side source or sink
+        :type obj: FakeDevice
+        :return: the server-side device
+        :rtype: FakeDevice
+        """
+
+        devices = self.sources if obj.kind == "source" else self.sinks
+        for device in devices:
+            if device.index == obj.index:
+                return device
+        raise FakePulseError("No such %s: %d" % (obj.kind, obj.index))
+
+    def _post(self, facility, t, index):
+        """
+        Sends the event to all subscribed connections.
+
+        :param facility: the facility
+        :type facility: str
+        :param t: the event type
+        :type t: str
+        :param index: the index of the affected object
+        :type index: int
+        """
+
+        with self._cond:
+            for conn in self._connections:
+                if facility in conn.event_masks:
+                    conn.events.append(FakeEvent(facility, t, index))
+            self._cond.notify_all()
+
+    def connect(self):
+        """
+        Opens a new connection to the server.
+
+        :return: the connection
+        :rtype: FakePulse
+        """
+
+        return FakePulse(self)
+
+
+class FakePulse(object):
+    """
+    Connection to a FakePulseServer, offering the subset of the
+    pulsectl.Pulse API used by this library. Like with pulsectl, the listed
+    objects are copies that changes don't update, only listing them again does.
+    """
+
+    def __init__(self, server, blocking=True):
+        """
+        Connects to the server.
+
+        :param server: the server to connect to
+        :type server: FakePulseServer
+        :param blocking: whether the calls sleep for the latency, see FakePulseAsync
+        :type blocking: bool
+        """
+
+        server._call("connect", blocking=blocking)
+        self.server = server
+        self.blocking = blocking
+        self.connected = True
+        self.events = []
+        self.event_masks = ()
+        self._callback = None
+        self._stop = False
+        with server._cond:
+            server._connections.append(self)
+
+    def _call(self, name):
+        """
+        Performs a round trip to the server.
+
+        :param name: the name of the call
+        :type name: str
+        """
+
+        if not self.connected:
+            raise FakePulseDisconnected("Not connected")
+        self.server._call(name, blocking=self.blocking)
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+        with self.server._cond:
+            if self in self.server._connections:
+                self.server._connections.remove(self)
+            self.server._cond.notify_all()
+        self.connected = False
+
+    def server_info(self):
+        """
+        Returns the server information.
+
+        :return: the information
+        :rtype: FakeServerInfo
+        """
+
+        self._call("server_info")
+        return FakeServerInfo(self.server.default_source_name, self.server.default_sink_name)
+
+    def source_list(self):
+        """
+        Returns the sources.
+
+        :return: the list of FakeSourceInfo objects
+        :rtype: list
+        """
+
+        self._call("source_list")
+        return [d.copy() for d in self.server.sources]
+
+    def sink_list(self):
+        """
+        Returns the sinks.
+
+        :return: the list of FakeSinkInfo objects
+        :rtype: list
+        """
+
+        self._call("sink_list")
+        return [d.copy() for d in self.server.sinks]
+
+    def default_set(self, obj):
+        """
+        Makes the source/sink the default one.
+
+        :param obj: the source/sink
+        :type obj: FakeDevice
+        """
+
+        self._call("default_set")
+        device = self.server._device(obj)
+        if device.kind == "source":
+            self.server.default_source_name = device.name
+        else:
+            self.server.default_sink_name = device.name
+        self.server._post("server", "change", 0)
+
+    def port_set(self, obj, port):
+        """
+        Activates the port of the source/sink.
+
+        :param obj: the source/sink
+        :type obj: FakeDevice
+        :param port: the port or its name
+        :type port: FakePort or str
+        """
+
+        self._call("port_set")
+        device = self.server._device(obj)
+        name = port if isinstance(port, str) else port.name
+        for p in device.port_list:
+            if p.name == name:
+                device.port_active = p
+                break
+        else:
+            raise FakePulseError("No such port: %s" % name)
+        self.server._post(device.kind, "change", device.index)
+
+    def volume_set(self, obj, vol):
+        """
+        Sets the volume of the source/sink.
+
+        :param obj: the source/sink
+        :type obj: FakeDevice
+        :param vol: the volume
+        :type vol: FakeVolume
+        """
+
+        self._call("volume_set")
+        device = self.server._device(obj)
+        if len(vol.values) != device.channel_count:
+            raise FakePulseError("Expected %d channels, got %d" % (device.channel_count, len(vol.values)))
+        device.volume = FakeVolume(list(vol.values))
+        self.server._post(device.kind, "change", device.index)
+
+    def mute(self, obj, mute=True):
+        """
+        Mutes/unmutes the source/sink.
+
+        :param obj: the source/sink
+        :type obj: FakeDevice
+        :param mute: whether to mute
+        :type mute: bool
+        """
+
+        self._call("mute")
+        device = self.server._device(obj)
+        device.mute = int(mute)
+        self.server._post(device.kind, "change", device.index)
+
+    def sink_input_list(self):
+        """
+        Returns the playback streams.
+
+        :return: the list of sink inputs
+        :rtype: list
+        """
+
+        self._call("sink_input_list")
+        return [st.copy() for st in self.server.streams if st.kind == "sink"]
+
+    def source_output_list(self):
+        """
+        Returns the recording streams.
+
+        :return: the list of source outputs
+        :rtype: list
+        """
+
+        self._call("source_output_list")
+        return [st.copy() for st in self.server.streams if st.kind == "source"]
+
+    def _move(self, kind, index, device_index):
+        """
+        Moves the stream to the source/sink.
+
+        :param kind: the type of device (source|sink)
+        :type kind: str
+        :param index: the index of the stream
+        :type index: int
+        :param device_index: the index of the source/sink
+        :type device_index: int
+        """
+
+        self._call("source_output_move" if kind == "source" else "sink_input_move")
+        devices = self.server.sources if kind == "source" else self.server.sinks
+        if not any(d.index == device_index for d in devices):
+            raise FakePulseError("No such %s: %d" % (kind, device_index))
+        for st in self.server.streams:
+            if (st.kind == kind) and (st.index == index):
+                if kind == "source":
+                    st.source = device_index
+                else:
+                    st.sink = device_index
+                self.server._post("source_output" if kind == "source" else "sink_input", "change", index)
+                return
+        raise FakePulseError("No such stream: %d" % index)
+
+    def sink_input_move(self, index, sink_index):
+        """
+        Moves the playback stream to the sink.
+
+        :param index: the index of the sink input
+        :type index: int
+        :param sink_index: the index of the sink
+        :type sink_index: int
+        """
+
+        self._move("sink", index, sink_index)
+
+    def source_output_move(self, index, source_index):
+        """
+        Moves the recording stream to the source.
+
+        :param index: the index of the source output
+        :type index: int
+        :param source_index: the index of the source
+        :type source_index: int
+        """
+
+        self._move("source", index, source_index)
+
+    def card_list(self):
+        """
+        Returns the cards.
+
+        :return: the list of cards
+        :rtype: list
+        """
+
+        self._call("card_list")
+        return [c.copy() for c in self.server.cards]
+
+    def card_profile_set(self, card, profile):
+        """
+        Activates the profile of the card.
+
+        :param card: the card
+        :type card: FakeCardInfo
+        :param profile: the profile or its name
+        :type profile: FakeCardProfile or str
+        """
+
+        self._call("card_profile_set")
+        for c in self.server.cards:
+            if c.index == card.index:
+                break
+        else:
+            raise FakePulseError("No such card: %d" % card.index)
+        self.server._activate(c, profile if isinstance(profile, str) else profile.name, self.server.card_delay)
+
+    def event_mask_set(self, *masks):
+        """
+        Subscribes to the events of the specified facilities.
+
+        :param masks: the facilities (source|sink|server|card)
+        """
+
+        self._call("event_mask_set")
+        self.event_masks = masks
+
+    def event_callback_set(self, func):
+        """
+        Sets the function that gets called with the events in event_listen().
+
+        :param func: the callback
+        """
+
+        self._callback = func
+
+    def event_listen_stop(self):
+        """
+        Stops event_listen(), can be called from another thread.
+        """
+
+        with self.server._cond:
+            self._stop = True
+            self.server._cond.notify_all()
+
+    def event_listen(self, timeout=None):
+        """
+        Waits for events and passes them on to the callback, until the callback
+        stops the loop, the timeout expires or event_listen_stop() gets called.
+
+        :param timeout: the timeout in seconds, None to wait indefinitely
+        :type timeout: float
+        """
+
+        stop = loop_stop()
+        end = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with self.server._cond:
+                while self.connected and (len(self.events) == 0) and not self._stop:
+                    remaining = None if end is None else end - time.perf_counter()
+                    if (remaining is not None) and (remaining <= 0):
+                        return
+                    self.server._cond.wait(remaining)
+                if self._stop:
+                    self._stop = False
+                    return
+                if not self.connected:
+                    raise FakePulseDisconnected("Not connected")
+                events = self.events
+                self.events = []
+            for i, event in enumerate(events):
+                try:
+                    if self._callback is not None:
+                        self._callback(event)
+                except stop:
+                    with self.server._cond:
+                        self.events = events[i + 1:] + self.events
+                    return
+
+
+class FakePulseAsync(object):
+    """
+    Asynchronous connection to a FakePulseServer, offering the subset of the
+    pulsectl_asyncio.PulseAsync API used by pypulseprofiles.aio. The latency
+    of the calls gets awaited rather than slept, i.e., concurrent calls overlap.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the (not yet connected) connection.
+
+        :param server: the server to connect to
+        :type server: FakePulseServer
+        """
+
+        self.server = server
+        self._pulse = None
+
+    async def _call(self, name, *args):
+        """
+        Performs the call of the synchronous connection after awaiting its latency.
+
+        :param name: the name of the call
+        :type name: str
+        :param args: the arguments for the call
+        :return: the result of the call
+        """
+
+        import asyncio
+
+        delay = self.server.delay(name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return getattr(self._pulse, name)(*args)
+
+    async def connect(self):
+        """
+        Connects to the server.
+        """
+
+        import asyncio
+
+        delay = self.server.delay("connect")
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._pulse = FakePulse(self.server, blocking=False)
+
+    @property
+    def connected(self):
+        """
+        Returns whether the connection is open.
+
+        :return: True if connected
+        :rtype: bool
+        """
+
+        return (self._pulse is not None) and self._pulse.connected
+
+    def close(self):
+        """
+        Closes the connection.
+        """
+
+        if self._pulse is not None:
+            self._pulse.close()
+
+    async def server_info(self):
+        return await self._call("server_info")
+
+    async def source_list(self):
+        return await self._call("source_list")
+
+    async def sink_list(self):
+        return await self._call("sink_list")
+
+    async def default_set(self, obj):
+        return await self._call("default_set", obj)
+
+    async def port_set(self, obj, port):
+        return await self._call("port_set", obj, port)
+
+    async def volume_set(self, obj, vol):
+        return await self._call("volume_set", obj, vol)
+
+    async def mute(self, obj, mute=True):
+        return await self._call("mute", obj, mute)
+
+
+def fake_scenario(sources=2, sinks=2, ports=2, latency=0.0, seed=1):
+    """
+    Generates a fake server with the specified number of devices, e.g., for
+    benchmarking with hundreds of devices/ports. The number of channels and
+    the volumes are random (but reproducible via the seed).
+
+    :param sources: the number of sources
+    :type sources: int
+    :param sinks: the number of sinks
+    :type sinks: int
+    :param ports: the number of ports per device
+    :type ports: int
+    :param latency: the time in seconds that every call takes
+    :type latency: float
+    :param seed: the seed for the random number generator
+    :type seed: int
+    :return: the server
+    :rtype: FakePulseServer
+    """
+
+    rnd = random.Random(seed)
+    result = FakePulseServer()
+    for i in range(sources):
+        result.add_source("alsa_input.fake-%03d.analog-stereo" % i, "Fake Input %d" % i,
+                          ports=[("analog-input-%d" % n, "Input %d" % n) for n in range(ports)],
+                          channels=rnd.choice([1, 2]), volume=round(rnd.uniform(0.2, 1.0), 2),
+                          proplist={'device.bus': rnd.choice(["pci", "usb", "bluetooth"])})
+    for i in range(sinks):
+        result.add_sink("alsa_output.fake-%03d.analog-stereo" % i, "Fake Output %d" % i,
+                        ports=[("analog-output-%d" % n, "Output %d" % n) for n in range(ports)],
+                        channels=rnd.choice([2, 2, 6]), volume=round(rnd.uniform(0.2, 1.0), 2),
+                        proplist={'device.bus': rnd.choice(["pci", "usb", "bluetooth"])})
+    result.latency = latency
+    return result
+
+
+_fake_servers = dict()
+""" the servers that the "fake" backend connects to (name -> server, None for the default one). """
+
+_fake_servers_lock = threading.Lock()
+""" guards the creation of the servers. """
+
+
+def fake_server(name=None):
+    """
+    Returns the server that the "fake" backend connects to, generates a
+    small default scenario if none has been set.
+
+    :param name: the name of the server, None for the default one
+    :type name: str
+    :return: the server
+    :rtype: FakePulseServer
+    """
+
+    with _fake_servers_lock:
+        if name not in _fake_servers:
+            _fake_servers[name] = fake_scenario()
+        return _fake_servers[name]
+
+
+def set_fake_server(server, name=None):
+    """
+    Sets the server that the "fake" backend connects to.
+
+    :param server: the server, None to revert to the default scenario
+    :type server: FakePulseServer
+    :param name: the name of the server, None for the default one
+    :type name: str
+    """
+
+    with _fake_servers_lock:
+        if server is None:
+            _fake_servers.pop(name, None)
+        else:
+            _fake_servers[name] = server
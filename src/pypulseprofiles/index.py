@@ -0,0 +1,223 @@
+import os
+from pypulseprofiles.config import config_dir, expand_config
+from pypulseprofiles.metrics import timer
+
+INDEX_FILE = ".index.json"
+""" the name of the index file in the config directory. """
+
+MAX_COMPILED = 4
+""" the maximum number of compiled profiles (i.e., device setups) to keep per profile. """
+
+
+def index_file():
+    """
+    Returns the file for the profile index ($HOME/.config/python-pulseaudio-profiles/.index.json).
+
+    :return: the index file
+    :rtype: str
+    """
+
+    return os.path.join(config_dir(), INDEX_FILE)
+
+
+class ProfileIndex(object):
+    """
+    On-disk cache of the parsed profiles stored in the config directory.
+    Entries are keyed by the modification time and size of the profile files,
+    i.e., only profiles that got added or modified since they were last
+    indexed need parsing.
+    """
+
+    def __init__(self, filename=None):
+        """
+        Initializes the index and loads it from disk.
+
+        :param filename: the index file to use, uses index_file() if None
+        :type filename: str
+        """
+
+        if filename is None:
+            filename = index_file()
+        self.filename = filename
+        self.entries = dict()
+        self.modified = False
+        self.load()
+
+    def load(self):
+        """
+        Loads the index from disk. A missing or corrupt index is treated as empty.
+        """
+
+        import json
+
+        self.entries = dict()
+        self.modified = False
+        try:
+            with timer("read", "index"), open(self.filename, "r") as index_file:
+                entries = json.load(index_file)
+            if isinstance(entries, dict):
+                self.entries = entries
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """
+        Writes the index to disk if it was modified, replacing the existing file atomically.
+        """
+
+        import json
+        import tempfile
+
+        if not self.modified:
+            return
+        directory = os.path.dirname(self.filename)
+        if not os.path.isdir(directory):
+            return
+        fd, tmp = tempfile.mkstemp(prefix=".index-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(self.entries, tmp_file)
+            os.replace(tmp, self.filename)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.modified = False
+
+    def profile(self, name, parse):
+        """
+        Returns the profile, parsing the file only if it is not indexed or changed.
+
+        :param name: the config name
+        :type name: str
+        :param parse: the function for parsing the profile file (filename -> profile)
+        :type parse: function
+        :return: the profile
+        :rtype: dict
+        """
+
+        filename = expand_config(name)
+        st = os.stat(filename)
+        entry = self._entry(name, st)
+        if entry is not None:
+            return entry['profile']
+        profile = parse(filename)
+        self.update(name, profile, st=st)
+        return profile
+
+    def _entry(self, name, st):
+        """
+        Returns the entry for the profile if it is still up-to-date.
+
+        :param name: the config name
+        :type name: str
+        :param st: the stat result of the config file
+        :type st: os.stat_result
+        :return: the entry, None if not indexed or outdated
+        :rtype: dict
+        """
+
+        entry = self.entries.get(name)
+        if isinstance(entry, dict) and (entry.get('mtime') == st.st_mtime_ns) and (entry.get('size') == st.st_size) \
+                and ('profile' in entry):
+            return entry
+        return None
+
+    def compiled(self, name, fingerprint):
+        """
+        Returns the compiled profile for the device setup.
+
+        :param name: the config name
+        :type name: str
+        :param fingerprint: the fingerprint of the available devices
+        :type fingerprint: str
+        :return: the compiled profile, None if not available or the profile changed
+        :rtype: dict
+        """
+
+        entry = self._entry(name, os.stat(expand_config(name)))
+        if entry is None:
+            return None
+        return entry.get('compiled', dict()).get(fingerprint)
+
+    def update_compiled(self, name, compiled):
+        """
+        Stores the compiled profile with the (indexed) profile, discarding the
+        oldest compiled ones if there are more than MAX_COMPILED.
+
+        :param name: the config name
+        :type name: str
+        :param compiled: the compiled profile, see compile_profile
+        :type compiled: dict
+        """
+
+        entry = self.entries.get(name)
+        if not isinstance(entry, dict):
+            return
+        all_compiled = entry.setdefault('compiled', dict())
+        all_compiled.pop(compiled['fingerprint'], None)
+        all_compiled[compiled['fingerprint']] = compiled
+        while len(all_compiled) > MAX_COMPILED:
+            del all_compiled[next(iter(all_compiled))]
+        self.modified = True
+
+    def update(self, name, profile, st=None):
+        """
+        Stores the profile in the index.
+
+        :param name: the config name
+        :type name: str
+        :param profile: the profile that was stored in the config file
+        :type profile: dict
+        :param st: the stat result of the config file, determines it if None
+        :type st: os.stat_result
+        """
+
+        if st is None:
+            st = os.stat(expand_config(name))
+        self.entries[name] = {'mtime': st.st_mtime_ns, 'size': st.st_size, 'profile': profile}
+        self.modified = True
+
+    def remove(self, name):
+        """
+        Removes the profile from the index.
+
+        :param name: the config name
+        :type name: str
+        """
+
+        if name in self.entries:
+            del self.entries[name]
+            self.modified = True
+
+    def prune(self, names):
+        """
+        Removes all profiles from the index that are not in the list of names.
+
+        :param names: the names of the existing configs
+        :type names: list
+        """
+
+        names = set(names)
+        for name in list(self.entries):
+            if name not in names:
+                self.remove(name)
+
+
+_profile_index = None
+""" the index used by the current process. """
+
+
+def profile_index():
+    """
+    Returns the index for the profiles in the config directory, loads it on first use.
+
+    :return: the index
+    :rtype: ProfileIndex
+    """
+
+    global _profile_index
+
+    if (_profile_index is None) or (_profile_index.filename != index_file()):
+        _profile_index = ProfileIndex()
+    return _profile_index
@@ -1,7 +1,9 @@
 import argparse
 import traceback
-import yaml
-from pypulseprofiles.core import pulse_info, APPLICATION_NAME
+from pypulseprofiles.core import pulse_info, pulse_info_stream, output_data, output_entries, \
+    INFO_FIELDS, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from pypulseprofiles.control import control_request, control_stream, ControlUnavailable
+from pypulseprofiles.metrics import cli_timings
 
 
 def main(args=None):
@@ -14,15 +16,44 @@ def main(args=None):
     """
 
     parser = argparse.ArgumentParser(
-        description='Outputs PulseAudio information in YAML format',
+        description='Outputs PulseAudio information in YAML or JSON format',
         prog="ppp-info")
     parser.add_argument("--list_sources", action="store_true", dest="list_sources", help="whether to list all the available source")
     parser.add_argument("--list_sinks", action="store_true", dest="list_sinks", help="whether to list all the available sinks")
     parser.add_argument("--volume", action="store_true", dest="volume", help="whether to include the (average) volume across all channels")
     parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to be more verbose in the output")
+    parser.add_argument("--fields", metavar="FIELD", dest="fields", choices=INFO_FIELDS, nargs="+", default=None, help="the fields to output for sources/sinks (" + ", ".join(INFO_FIELDS) + "), overrides --volume")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT, help="the output format")
+    parser.add_argument("--stream", action="store_true", dest="stream", help="outputs each source/sink as soon as it is available, as separate YAML document, JSON array element or JSON line")
+    parser.add_argument("--server", metavar="SERVER", dest="servers", nargs="+", default=None, help="the PulseAudio servers to query concurrently (e.g., unix:/path/to/socket or tcp:host), outputs the information, time and outcome per server")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
     parsed = parser.parse_args(args=args)
-    print(yaml.dump(pulse_info(list_sources=parsed.list_sources, list_sinks=parsed.list_sinks,
-                               volume=parsed.volume, verbose=parsed.verbose)))
+    with cli_timings(parsed.timings):
+        options = dict(list_sources=parsed.list_sources, list_sinks=parsed.list_sinks,
+                       volume=parsed.volume, verbose=parsed.verbose, fields=parsed.fields)
+        if parsed.servers is not None:
+            from pypulseprofiles.multi import pulse_info_servers
+            result = pulse_info_servers(parsed.servers, **options)
+            for outcome in result['servers']:
+                outcome['time'] = round(outcome['time'] * 1000.0, 2)
+                if 'result' in outcome:
+                    outcome['info'] = outcome.pop('result')
+            result['total'] = round(result['total'] * 1000.0, 2)
+            output_data(result, parsed.output_format)
+            if result['failed'] > 0:
+                raise Exception("Failed to query %d of %d server(s)" % (result['failed'], len(result['servers'])))
+        elif parsed.stream:
+            try:
+                entries = control_stream("info_stream", **options)
+            except ControlUnavailable:
+                entries = pulse_info_stream(**options)
+            output_entries(entries, parsed.output_format)
+        else:
+            try:
+                info = control_request("info", **options)
+            except ControlUnavailable:
+                info = pulse_info(**options)
+            output_data(info, parsed.output_format)
 
 
 def sys_main():
@@ -1,6 +1,7 @@
 import argparse
 import traceback
-from pypulseprofiles.core import pulse_list, APPLICATION_NAME
+from pypulseprofiles.core import pulse_list, OUTPUT_FORMATS, APPLICATION_NAME
+from pypulseprofiles.metrics import cli_timings
 
 
 def main(args=None):
@@ -16,8 +17,11 @@ def main(args=None):
         description='Lists all the available profiles stored in %s.' % ("$HOME/.config/" + APPLICATION_NAME),
         prog="ppp-list")
     parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to output the content of the profiles as well")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default=None, help="the machine-readable format to output the profiles in, one entry per profile; outputs plain text if not provided")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
     parsed = parser.parse_args(args=args)
-    pulse_list(verbose=parsed.verbose)
+    with cli_timings(parsed.timings):
+        pulse_list(verbose=parsed.verbose, output_format=parsed.output_format)
 
 
 def sys_main():
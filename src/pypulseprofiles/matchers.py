@@ -0,0 +1,239 @@
+from collections import OrderedDict
+
+MATCHER_KEYS = ["glob", "regex", "properties"]
+""" the keys that device/port matchers can combine (all of them have to match). """
+
+MAX_MATCHERS = 256
+""" the maximum number of compiled matchers to cache, the least recently used ones get discarded. """
+
+_matchers = OrderedDict()
+""" the compiled matchers: matcher key (see matcher_key) -> DeviceMatcher, least recently used first. """
+
+
+def matcher_key(spec):
+    """
+    Returns the canonical key of the matcher dictionary, which is the same for
+    matchers with the same content (e.g., when shared by several profiles).
+
+    :param spec: the matcher dictionary
+    :type spec: dict
+    :return: the key
+    :rtype: str
+    """
+
+    import json
+    return json.dumps(spec, sort_keys=True)
+
+
+def _glob_regex(pattern):
+    """
+    Compiles the glob pattern.
+
+    :param pattern: the glob pattern
+    :type pattern: str
+    :return: the compiled regular expression, None if the pattern doesn't contain any wildcards
+    """
+
+    import fnmatch
+    import re
+
+    if not any(c in pattern for c in "*?["):
+        return None
+    return re.compile(fnmatch.translate(pattern))
+
+
+def _description(obj):
+    """
+    Returns the description of the device, port or card (cards only have it in their properties).
+
+    :param obj: the device, port or card
+    :return: the description, None if not available
+    :rtype: str
+    """
+
+    result = getattr(obj, "description", None)
+    if result is None:
+        result = getattr(obj, "proplist", dict()).get("device.description")
+    return result
+
+
+class DeviceMatcher(object):
+    """
+    Compiled matcher for the device/port fields of profiles, which can be a
+    dictionary instead of the exact name or description:
+
+    - glob: glob pattern for the name or description
+    - regex: regular expression that the name or description must contain
+    - properties: dictionary of property (e.g., alsa.card_name or device.bus) -> glob pattern for its value
+
+    If several keys are present, all of them have to match.
+    """
+
+    def __init__(self, spec):
+        """
+        Compiles the matcher.
+
+        :param spec: the matcher dictionary
+        :type spec: dict
+        """
+
+        import re
+
+        if not isinstance(spec, dict) or (len(spec) == 0):
+            raise Exception("Matcher must be a non-empty dictionary: %s" % str(spec))
+        unknown = [k for k in spec if k not in MATCHER_KEYS]
+        if len(unknown) > 0:
+            raise Exception("Unknown matcher key(s) %s, available: %s" % (", ".join(unknown), ", ".join(MATCHER_KEYS)))
+
+        self.spec = spec
+        # identifies matchers with the same content, e.g., for sharing their results
+        self.key = matcher_key(spec)
+        self.glob = None
+        self.glob_regex = None
+        self.regex = None
+        self.properties = []
+        try:
+            if "glob" in spec:
+                self.glob = str(spec['glob'])
+                self.glob_regex = _glob_regex(self.glob)
+            if "regex" in spec:
+                self.regex = re.compile(str(spec['regex']))
+            if "properties" in spec:
+                if not isinstance(spec['properties'], dict):
+                    raise Exception("'properties' must be a dictionary of property -> glob pattern")
+                for prop in sorted(spec['properties']):
+                    pattern = str(spec['properties'][prop])
+                    self.properties.append((prop, pattern, _glob_regex(pattern)))
+        except re.error as e:
+            raise Exception("Invalid matcher %s: %s" % (str(spec), str(e)))
+
+    def literal(self):
+        """
+        Returns the exact name or description that the glob represents if it
+        doesn't contain any wildcards, for looking it up directly.
+
+        :return: the name or description, None if not applicable
+        :rtype: str
+        """
+
+        if (self.glob is not None) and (self.glob_regex is None):
+            return self.glob
+        return None
+
+    def matches(self, obj):
+        """
+        Checks whether the device, port or card matches.
+
+        :param obj: the object to check
+        :return: True if a match
+        :rtype: bool
+        """
+
+        name = obj.name
+        desc = _description(obj)
+        if desc is None:
+            desc = name
+        if self.glob is not None:
+            if self.glob_regex is None:
+                if (self.glob != name) and (self.glob != desc):
+                    return False
+            elif (self.glob_regex.match(name) is None) and (self.glob_regex.match(desc) is None):
+                return False
+        if self.regex is not None:
+            if (self.regex.search(name) is None) and (self.regex.search(desc) is None):
+                return False
+        if len(self.properties) > 0:
+            proplist = getattr(obj, "proplist", None)
+            if proplist is None:
+                return False
+            for prop, pattern, regex in self.properties:
+                value = proplist.get(prop)
+                if value is None:
+                    return False
+                if regex is None:
+                    if value != pattern:
+                        return False
+                elif not regex.match(value):
+                    return False
+        return True
+
+    def name_test(self):
+        """
+        Returns the test for names/descriptions if the matcher consists of just
+        a glob pattern (with wildcards) or just a regular expression, which
+        allows scanning the names/descriptions of all devices in one go.
+
+        :return: the function that returns a match object for a name/description, None if not applicable
+        :rtype: function
+        """
+
+        if len(self.properties) > 0:
+            return None
+        if (self.glob_regex is not None) and (self.regex is None):
+            return self.glob_regex.match
+        if (self.glob is None) and (self.regex is not None):
+            return self.regex.search
+        return None
+
+    def literal_property(self):
+        """
+        Returns the first property whose pattern doesn't contain any wildcards,
+        for narrowing down the candidates via an index of the property values.
+
+        :return: tuple of property and value, None if not applicable
+        :rtype: tuple
+        """
+
+        for prop, pattern, regex in self.properties:
+            if regex is None:
+                return prop, pattern
+        return None
+
+    def __str__(self):
+        """
+        Returns a short description of the matcher.
+
+        :return: the description
+        :rtype: str
+        """
+
+        return self.key
+
+
+def is_matcher(spec):
+    """
+    Checks whether the device/port field of a profile is a matcher rather than
+    an exact name or description.
+
+    :param spec: the field to check
+    :return: True if a matcher dictionary
+    :rtype: bool
+    """
+
+    return isinstance(spec, dict)
+
+
+def compile_matcher(spec):
+    """
+    Returns the compiled matcher for the matcher dictionary. The matchers get
+    cached by content (see matcher_key) in a small LRU cache, i.e., profiles
+    with the same matcher and profiles that get parsed again share them.
+
+    :param spec: the matcher dictionary of the device/port field
+    :type spec: dict
+    :return: the matcher
+    :rtype: DeviceMatcher
+    """
+
+    if not isinstance(spec, dict):
+        return DeviceMatcher(spec)
+    key = matcher_key(spec)
+    matcher = _matchers.get(key)
+    if matcher is not None:
+        _matchers.move_to_end(key)
+        return matcher
+    matcher = DeviceMatcher(spec)
+    _matchers[key] = matcher
+    if len(_matchers) > MAX_MATCHERS:
+        _matchers.popitem(last=False)
+    return matcher
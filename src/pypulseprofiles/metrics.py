@@ -0,0 +1,310 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_ENV = "PPP_PROFILE"
+""" the environment variable with the file to dump the cProfile statistics of the command-line tools to. """
+
+LIST_CALLS = ["server_info", "source_list", "sink_list", "card_list", "sink_input_list", "source_output_list"]
+""" the methods of the connection that query the server state. """
+
+SET_CALLS = ["default_set", "port_set", "volume_set", "mute", "card_profile_set", "sink_input_move", "source_output_move"]
+""" the methods of the connection that change the server state. """
+
+METRICS_FORMATS = ["openmetrics", "json"]
+""" the formats for exporting the metrics. """
+
+_enabled = False
+""" whether the metrics get recorded. """
+
+_metrics = dict()
+""" the recorded metrics: (category, operation) -> [count, total, max]. """
+
+_lock = threading.Lock()
+""" for updating the metrics from several threads (see pypulseprofiles.multi). """
+
+
+class _NoTimer(object):
+    """
+    The context manager that timer() returns while the metrics are disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_no_timer = _NoTimer()
+
+
+class _Timer(object):
+    """
+    Context manager that records the time spent in its block.
+    """
+
+    def __init__(self, category, operation):
+        """
+        Initializes the timer.
+
+        :param category: the category of the operation (connect|list|set|read)
+        :type category: str
+        :param operation: the name of the operation
+        :type operation: str
+        """
+
+        self.category = category
+        self.operation = operation
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        metrics_record(self.category, self.operation, time.perf_counter() - self.start)
+        return False
+
+
+def enable_metrics(enabled=True):
+    """
+    Turns the recording of the metrics on or off. While disabled, connections
+    don't get instrumented and timer() only returns a shared no-op context manager.
+
+    :param enabled: whether to record the metrics
+    :type enabled: bool
+    """
+
+    global _enabled
+    _enabled = enabled
+
+
+def metrics_enabled():
+    """
+    Returns whether the metrics get recorded.
+
+    :return: True if enabled
+    :rtype: bool
+    """
+
+    return _enabled
+
+
+def metrics_record(category, operation, duration, count=1):
+    """
+    Records the duration of an operation.
+
+    :param category: the category of the operation (connect|list|set|read)
+    :type category: str
+    :param operation: the name of the operation
+    :type operation: str
+    :param duration: the time in seconds
+    :type duration: float
+    :param count: the number of operations the duration covers
+    :type count: int
+    """
+
+    key = (category, operation)
+    with _lock:
+        entry = _metrics.get(key)
+        if entry is None:
+            _metrics[key] = [count, duration, duration]
+        else:
+            entry[0] += count
+            entry[1] += duration
+            if duration > entry[2]:
+                entry[2] = duration
+
+
+def timer(category, operation):
+    """
+    Returns a context manager that records the time spent in its block (if enabled).
+
+    :param category: the category of the operation (connect|list|set|read)
+    :type category: str
+    :param operation: the name of the operation
+    :type operation: str
+    :return: the context manager
+    """
+
+    if not _enabled:
+        return _no_timer
+    return _Timer(category, operation)
+
+
+def metrics_reset():
+    """
+    Discards the recorded metrics.
+    """
+
+    with _lock:
+        _metrics.clear()
+
+
+def metrics_data():
+    """
+    Returns the recorded metrics.
+
+    :return: list of dictionaries with category, operation, count, total and max (times in seconds), sorted by category and operation
+    :rtype: list
+    """
+
+    with _lock:
+        items = sorted((key, list(value)) for key, value in _metrics.items())
+    return [{'category': key[0], 'operation': key[1], 'count': value[0], 'total': value[1], 'max': value[2]}
+            for key, value in items]
+
+
+def metrics_dumps(metrics_format="openmetrics"):
+    """
+    Exports the recorded metrics, e.g., for scraping the control server.
+
+    :param metrics_format: the format to use (openmetrics|json)
+    :type metrics_format: str
+    :return: the metrics
+    :rtype: str
+    """
+
+    data = metrics_data()
+    if metrics_format == "json":
+        import json
+        return json.dumps(data, indent=2)
+    elif metrics_format == "openmetrics":
+        lines = ["# TYPE ppp_operation_seconds summary",
+                 "# UNIT ppp_operation_seconds seconds",
+                 "# HELP ppp_operation_seconds Time spent in PulseAudio calls and profile reads."]
+        for entry in data:
+            labels = '{category="%s",operation="%s"}' % (entry['category'], entry['operation'])
+            lines.append("ppp_operation_seconds_count%s %d" % (labels, entry['count']))
+            lines.append("ppp_operation_seconds_sum%s %.9f" % (labels, entry['total']))
+        lines.append("# TYPE ppp_operation_max_seconds gauge")
+        lines.append("# UNIT ppp_operation_max_seconds seconds")
+        lines.append("# HELP ppp_operation_max_seconds Longest PulseAudio call or profile read.")
+        for entry in data:
+            labels = '{category="%s",operation="%s"}' % (entry['category'], entry['operation'])
+            lines.append("ppp_operation_max_seconds%s %.9f" % (labels, entry['max']))
+        lines.append("# EOF")
+        return "\n".join(lines)
+    else:
+        raise Exception("Unknown metrics format '%s', available: %s" % (metrics_format, ", ".join(METRICS_FORMATS)))
+
+
+def output_timings(out=None):
+    """
+    Outputs the recorded metrics as table.
+
+    :param out: the stream to write to, uses stderr if None (to keep the output of the tools parseable)
+    """
+
+    if out is None:
+        out = sys.stderr
+    out.write("%-8s %-20s %6s %10s %10s\n" % ("category", "operation", "count", "total ms", "max ms"))
+    total = 0.0
+    for entry in metrics_data():
+        total += entry['total']
+        out.write("%-8s %-20s %6d %10.2f %10.2f\n" % (entry['category'], entry['operation'], entry['count'],
+                                                     entry['total'] * 1000.0, entry['max'] * 1000.0))
+    out.write("%-8s %-20s %6s %10.2f\n" % ("", "total", "", total * 1000.0))
+
+
+class InstrumentedPulse(object):
+    """
+    Wraps a connection and records the time of the calls that query or change
+    the server state (see LIST_CALLS and SET_CALLS). All other attributes get
+    passed through to the connection.
+    """
+
+    def __init__(self, pulse):
+        """
+        Initializes the wrapper.
+
+        :param pulse: the connection to wrap
+        :type pulse: pulsectl.Pulse
+        """
+
+        self._pulse = pulse
+
+    def __getattr__(self, name):
+        attr = getattr(self._pulse, name)
+        if name in LIST_CALLS:
+            category = "list"
+        elif name in SET_CALLS:
+            category = "set"
+        else:
+            return attr
+
+        def call(*args, **kwargs):
+            with timer(category, name):
+                return attr(*args, **kwargs)
+
+        return call
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._pulse.close()
+
+
+def instrument_connection(pulse):
+    """
+    Wraps the connection with InstrumentedPulse if the metrics are enabled.
+
+    :param pulse: the connection
+    :type pulse: pulsectl.Pulse
+    :return: the instrumented or the unchanged connection
+    """
+
+    if not _enabled:
+        return pulse
+    return InstrumentedPulse(pulse)
+
+
+@contextmanager
+def profile_dump(filename=None):
+    """
+    Context manager that runs the block with cProfile and dumps the statistics
+    to the file (for use with pstats or snakeviz).
+
+    :param filename: the file to dump the statistics to, uses $PPP_PROFILE if None; profiling is disabled if neither is set
+    :type filename: str
+    """
+
+    if filename is None:
+        filename = os.environ.get(PROFILE_ENV)
+    if not filename:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(filename)
+
+
+@contextmanager
+def cli_timings(timings=False):
+    """
+    Context manager for the main functions of the command-line tools: records
+    the metrics and outputs them at the end if requested (see output_timings),
+    also when the tool fails. Profiles the block if $PPP_PROFILE is set
+    (see profile_dump).
+
+    :param timings: whether to record and output the timings
+    :type timings: bool
+    """
+
+    if timings:
+        enable_metrics()
+    try:
+        with profile_dump():
+            yield
+    finally:
+        if timings:
+            output_timings()
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pypulseprofiles.session import PulseSession
+from pypulseprofiles.core import pulse_apply_profile, pulse_info, pulse_load, selection_index
+
+
+def _run(server, func):
+    """
+    Runs the function with a session for the server and records the outcome.
+
+    :param server: the server to connect to
+    :type server: str
+    :param func: the function to call with the session
+    :type func: function
+    :return: the dictionary with server, success, time (in seconds) and result or error
+    :rtype: dict
+    """
+
+    result = {'server': server}
+    start = time.perf_counter()
+    try:
+        with PulseSession(server=server) as session:
+            result['result'] = func(session)
+        result['success'] = True
+    except Exception as e:
+        result['success'] = False
+        result['error'] = str(e)
+    result['time'] = time.perf_counter() - start
+    return result
+
+
+def pulse_run_servers(servers, func, workers=None):
+    """
+    Runs the function concurrently for all the servers, each with its own connection.
+
+    :param servers: the servers to connect to (e.g., unix:/path/to/socket or tcp:host, None for the default one)
+    :type servers: list
+    :param func: the function to call with the PulseSession of a server
+    :type func: function
+    :param workers: the maximum number of threads to use, one per server if None
+    :type workers: int
+    :return: the report, with the per-server outcomes (see _run) under 'servers', the number of failed servers under 'failed' and the overall time under 'total'
+    :rtype: dict
+    """
+
+    start = time.perf_counter()
+    if workers is None:
+        workers = len(servers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        outcomes = list(executor.map(lambda server: _run(server, func), servers))
+    result = dict()
+    result['servers'] = outcomes
+    result['failed'] = len([o for o in outcomes if not o['success']])
+    result['total'] = time.perf_counter() - start
+    return result
+
+
+def _apply_best(index, session, volume, move, move_apps, dry_run=False):
+    """
+    Applies the stored profile that matches the devices of the server best.
+
+    :param index: the synchronized selection index, only gets read
+    :type index: SelectionIndex
+    :param session: the session of the server
+    :type session: PulseSession
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report (see pulse_execute), with the name of the applied profile under 'profile'
+    :rtype: dict
+    """
+
+    name = index.best(session.snapshot(), sync=False)
+    if name is None:
+        raise Exception("No stored profile matches the available devices")
+    result = pulse_apply_profile(index.profiles[name], volume=volume, session=session, move=move, move_apps=move_apps,
+                                 dry_run=dry_run)
+    result['profile'] = name
+    return result
+
+
+def pulse_apply_servers(config, servers, volume=False, workers=None, move=False, move_apps=None, dry_run=False):
+    """
+    Applies the configuration to all the servers concurrently.
+
+    :param config: the configuration name or file, None to apply the best matching stored profile per server (see pulse_apply_auto)
+    :type config: str
+    :param servers: the servers to apply the profile to
+    :type servers: list
+    :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+    :type volume: bool
+    :param workers: the maximum number of threads to use, one per server if None
+    :type workers: int
+    :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+    :type move: bool
+    :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+    :type move_apps: list
+    :param dry_run: whether to only plan the operations rather than executing them, see pulse_plan_report
+    :type dry_run: bool
+    :return: the report, see pulse_run_servers; the results are the reports of pulse_apply_profile
+    :rtype: dict
+    """
+
+    if config is None:
+        # the index gets synchronized once (including the profiles modified in place),
+        # the threads only read it
+        index = selection_index()
+        index.sync(force=True)
+        return pulse_run_servers(servers, lambda session: _apply_best(index, session, volume, move, move_apps, dry_run),
+                                 workers=workers)
+    profile = pulse_load(config)
+    return pulse_run_servers(servers, lambda session: pulse_apply_profile(profile, volume=volume, session=session,
+                                                                          move=move, move_apps=move_apps,
+                                                                          dry_run=dry_run),
+                             workers=workers)
+
+
+def pulse_info_servers(servers, list_sources=False, list_sinks=False, volume=False, verbose=False, fields=None, workers=None):
+    """
+    Collects the information about the setups of all the servers concurrently.
+
+    :param servers: the servers to query
+    :type servers: list
+    :param list_sources: whether to list sources
+    :type list_sources: bool
+    :param list_sinks: whether to list sinks
+    :type list_sinks: bool
+    :param volume: whether to include the (average) volume across all channels
+    :type volume: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :param fields: the fields to include (see INFO_FIELDS), None for the default ones
+    :type fields: list
+    :param workers: the maximum number of threads to use, one per server if None
+    :type workers: int
+    :return: the report, see pulse_run_servers; the results are the dictionaries of pulse_info
+    :rtype: dict
+    """
+
+    return pulse_run_servers(servers, lambda session: pulse_info(list_sources=list_sources, list_sinks=list_sinks,
+                                                                 volume=volume, verbose=verbose, fields=fields,
+                                                                 session=session),
+                             workers=workers)
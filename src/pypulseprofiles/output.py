@@ -0,0 +1,81 @@
+import sys
+from pypulseprofiles.storage import yaml_dump
+
+OUTPUT_FORMATS = ["yaml", "json", "jsonl"]
+""" the formats for outputting data. """
+
+DEFAULT_OUTPUT_FORMAT = "yaml"
+""" the default output format. """
+
+
+def output_dumps(data, output_format=DEFAULT_OUTPUT_FORMAT):
+    """
+    Serializes the data in the specified output format. The JSON formats use
+    the stdlib encoder, with keys sorted like in the YAML output.
+
+    :param data: the data to serialize
+    :param output_format: the format to use (yaml|json|jsonl)
+    :type output_format: str
+    :return: the serialized data, without trailing newline
+    :rtype: str
+    """
+
+    if output_format == "yaml":
+        return yaml_dump(data).rstrip("\n")
+    elif output_format == "json":
+        import json
+        return json.dumps(data, indent=2, sort_keys=True)
+    elif output_format == "jsonl":
+        import json
+        return json.dumps(data, sort_keys=True, separators=(",", ":"))
+    else:
+        raise Exception("Unknown output format '%s', available: %s" % (output_format, ", ".join(OUTPUT_FORMATS)))
+
+
+def output_data(data, output_format=DEFAULT_OUTPUT_FORMAT, out=None):
+    """
+    Outputs the data as a single document.
+
+    :param data: the data to output
+    :param output_format: the format to use (yaml|json|jsonl)
+    :type output_format: str
+    :param out: the stream to write to, uses stdout if None
+    """
+
+    if out is None:
+        out = sys.stdout
+    out.write(output_dumps(data, output_format))
+    out.write("\n")
+
+
+def output_entries(entries, output_format=DEFAULT_OUTPUT_FORMAT, out=None):
+    """
+    Outputs the entries one by one as soon as they are available: as
+    multi-document YAML, as JSON array or as JSON Lines.
+
+    :param entries: the entries to output
+    :type entries: iterable
+    :param output_format: the format to use (yaml|json|jsonl)
+    :type output_format: str
+    :param out: the stream to write to, uses stdout if None
+    """
+
+    if out is None:
+        out = sys.stdout
+    if output_format == "json":
+        # the elements get indented like in the output of output_data() for the complete list
+        out.write("[")
+        first = True
+        for entry in entries:
+            out.write("\n" if first else ",\n")
+            out.write("\n".join("  " + line for line in output_dumps(entry, output_format).split("\n")))
+            out.flush()
+            first = False
+        out.write("\n]\n" if not first else "]\n")
+    else:
+        for entry in entries:
+            if output_format == "yaml":
+                out.write("---\n")
+            out.write(output_dumps(entry, output_format))
+            out.write("\n")
+            out.flush()
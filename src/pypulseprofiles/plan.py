@@ -0,0 +1,760 @@
+import time
+from contextlib import ExitStack
+from pypulseprofiles.snapshot import device_index
+from pypulseprofiles.matchers import compile_matcher, is_matcher
+from pypulseprofiles.metrics import metrics_enabled, metrics_record
+
+VOLUME_TOLERANCE = 0.005
+""" volume differences below this threshold are considered no-ops. """
+
+VOLUME_NORM = 0x10000
+""" the fixed-point value of 100% volume (PA_VOLUME_NORM), used for storing per-channel volumes as integers. """
+
+
+class PulseOperation(object):
+    """
+    A single change of the server state, i.e., setting a source/sink as default,
+    activating a port, setting the volume, (un)muting, activating a card profile
+    or moving a stream (sink input/source output) to a sink/source.
+    """
+
+    def __init__(self, action, kind, device, value=None, noop=False):
+        """
+        Initializes the operation.
+
+        :param action: the action to perform (default|port|volume|mute|card_profile|move)
+        :type action: str
+        :param kind: the type of device (source|sink|card)
+        :type kind: str
+        :param device: the source/sink/card to apply the operation to, the source output/sink input for action 'move'
+        :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo or pulsectl.PulseCardInfo
+        :param value: the port (PulsePortInfo), the volume (float for all channels or list of per-channel floats), the mute state (bool), the card profile (PulseCardProfileInfo) or the source/sink to move the stream to, None for action 'default'
+        :param noop: whether the server state already matches and the operation can be skipped
+        :type noop: bool
+        """
+
+        self.action = action
+        self.kind = kind
+        self.device = device
+        self.value = value
+        self.noop = noop
+        self.time = None
+
+    def submit(self, pulse):
+        """
+        Performs the operation as a synchronous round trip, using the public API of the connection.
+
+        :param pulse: the connection to use
+        :type pulse: pulsectl.Pulse
+        """
+
+        if self.action == "default":
+            pulse.default_set(self.device)
+        elif self.action == "port":
+            pulse.port_set(self.device, self.value)
+        elif self.action == "volume":
+            pulse.volume_set(self.device, self.volume_info())
+        elif self.action == "mute":
+            pulse.mute(self.device, self.value)
+        elif self.action == "card_profile":
+            pulse.card_profile_set(self.device, self.value)
+        elif self.action == "move":
+            if self.kind == "source":
+                pulse.source_output_move(self.device.index, self.value.index)
+            else:
+                pulse.sink_input_move(self.device.index, self.value.index)
+        else:
+            raise Exception("Unknown action: %s" % self.action)
+
+    def volume_info(self):
+        """
+        Returns the volume to set for the device.
+
+        :return: the volume
+        :rtype: pulsectl.PulseVolumeInfo
+        """
+
+        # use the backend's volume class (pulsectl.PulseVolumeInfo or FakeVolume)
+        cls = self.device.volume.__class__
+        if isinstance(self.value, list):
+            return cls(list(self.value))
+        return cls(self.value, len(self.device.volume.values))
+
+    def __str__(self):
+        """
+        Returns a short description of the operation.
+
+        :return: the description
+        :rtype: str
+        """
+
+        if self.action == "default":
+            result = "%s default_set %s" % (self.kind, self.device.name)
+        elif self.action == "port":
+            result = "%s port_set %s %s" % (self.kind, self.device.name, self.value.name)
+        elif self.action == "mute":
+            result = "%s mute %s %s" % (self.kind, self.device.name, self.value)
+        elif self.action == "card_profile":
+            result = "%s profile_set %s %s" % (self.kind, self.device.name, self.value.name)
+        elif self.action == "move":
+            result = "%s move #%d (%s) %s" % (self.kind, self.device.index, self.device.name, self.value.name)
+        else:
+            result = "%s volume_set %s %s" % (self.kind, self.device.name, self.value)
+        if self.noop:
+            result += " (no-op)"
+        return result
+
+
+def volume_capture(device):
+    """
+    Captures the volume state of the source/sink for storing in a profile: the
+    average volume, the per-channel volumes as fixed-point integers (see
+    VOLUME_NORM), the channel map and the mute state.
+
+    :param device: the source/sink
+    :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+    :return: the dictionary with volume, channels, channel_map and mute
+    :rtype: dict
+    """
+
+    result = dict()
+    result['volume'] = device.volume.value_flat
+    result['channels'] = [int(round(v * VOLUME_NORM)) for v in device.volume.values]
+    channel_map = getattr(device, "channel_list", None)
+    if channel_map:
+        result['channel_map'] = list(channel_map)
+    result['mute'] = bool(device.mute)
+    return result
+
+
+def volume_values(section, device):
+    """
+    Determines the volume to set for the source/sink from the source/sink
+    section of a profile. Per-channel volumes get mapped onto the channels of
+    the device via the stored channel map, if the device has the same channel
+    positions, or by position if the number of channels is the same. Otherwise,
+    their average gets used for all channels (like for profiles that only
+    store the average volume).
+
+    :param section: the source/sink section of the profile
+    :type section: dict
+    :param device: the source/sink to set the volume for
+    :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+    :return: the list of per-channel volumes or a single volume for all channels, None if the section has no volume
+    :rtype: list or float
+    """
+
+    channels = section.get('channels')
+    if not channels:
+        return float(section['volume']) if "volume" in section else None
+    values = [int(v) / VOLUME_NORM for v in channels]
+    channel_map = section.get('channel_map')
+    device_map = getattr(device, "channel_list", None)
+    if channel_map and device_map and (len(channel_map) == len(values)):
+        lookup = dict(zip(channel_map, values))
+        if all(position in lookup for position in device_map):
+            return [lookup[position] for position in device_map]
+    if len(values) == len(device.volume.values):
+        return values
+    return sum(values) / len(values)
+
+
+def _volume_noop(device, value):
+    """
+    Checks whether the volume of the source/sink is within tolerance of the volume to set.
+
+    :param device: the source/sink
+    :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+    :param value: the list of per-channel volumes or a single volume for all channels
+    :type value: list or float
+    :return: True if the volume would not change
+    :rtype: bool
+    """
+
+    current = device.volume.values
+    if isinstance(value, list):
+        if len(value) != len(current):
+            return False
+        return all(abs(v - c) < VOLUME_TOLERANCE for v, c in zip(value, current))
+    return all(abs(v - value) < VOLUME_TOLERANCE for v in current)
+
+
+def _resolve_device(snapshot, kind, section):
+    """
+    Resolves the device and port of the source/sink section of the profile.
+
+    :param snapshot: the server state to resolve against
+    :type snapshot: PulseSnapshot
+    :param kind: the type of device (source|sink)
+    :type kind: str
+    :param section: the source/sink section of the profile
+    :type section: dict
+    :return: tuple of device and port (None if not specified)
+    :rtype: tuple
+    """
+
+    if kind == "source":
+        device = snapshot.source(section['device'])
+    else:
+        device = snapshot.sink(section['device'])
+    if device is None:
+        raise Exception("%s device is not available: %s" % (kind.capitalize(), section['device']))
+
+    port = None
+    if "port" in section:
+        port = snapshot.port(device, section['port'])
+        if port is None:
+            raise Exception("%s port is not available: %s" % (kind.capitalize(), section['port']))
+
+    return device, port
+
+
+def _device_operations(operations, snapshot, kind, device, port, value, mute=None):
+    """
+    Appends the operations for the resolved device.
+
+    :param operations: the list to append the operations to
+    :type operations: list
+    :param snapshot: the server state to compare against
+    :type snapshot: PulseSnapshot
+    :param kind: the type of device (source|sink)
+    :type kind: str
+    :param device: the source/sink
+    :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+    :param port: the port to activate, None to leave unchanged
+    :type port: pulsectl.PulsePortInfo
+    :param value: the volume to set (list of per-channel volumes or single volume for all channels), None to leave unchanged
+    :type value: list or float
+    :param mute: the mute state to set, None to leave unchanged
+    :type mute: bool
+    """
+
+    default_name = snapshot.default_source_name if kind == "source" else snapshot.default_sink_name
+    operations.append(PulseOperation("default", kind, device, noop=(device.name == default_name)))
+    if value is not None:
+        operations.append(PulseOperation("volume", kind, device, value=value, noop=_volume_noop(device, value)))
+    if mute is not None:
+        operations.append(PulseOperation("mute", kind, device, value=mute, noop=(bool(device.mute) == mute)))
+    if port is not None:
+        noop = (device.port_active is not None) and (device.port_active.name == port.name)
+        operations.append(PulseOperation("port", kind, device, value=port, noop=noop))
+
+
+def check_profile(profile):
+    """
+    Performs sanity checks on the profile.
+
+    :param profile: the dictionary with source/sink information.
+    :type profile: dict
+    """
+
+    if not "source" in profile:
+        raise Exception("No 'source' section in profile!")
+    if not "device" in profile['source']:
+        raise Exception("No 'device' in 'source' section of profile!")
+    if not "sink" in profile:
+        raise Exception("No 'sink' section in profile!")
+    if not "device" in profile['sink']:
+        raise Exception("No 'device' in 'sink' section of profile!")
+    # invalid matchers get reported right away
+    for kind in ["source", "sink"]:
+        for field in ["device", "port"]:
+            if is_matcher(profile[kind].get(field)):
+                compile_matcher(profile[kind][field])
+
+
+def pulse_plan(profile, snapshot, volume=False):
+    """
+    Determines the operations necessary for applying the profile, with the ones
+    that would not change the server state being flagged as no-ops.
+
+    :param profile: the dictionary with source/sink information.
+    :type profile: dict
+    :param snapshot: the server state to compare against
+    :type snapshot: PulseSnapshot
+    :param volume: whether to set the volume (per channel or across all channels) and the mute state (if present)
+    :type volume: bool
+    :return: the list of PulseOperation objects
+    :rtype: list
+    """
+
+    check_profile(profile)
+
+    result = []
+    for kind in ["source", "sink"]:
+        section = profile[kind]
+        device, port = _resolve_device(snapshot, kind, section)
+        value = None
+        mute = None
+        if volume:
+            value = volume_values(section, device)
+            mute = bool(section['mute']) if "mute" in section else None
+        _device_operations(result, snapshot, kind, device, port, value, mute)
+    return result
+
+
+def pulse_plan_card(profile, snapshot):
+    """
+    Determines the operation for activating the card profile of the 'card'
+    section of the profile (if present), flagged as no-op if it is already active.
+
+    :param profile: the dictionary with card/source/sink information.
+    :type profile: dict
+    :param snapshot: the server state to compare against
+    :type snapshot: PulseSnapshot
+    :return: the list of PulseOperation objects (empty if no card section)
+    :rtype: list
+    """
+
+    if "card" not in profile:
+        return []
+    section = profile['card']
+    if (not isinstance(section, dict)) or ("device" not in section):
+        raise Exception("No 'device' in 'card' section of profile!")
+    if "profile" not in section:
+        raise Exception("No 'profile' in 'card' section of profile!")
+    card = snapshot.card(section['device'])
+    if card is None:
+        raise Exception("Card is not available: %s" % section['device'])
+    card_profile = device_index(card.profile_list).get(section['profile'])
+    if card_profile is None:
+        raise Exception("Card profile is not available: %s" % section['profile'])
+    noop = (card.profile_active is not None) and (card.profile_active.name == card_profile.name)
+    return [PulseOperation("card_profile", "card", card, value=card_profile, noop=noop)]
+
+
+def stream_application(stream):
+    """
+    Returns the names that identify the application of the stream.
+
+    :param stream: the sink input/source output
+    :type stream: pulsectl.PulseSinkInputInfo or pulsectl.PulseSourceOutputInfo
+    :return: the list of application name and binary (if available)
+    :rtype: list
+    """
+
+    proplist = getattr(stream, "proplist", dict())
+    return [proplist[k] for k in ("application.name", "application.process.binary") if k in proplist]
+
+
+def pulse_plan_moves(operations, snapshot, apps=None):
+    """
+    Determines the operations for moving the streams to the sources/sinks that
+    the (planned) 'default' operations make the defaults, i.e., the source
+    outputs to the new default source and the sink inputs to the new default
+    sink. Streams that are recording from monitor sources are left alone.
+
+    :param operations: the planned operations to take the new default source/sink from
+    :type operations: list
+    :param snapshot: the server state to compare against
+    :type snapshot: PulseSnapshot
+    :param apps: the glob patterns for the application names/binaries of the streams to move, None to move all streams
+    :type apps: list
+    :return: the list of PulseOperation objects, with streams already on the source/sink flagged as no-ops
+    :rtype: list
+    """
+
+    import fnmatch
+
+    result = []
+    for op in operations:
+        if op.action != "default":
+            continue
+        for stream in snapshot.streams(op.kind):
+            current = stream.source if op.kind == "source" else stream.sink
+            if op.kind == "source":
+                device = snapshot.device_by_index("source", current)
+                if (device is not None) and getattr(device, "monitor_of_sink_name", None):
+                    continue
+            if apps is not None:
+                names = stream_application(stream)
+                if not any(fnmatch.fnmatchcase(name, pattern) for name in names for pattern in apps):
+                    continue
+            result.append(PulseOperation("move", op.kind, stream, value=op.device, noop=(current == op.device.index)))
+    return result
+
+
+def compile_profile(profile, snapshot):
+    """
+    Validates the profile and resolves its devices and ports (names or
+    descriptions) against the snapshot. The compiled profile stores the
+    names and indices of the resolved devices and the names of the ports,
+    together with the fingerprint of the devices that it is valid for
+    (see compiled_matches).
+
+    :param profile: the dictionary with source/sink information.
+    :type profile: dict
+    :param snapshot: the server state to resolve against
+    :type snapshot: PulseSnapshot
+    :return: the compiled profile
+    :rtype: dict
+    """
+
+    check_profile(profile)
+
+    result = {'fingerprint': snapshot.fingerprint}
+    for kind in ["source", "sink"]:
+        section = profile[kind]
+        device, port = _resolve_device(snapshot, kind, section)
+        compiled = {'device': device.name, 'index': device.index}
+        compiled['port'] = port.name if port is not None else None
+        compiled['volume'] = volume_values(section, device)
+        compiled['mute'] = bool(section['mute']) if "mute" in section else None
+        result[kind] = compiled
+    return result
+
+
+def compiled_matches(compiled, snapshot):
+    """
+    Checks whether the compiled profile can be applied to the devices of the
+    snapshot, i.e., whether the fingerprints match and the devices with the
+    stored indices still have the stored names (e.g., after a restart of the
+    server, which reuses indices).
+
+    :param compiled: the compiled profile, see compile_profile
+    :type compiled: dict
+    :param snapshot: the server state to check against
+    :type snapshot: PulseSnapshot
+    :return: True if the compiled profile can be used
+    :rtype: bool
+    """
+
+    if compiled['fingerprint'] != snapshot.fingerprint:
+        return False
+    for kind in ["source", "sink"]:
+        device = snapshot.device_by_index(kind, compiled[kind]['index'])
+        if (device is None) or (device.name != compiled[kind]['device']):
+            return False
+    return True
+
+
+def pulse_plan_compiled(compiled, snapshot, volume=False):
+    """
+    Determines the operations necessary for applying the compiled profile,
+    without resolving any names or descriptions. The fingerprint of the
+    snapshot must match the one of the compiled profile.
+
+    :param compiled: the compiled profile, see compile_profile
+    :type compiled: dict
+    :param snapshot: the server state to compare against
+    :type snapshot: PulseSnapshot
+    :param volume: whether to set the volume (per channel or across all channels) and the mute state (if present)
+    :type volume: bool
+    :return: the list of PulseOperation objects
+    :rtype: list
+    """
+
+    if not compiled_matches(compiled, snapshot):
+        raise Exception("Compiled profile does not match the available devices!")
+
+    result = []
+    for kind in ["source", "sink"]:
+        section = compiled[kind]
+        device = snapshot.device_by_index(kind, section['index'])
+        port = None
+        if section['port'] is not None:
+            port = snapshot.port(device, section['port'])
+        value = section['volume'] if volume else None
+        mute = section.get('mute') if volume else None
+        _device_operations(result, snapshot, kind, device, port, value, mute)
+    return result
+
+
+def _submit_raw(pulse, operation, cb):
+    """
+    Issues the libpulse call for the operation without waiting for its completion.
+
+    :param pulse: the connection to use
+    :type pulse: pulsectl.Pulse
+    :param operation: the operation to issue
+    :type operation: PulseOperation
+    :param cb: the success callback to notify
+    """
+
+    from pulsectl import _pulsectl as c
+
+    ctx = pulse._ctx
+    if operation.action == "default":
+        if operation.kind == "source":
+            pa_op = c.pa.context_set_default_source(ctx, operation.device.name, cb, None)
+        else:
+            pa_op = c.pa.context_set_default_sink(ctx, operation.device.name, cb, None)
+    elif operation.action == "port":
+        if operation.kind == "source":
+            pa_op = c.pa.context_set_source_port_by_index(ctx, operation.device.index, operation.value.name, cb, None)
+        else:
+            pa_op = c.pa.context_set_sink_port_by_index(ctx, operation.device.index, operation.value.name, cb, None)
+    elif operation.action == "volume":
+        vol = operation.volume_info().to_struct()
+        if operation.kind == "source":
+            pa_op = c.pa.context_set_source_volume_by_index(ctx, operation.device.index, vol, cb, None)
+        else:
+            pa_op = c.pa.context_set_sink_volume_by_index(ctx, operation.device.index, vol, cb, None)
+    elif operation.action == "card_profile":
+        pa_op = c.pa.context_set_card_profile_by_index(ctx, operation.device.index, operation.value.name, cb, None)
+    elif operation.action == "move":
+        if operation.kind == "source":
+            pa_op = c.pa.context_move_source_output_by_index(ctx, operation.device.index, operation.value.index, cb, None)
+        else:
+            pa_op = c.pa.context_move_sink_input_by_index(ctx, operation.device.index, operation.value.index, cb, None)
+    elif operation.action == "mute":
+        if operation.kind == "source":
+            pa_op = c.pa.context_set_source_mute_by_index(ctx, operation.device.index, int(operation.value), cb, None)
+        else:
+            pa_op = c.pa.context_set_sink_mute_by_index(ctx, operation.device.index, int(operation.value), cb, None)
+    else:
+        raise Exception("Unknown action: %s" % operation.action)
+    c.pa.operation_unref(pa_op)
+
+
+def _wait_submitted(submitted):
+    """
+    Waits for the completion of the submitted operations (by leaving the
+    contexts of their callbacks), even if some of them fail.
+
+    :param submitted: the contexts of the callbacks of the submitted operations, in order of submission
+    :type submitted: list
+    :return: the first error of the operations, None if all succeeded
+    :rtype: pulsectl.PulseError
+    """
+
+    import pulsectl
+
+    result = None
+    for context in submitted:
+        try:
+            context.close()
+        except pulsectl.PulseError as err:
+            if result is None:
+                result = err
+    return result
+
+
+def _execute_pipelined(pulse, operations):
+    """
+    Issues all the operations in one go and then waits for all of them to complete.
+    If issuing an operation fails, the already issued ones still get waited for,
+    as libpulse references their callbacks until they completed.
+
+    :param pulse: the connection to use
+    :type pulse: pulsectl.Pulse
+    :param operations: the operations to execute
+    :type operations: list
+    """
+
+    import pulsectl
+    from pulsectl import _pulsectl as c
+
+    submitted = []
+    try:
+        for op in operations:
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                cb = stack.enter_context(pulse._pulse_op_cb())
+                try:
+                    _submit_raw(pulse, op, cb)
+                except c.pa.CallError as err:
+                    raise pulsectl.PulseOperationInvalid(err.args[-1])
+                # only gets waited for once all operations got issued
+                submitted.append(stack.pop_all())
+            op.time = time.perf_counter() - start
+    except BaseException:
+        _wait_submitted(submitted)
+        raise
+    error = _wait_submitted(submitted)
+    if error is not None:
+        raise error
+
+
+def _supports_pipelining(pulse):
+    """
+    Checks whether the connection offers the pulsectl internals required for pipelining.
+
+    :param pulse: the connection to check
+    :type pulse: pulsectl.Pulse
+    :return: True if operations can be pipelined
+    :rtype: bool
+    """
+
+    import importlib.util
+
+    if not (hasattr(pulse, "_pulse_op_cb") and hasattr(pulse, "_ctx")):
+        return False
+    # find_spec imports the parent package, which fails if it is missing
+    return (importlib.util.find_spec("pulsectl") is not None) \
+        and (importlib.util.find_spec("pulsectl._pulsectl") is not None)
+
+
+def pulse_plan_report(operations, snapshot, pulse=None, pipeline=True):
+    """
+    Generates the report for the planned operations without executing them
+    (dry run), with the number of server round trips that applying would take:
+    the queries for obtaining the server state plus the ones for the changes
+    (a single one if they get pipelined, see pulse_execute).
+
+    :param operations: the list of PulseOperation objects
+    :type operations: list
+    :param snapshot: the server state the operations were planned against
+    :type snapshot: PulseSnapshot
+    :param pulse: the connection the operations would get executed with, for determining whether they can be pipelined
+    :type pulse: pulsectl.Pulse
+    :param pipeline: whether the operations would get pipelined (if supported)
+    :type pipeline: bool
+    :return: the report, with the operations (description and noop flag) under 'operations', the number of changes under 'changes' and the round trips (snapshot, operations, total) under 'round_trips'
+    :rtype: dict
+    """
+
+    changes = len([op for op in operations if not op.noop])
+    if pipeline and (changes > 1) and (pulse is not None) and _supports_pipelining(pulse):
+        op_round_trips = 1
+    else:
+        op_round_trips = changes
+    result = dict()
+    result['operations'] = [{'operation': str(op), 'noop': op.noop} for op in operations]
+    result['changes'] = changes
+    result['round_trips'] = {
+        'snapshot': snapshot.round_trips,
+        'operations': op_round_trips,
+        'total': snapshot.round_trips + op_round_trips,
+    }
+    return result
+
+
+def pulse_report(operations, wait, total):
+    """
+    Generates the report for the executed operations.
+
+    :param operations: the list of PulseOperation objects
+    :type operations: list
+    :param wait: the time waited for the completion of a pipelined batch (in seconds)
+    :type wait: float
+    :param total: the overall time (in seconds)
+    :type total: float
+    :return: the report
+    :rtype: dict
+    """
+
+    result = dict()
+    result['operations'] = []
+    for op in operations:
+        step = dict()
+        step['operation'] = str(op)
+        step['noop'] = op.noop
+        step['time'] = op.time if op.time is not None else 0.0
+        result['operations'].append(step)
+    result['wait'] = wait
+    result['total'] = total
+    return result
+
+
+def pulse_rollback_plan(operations, snapshot):
+    """
+    Determines the operations that restore the state captured by the snapshot,
+    i.e., that undo the (non no-op) operations. Must be called before executing
+    the operations.
+
+    :param operations: the list of PulseOperation objects to undo
+    :type operations: list
+    :param snapshot: the server state before applying the operations
+    :type snapshot: PulseSnapshot
+    :return: the list of PulseOperation objects, in reverse order
+    :rtype: list
+    """
+
+    result = []
+    for op in reversed(operations):
+        if op.noop:
+            continue
+        if op.action == "default":
+            if op.kind == "source":
+                previous = snapshot.source()
+            else:
+                previous = snapshot.sink()
+            if previous is not None:
+                result.append(PulseOperation("default", op.kind, previous))
+        elif op.action == "port":
+            if op.device.port_active is not None:
+                result.append(PulseOperation("port", op.kind, op.device, value=op.device.port_active))
+        elif op.action == "volume":
+            result.append(PulseOperation("volume", op.kind, op.device, value=list(op.device.volume.values)))
+        elif op.action == "mute":
+            result.append(PulseOperation("mute", op.kind, op.device, value=bool(op.device.mute)))
+        elif op.action == "move":
+            current = op.device.source if op.kind == "source" else op.device.sink
+            previous = snapshot.device_by_index(op.kind, current)
+            if previous is not None:
+                result.append(PulseOperation("move", op.kind, op.device, value=previous))
+        elif op.action == "card_profile":
+            if op.device.profile_active is not None:
+                result.append(PulseOperation("card_profile", op.kind, op.device, value=op.device.profile_active))
+    return result
+
+
+def _execute(pulse, operations, pipeline):
+    """
+    Executes the operations that are not flagged as no-ops.
+
+    :param pulse: the connection to use
+    :type pulse: pulsectl.Pulse
+    :param operations: the list of PulseOperation objects
+    :type operations: list
+    :param pipeline: whether to pipeline the operations (if supported)
+    :type pipeline: bool
+    :return: the time waited for the completion of a pipelined batch
+    :rtype: float
+    """
+
+    start = time.perf_counter()
+    pending = [op for op in operations if not op.noop]
+    wait = 0.0
+
+    if pipeline and (len(pending) > 1) and _supports_pipelining(pulse):
+        _execute_pipelined(pulse, pending)
+        wait = time.perf_counter() - start - sum(op.time for op in pending)
+        # the raw calls bypass the instrumented connection
+        if metrics_enabled():
+            metrics_record("set", "pipelined", time.perf_counter() - start, count=len(pending))
+    else:
+        for op in pending:
+            op_start = time.perf_counter()
+            op.submit(pulse)
+            op.time = time.perf_counter() - op_start
+
+    return wait
+
+
+def pulse_execute(pulse, operations, pipeline=True, rollback=None):
+    """
+    Executes the operations that are not flagged as no-ops. If possible, all of
+    them are submitted in a single batch with one wait for their completion,
+    otherwise they get executed one by one. If any of the operations fails,
+    the rollback operations get executed (as a single batch as well).
+
+    :param pulse: the connection to use
+    :type pulse: pulsectl.Pulse
+    :param operations: the list of PulseOperation objects
+    :type operations: list
+    :param pipeline: whether to pipeline the operations (if supported)
+    :type pipeline: bool
+    :param rollback: the operations for restoring the previous state in case of failure (see pulse_rollback_plan), None to not restore
+    :type rollback: list
+    :return: the report, with the per-step timings (in seconds) under 'operations', the time waited for the completion of a pipelined batch under 'wait' and the overall time under 'total'
+    :rtype: dict
+    """
+
+    start = time.perf_counter()
+    try:
+        wait = _execute(pulse, operations, pipeline)
+    except Exception as e:
+        if not rollback:
+            raise
+        rollback_start = time.perf_counter()
+        try:
+            _execute(pulse, rollback, pipeline)
+        except Exception as rollback_e:
+            raise Exception("Failed to apply profile (%s), failed to restore previous state as well: %s"
+                            % (str(e), str(rollback_e))) from e
+        raise Exception("Failed to apply profile, restored previous state (%.2f ms): %s"
+                        % ((time.perf_counter() - rollback_start) * 1000.0, str(e))) from e
+
+    return pulse_report(operations, wait, time.perf_counter() - start)
@@ -0,0 +1,257 @@
+class DeviceRecord(object):
+    """
+    Compact record of the information about a source/sink that gets output
+    by ppp-info. Only the selected fields get copied from the device, the
+    conversion to dictionaries happens at output time (see info).
+    """
+
+    __slots__ = ("name", "description", "port_name", "port_description", "volume")
+
+    def __init__(self, name=None, description=None, port_name=None, port_description=None, volume=None):
+        """
+        Initializes the record.
+
+        :param name: the name of the device
+        :type name: str
+        :param description: the description of the device
+        :type description: str
+        :param port_name: the name of the active port, None if no active port
+        :type port_name: str
+        :param port_description: the description of the active port, None if no active port
+        :type port_description: str
+        :param volume: the (average) volume across all channels
+        :type volume: float
+        """
+
+        self.name = name
+        self.description = description
+        self.port_name = port_name
+        self.port_description = port_description
+        self.volume = volume
+
+    def info(self, fields, verbose=False):
+        """
+        Generates the dictionary for outputting the record.
+
+        :param fields: the fields to include (device|port|volume)
+        :type fields: set
+        :param verbose: whether to generate a verbose result (names and descriptions)
+        :type verbose: bool
+        :return: dictionary of info
+        :rtype: dict
+        """
+
+        result = {}
+
+        if verbose:
+            if "device" in fields:
+                result['device'] = {}
+                result['device']['name'] = self.name
+                result['device']['description'] = self.description
+            if "volume" in fields:
+                result.setdefault('device', {})['volume'] = self.volume
+            if ("port" in fields) and (self.port_name is not None):
+                result['port'] = {}
+                result['port']['name'] = self.port_name
+                result['port']['description'] = self.port_description
+        else:
+            if "device" in fields:
+                result['device'] = self.description
+            if ("port" in fields) and (self.port_name is not None):
+                result['port'] = self.port_description
+            if "volume" in fields:
+                result['volume'] = self.volume
+
+        return result
+
+
+def device_record(device, fields):
+    """
+    Creates the record for the source/sink. Only the attributes of the
+    selected fields get accessed.
+
+    :param device: the PulseSourceInfo/PulseSinkInfo object to use
+    :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+    :param fields: the fields to include (device|port|volume)
+    :type fields: set
+    :return: the record
+    :rtype: DeviceRecord
+    """
+
+    result = DeviceRecord()
+    if "device" in fields:
+        result.name = device.name
+        result.description = device.description
+    if ("port" in fields) and (device.port_active is not None):
+        result.port_name = device.port_active.name
+        result.port_description = device.port_active.description
+    if "volume" in fields:
+        result.volume = device.volume.value_flat
+    return result
+
+
+class PulseInfoRecords(object):
+    """
+    The information about the setup (default source/sink and the listed
+    sources/sinks) as records, without any references to the server state.
+    The defaults are the same record objects as in the lists.
+    """
+
+    __slots__ = ("fields", "default_source", "default_sink", "sources", "sinks")
+
+    def __init__(self, fields):
+        """
+        Initializes the (empty) records.
+
+        :param fields: the fields that the records contain (device|port|volume)
+        :type fields: set
+        """
+
+        self.fields = fields
+        self.default_source = None
+        self.default_sink = None
+        self.sources = None
+        self.sinks = None
+
+    def entries(self, verbose=False):
+        """
+        Generates the dictionaries entry by entry.
+
+        :param verbose: whether to be verbose
+        :type verbose: bool
+        :return: generator of (key, info) tuples, with key being default_source, default_sink, source or sink
+        :rtype: generator
+        """
+
+        yield "default_source", self.default_source.info(self.fields, verbose) if self.default_source is not None else None
+        yield "default_sink", self.default_sink.info(self.fields, verbose) if self.default_sink is not None else None
+        if self.sources is not None:
+            for r in self.sources:
+                yield "source", r.info(self.fields, verbose)
+        if self.sinks is not None:
+            for r in self.sinks:
+                yield "sink", r.info(self.fields, verbose)
+
+    def to_dict(self, verbose=False):
+        """
+        Generates the dictionary for outputting the information.
+
+        :param verbose: whether to be verbose
+        :type verbose: bool
+        :return: the dictionary with default_source, default_sink and the lists of sources/sinks (if collected)
+        :rtype: dict
+        """
+
+        result = dict()
+        if self.sources is not None:
+            result['sources'] = []
+        if self.sinks is not None:
+            result['sinks'] = []
+        for key, entry in self.entries(verbose):
+            if key in ("source", "sink"):
+                result[key + "s"].append(entry)
+            else:
+                result[key] = entry
+        return result
+
+
+def _collect(devices, default_name, fields, listed):
+    """
+    Creates the records for the devices in a single pass.
+
+    :param devices: the sources or sinks
+    :type devices: list
+    :param default_name: the name of the default source/sink
+    :type default_name: str
+    :param fields: the fields to include (device|port|volume)
+    :type fields: set
+    :param listed: whether to create records for all devices rather than just the default one
+    :type listed: bool
+    :return: tuple of record of the default device (None if not available) and list of records (None if not listed)
+    :rtype: tuple
+    """
+
+    default = None
+    records = [] if listed else None
+    for d in devices:
+        is_default = (d.name == default_name)
+        if not (listed or is_default):
+            continue
+        r = device_record(d, fields)
+        if listed:
+            records.append(r)
+        if is_default:
+            default = r
+    return default, records
+
+
+def collect_records(snapshot, fields, list_sources=False, list_sinks=False):
+    """
+    Collects the records from the server state, looking at every source and
+    sink only once (for the defaults as well).
+
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
+    :param fields: the fields to include (device|port|volume)
+    :type fields: set
+    :param list_sources: whether to collect all sources rather than just the default one
+    :type list_sources: bool
+    :param list_sinks: whether to collect all sinks rather than just the default one
+    :type list_sinks: bool
+    :return: the records
+    :rtype: PulseInfoRecords
+    """
+
+    result = PulseInfoRecords(fields)
+    result.default_source, result.sources = _collect(snapshot.sources, snapshot.default_source_name, fields, list_sources)
+    result.default_sink, result.sinks = _collect(snapshot.sinks, snapshot.default_sink_name, fields, list_sinks)
+    return result
+
+
+def _find(devices, name):
+    """
+    Returns the device with the name, without building a lookup.
+
+    :param devices: the sources or sinks
+    :type devices: list
+    :param name: the name of the device
+    :type name: str
+    :return: the device, None if not available
+    """
+
+    for d in devices:
+        if d.name == name:
+            return d
+    return None
+
+
+def stream_entries(snapshot, fields, list_sources=False, list_sinks=False, verbose=False):
+    """
+    Generates the entries one by one from the server state: the record of a
+    source/sink only gets created when its entry is requested and is not
+    kept afterwards, i.e., the memory does not grow with the number of devices.
+
+    :param snapshot: the server state to use
+    :type snapshot: PulseSnapshot
+    :param fields: the fields to include (device|port|volume)
+    :type fields: set
+    :param list_sources: whether to generate entries for all sources after the defaults
+    :type list_sources: bool
+    :param list_sinks: whether to generate entries for all sinks after the defaults
+    :type list_sinks: bool
+    :param verbose: whether to be verbose
+    :type verbose: bool
+    :return: generator of (key, info) tuples, with key being default_source, default_sink, source or sink
+    :rtype: generator
+    """
+
+    for key, devices, name in (("default_source", snapshot.sources, snapshot.default_source_name),
+                               ("default_sink", snapshot.sinks, snapshot.default_sink_name)):
+        device = _find(devices, name)
+        yield key, device_record(device, fields).info(fields, verbose) if device is not None else None
+    if list_sources:
+        for d in snapshot.sources:
+            yield "source", device_record(d, fields).info(fields, verbose)
+    if list_sinks:
+        for d in snapshot.sinks:
+            yield "sink", device_record(d, fields).info(fields, verbose)
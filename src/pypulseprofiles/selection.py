@@ -0,0 +1,380 @@
+import os
+from pypulseprofiles.config import config_dir, init_config_dir
+from pypulseprofiles.storage import format_extensions, profile_read
+from pypulseprofiles.index import profile_index
+from pypulseprofiles.matchers import compile_matcher, is_matcher
+
+KINDS = ["source", "sink"]
+""" the types of devices that profiles refer to. """
+
+
+def port_available(port):
+    """
+    Returns whether the port is available, i.e., whether something is plugged
+    into the jack (pulsectl reports 'yes', 'no' or 'unknown', e.g., for ports
+    without jack detection).
+
+    :param port: the port to check
+    :type port: pulsectl.PulsePortInfo
+    :return: False if known to be unavailable, None if unknown, otherwise True
+    :rtype: bool
+    """
+
+    available = getattr(port, "available", None)
+    if available == "no":
+        return False
+    if available == "yes":
+        return True
+    return None
+
+
+def profile_priority(profile):
+    """
+    Returns the priority of the profile.
+
+    :param profile: the profile
+    :type profile: dict
+    :return: the priority, 0 if not specified
+    :rtype: int
+    :raises Exception: if the priority is not an integer
+    """
+
+    priority = profile.get('priority', 0)
+    if isinstance(priority, bool):
+        raise Exception("Invalid priority, must be an integer: %s" % str(priority))
+    try:
+        return int(priority)
+    except (TypeError, ValueError):
+        raise Exception("Invalid priority, must be an integer: %s" % str(priority))
+
+
+def _score_device(snapshot, kind, section):
+    """
+    Scores the source/sink section of a profile against the snapshot.
+
+    :param snapshot: the server state to match against
+    :type snapshot: PulseSnapshot
+    :param kind: the type of device (source|sink)
+    :type kind: str
+    :param section: the source/sink section of the profile
+    :type section: dict
+    :return: tuple of number of matched items, number of unavailable ports and device index, None if the section cannot be satisfied
+    :rtype: tuple
+    """
+
+    if (not isinstance(section, dict)) or ("device" not in section):
+        return None
+    if kind == "source":
+        device = snapshot.source(section['device'])
+    else:
+        device = snapshot.sink(section['device'])
+    if device is None:
+        return None
+    matched = 1
+    unavailable = 0
+    if "port" in section:
+        port = snapshot.port(device, section['port'])
+        if port is None:
+            return None
+        if port_available(port) is False:
+            unavailable += 1
+        else:
+            matched += 1
+    return matched, unavailable, device.index
+
+
+def pulse_score_profile(profile, snapshot):
+    """
+    Scores how well the profile matches the available devices and ports.
+    Higher scores are better: the optional 'priority' of the profile comes
+    first, then profiles without unavailable ports (e.g., unplugged
+    headphones), then the number of matched devices/ports and, finally, the
+    most recently added device (i.e., highest index) so that newly plugged in
+    devices are preferred.
+
+    :param profile: the profile to score
+    :type profile: dict
+    :param snapshot: the server state to match against
+    :type snapshot: PulseSnapshot
+    :return: the score tuple, None if the profile cannot be satisfied or has an invalid priority
+    :rtype: tuple
+    """
+
+    if not isinstance(profile, dict):
+        return None
+    try:
+        priority = profile_priority(profile)
+    except Exception:
+        return None
+    source = _score_device(snapshot, "source", profile.get('source'))
+    if source is None:
+        return None
+    sink = _score_device(snapshot, "sink", profile.get('sink'))
+    if sink is None:
+        return None
+    return priority, -(source[1] + sink[1]), source[0] + sink[0], max(source[2], sink[2])
+
+
+def pulse_best_profile(profiles, snapshot):
+    """
+    Determines the profile that matches the available devices best (see
+    pulse_score_profile). Of profiles with the same score, the one whose
+    name comes first alphabetically wins.
+
+    :param profiles: the dictionary of profile name -> profile
+    :type profiles: dict
+    :param snapshot: the server state to match against
+    :type snapshot: PulseSnapshot
+    :return: the name of the best profile, None if none can be satisfied
+    :rtype: str
+    """
+
+    result = None
+    best = None
+    for name in sorted(profiles):
+        score = pulse_score_profile(profiles[name], snapshot)
+        if score is None:
+            continue
+        # only a higher score replaces the best one, i.e., ties get resolved by name
+        if (best is None) or (score > best):
+            best = score
+            result = name
+    return result
+
+
+def _config_stats():
+    """
+    Determines the profile files in the config dir with a single directory scan.
+
+    :return: the dictionary of config name -> (file, modification time in ns, size), using the format with highest precedence for each name
+    :rtype: dict
+    """
+
+    if not os.path.exists(config_dir()):
+        init_config_dir()
+    exts = format_extensions()
+    result = dict()
+    ranks = dict()
+    for entry in os.scandir(config_dir()):
+        if entry.name.startswith("."):
+            continue
+        name, ext = os.path.splitext(entry.name)
+        if ext not in exts:
+            continue
+        rank = exts.index(ext)
+        if (name in ranks) and (ranks[name] <= rank):
+            continue
+        st = entry.stat()
+        ranks[name] = rank
+        result[name] = (entry.path, st.st_mtime_ns, st.st_size)
+    return result
+
+
+class SelectionIndex(object):
+    """
+    Inverted index from the devices (names or descriptions) referenced by the
+    stored profiles to the names of the profiles. Selecting a profile only
+    looks up the available devices in the index and scores the profiles that
+    refer to an available source and an available sink, rather than all of
+    them. The index gets updated incrementally with the profiles that got
+    added, modified or removed in the config dir, using the parsed profiles
+    of the profile index. Profiles that use matchers for their devices (see
+    DeviceMatcher) are grouped by matcher, which gets evaluated once per
+    selection regardless of the number of profiles sharing it.
+    """
+
+    def __init__(self):
+        """
+        Initializes the (empty) index for the current config dir.
+        """
+
+        self.directory = config_dir()
+        self.profiles = dict()
+        self.postings = {kind: dict() for kind in KINDS}
+        self.patterns = {kind: dict() for kind in KINDS}
+        self._keys = dict()
+        self.failed = dict()
+        self._stats = dict()
+        self._mtime = None
+
+    def _add(self, name, profile):
+        """
+        Adds the profile to the index.
+
+        :param name: the config name
+        :type name: str
+        :param profile: the profile
+        :type profile: dict
+        :raises Exception: if the priority of the profile is invalid
+        """
+
+        if isinstance(profile, dict):
+            profile_priority(profile)
+        self.profiles[name] = profile
+        self._keys[name] = []
+        if not isinstance(profile, dict):
+            return
+        for kind in KINDS:
+            section = profile.get(kind)
+            if isinstance(section, dict) and ("device" in section):
+                if is_matcher(section['device']):
+                    matcher = compile_matcher(section['device'])
+                    self.patterns[kind].setdefault(matcher.key, (section['device'], set()))[1].add(name)
+                    self._keys[name].append((self.patterns[kind], matcher.key))
+                else:
+                    self.postings[kind].setdefault(section['device'], set()).add(name)
+                    self._keys[name].append((self.postings[kind], section['device']))
+
+    def _remove(self, name):
+        """
+        Removes the profile from the index.
+
+        :param name: the config name
+        :type name: str
+        """
+
+        self.profiles.pop(name, None)
+        for postings, key in self._keys.pop(name, []):
+            entry = postings.get(key)
+            if entry is None:
+                continue
+            names = entry[1] if isinstance(entry, tuple) else entry
+            names.discard(name)
+            if len(names) == 0:
+                del postings[key]
+
+    def _load(self, name, stat, index, failed):
+        """
+        (Re-)Indexes the profile.
+
+        :param name: the config name
+        :type name: str
+        :param stat: the tuple of file, modification time in ns and size
+        :type stat: tuple
+        :param index: the profile index to obtain the parsed profile from
+        :type index: ProfileIndex
+        :param failed: the dictionary to add the error message to if the profile fails to load
+        :type failed: dict
+        """
+
+        self._remove(name)
+        self._stats[name] = stat
+        try:
+            self._add(name, index.profile(name, profile_read))
+        except Exception as e:
+            self._remove(name)
+            failed[name] = str(e)
+
+    def sync(self, force=False):
+        """
+        Updates the index with the profiles that got added, modified or removed
+        in the config dir. Profiles that fail to load are skipped (until they get
+        modified). The config dir only gets scanned if its modification time
+        changed, which is the case whenever profiles get added, removed or
+        written atomically (like ppp-create does). Profiles that got modified in
+        place get re-indexed when they are considered for selection (see best).
+
+        :param force: whether to scan the config dir regardless of its modification time
+        :type force: bool
+        :return: the dictionary of name -> error message of the profiles that failed to load, also available via the 'failed' attribute
+        :rtype: dict
+        """
+
+        failed = dict()
+        if not os.path.exists(self.directory):
+            init_config_dir()
+        mtime = os.stat(self.directory).st_mtime_ns
+        if force or (mtime != self._mtime):
+            stats = _config_stats()
+            index = profile_index()
+            for name in list(self._stats):
+                if name not in stats:
+                    self._remove(name)
+                    del self._stats[name]
+            for name in stats:
+                if self._stats.get(name) != stats[name]:
+                    self._load(name, stats[name], index, failed)
+            index.save()
+            self._mtime = mtime
+        self.failed = failed
+        return failed
+
+    def candidates(self, snapshot):
+        """
+        Determines the profiles that refer to an available source and an available sink.
+
+        :param snapshot: the server state to match against
+        :type snapshot: PulseSnapshot
+        :return: the set of profile names
+        :rtype: set
+        """
+
+        result = None
+        for kind, devices in (("source", snapshot.sources), ("sink", snapshot.sinks)):
+            postings = self.postings[kind]
+            names = set()
+            for device in devices:
+                for key in (device.name, device.description):
+                    if key in postings:
+                        names.update(postings[key])
+            lookup = snapshot.source if kind == "source" else snapshot.sink
+            for spec, matched in self.patterns[kind].values():
+                if lookup(spec) is not None:
+                    names.update(matched)
+            result = names if (result is None) else (result & names)
+            if len(result) == 0:
+                break
+        return result
+
+    def best(self, snapshot, sync=True):
+        """
+        Determines the profile that matches the available devices best, see
+        pulse_best_profile. Candidates that got modified since they were indexed
+        get re-indexed first, unless sync is False: then the index only gets
+        read, e.g., by several threads after synchronizing it once.
+
+        :param snapshot: the server state to match against
+        :type snapshot: PulseSnapshot
+        :param sync: whether to re-index candidates that got modified
+        :type sync: bool
+        :return: the name of the best profile, None if none can be satisfied
+        :rtype: str
+        """
+
+        names = self.candidates(snapshot)
+        if not sync:
+            return pulse_best_profile({name: self.profiles[name] for name in names}, snapshot)
+        modified = []
+        for name in names:
+            filename = self._stats[name][0]
+            try:
+                st = os.stat(filename)
+            except OSError:
+                modified.append(name)
+                continue
+            if self._stats[name] != (filename, st.st_mtime_ns, st.st_size):
+                modified.append(name)
+        if len(modified) > 0:
+            self.sync(force=True)
+            names = self.candidates(snapshot)
+        return pulse_best_profile({name: self.profiles[name] for name in names}, snapshot)
+
+
+_selection_index = None
+""" the selection index used by the current process. """
+
+
+def selection_index():
+    """
+    Returns the selection index for the profiles in the config directory, synchronized with the config dir (see SelectionIndex.sync).
+
+    :return: the index
+    :rtype: SelectionIndex
+    """
+
+    global _selection_index
+
+    if (_selection_index is None) or (_selection_index.directory != config_dir()):
+        _selection_index = SelectionIndex()
+    _selection_index.sync()
+    return _selection_index
@@ -0,0 +1,64 @@
+import argparse
+import traceback
+from pypulseprofiles.control import PulseControlServer, control_request, ControlUnavailable
+from pypulseprofiles.metrics import cli_timings, METRICS_FORMATS
+
+
+def main(args=None):
+    """
+    Runs the control server that the other command-line tools use if available.
+    Use -h to see all options.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Keeps a connection to PulseAudio, the device information and the parsed profiles in memory and '
+                    + 'executes the commands of ppp-info/ppp-create/ppp-apply, listening on a Unix domain socket in '
+                    + 'the user runtime dir.',
+        prog="ppp-server")
+    parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to output the handled requests and their timings")
+    parser.add_argument("--stop", action="store_true", dest="stop", help="stops the running server")
+    parser.add_argument("--metrics", dest="metrics_format", choices=METRICS_FORMATS, default=None, help="outputs the metrics recorded by the running server (requires --timings for the server) in the specified format")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to record the time spent on connecting, querying/changing the server state and reading profiles, output (to stderr) when the server stops")
+    parsed = parser.parse_args(args=args)
+    if parsed.stop:
+        try:
+            control_request("shutdown")
+        except ControlUnavailable:
+            print("Control server not running")
+        return
+    if parsed.metrics_format is not None:
+        print(control_request("metrics", metrics_format=parsed.metrics_format))
+        return
+    with cli_timings(parsed.timings):
+        server = PulseControlServer(verbose=parsed.verbose)
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            pass
+
+
+def sys_main():
+    """
+    Runs the main function using the system cli arguments, and
+    returns a system error code.
+
+    :return: 0 for success, 1 for failure.
+    :rtype: int
+    """
+
+    try:
+        main()
+        return 0
+    except Exception:
+        print(traceback.format_exc())
+        return 1
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception:
+        print(traceback.format_exc())
@@ -0,0 +1,175 @@
+import threading
+from contextlib import contextmanager
+from pypulseprofiles.backend import backend_instance
+from pypulseprofiles.snapshot import *
+
+
+def pulse_instance(server=None):
+    """
+    Returns an Pulse instance, using the current backend (see set_backend).
+
+    :param server: the server to connect to, None for the default one
+    :type server: str
+    :return: the instance
+    :rtype: pulsectl.Pulse
+    """
+    return backend_instance(server)
+
+
+class PulseSession(object):
+    """
+    Wraps a single connection to the PulseAudio server that gets shared by
+    all the operations that are performed with the session. The connection
+    is only established on first use. Can be used as context manager, which
+    closes the connection when exiting.
+    """
+
+    def __init__(self, pulse=None, server=None):
+        """
+        Initializes the session.
+
+        :param pulse: an existing connection to use instead of opening a new one (not closed by the session)
+        :type pulse: pulsectl.Pulse
+        :param server: the server to connect to (e.g., unix:/path/to/socket or tcp:host), None for the default one
+        :type server: str
+        """
+
+        self.server = server
+        self._pulse = pulse
+        self._owner = pulse is None
+        self._snapshot = None
+        self.connects = 0
+
+    @property
+    def pulse(self):
+        """
+        Returns the connection, connects if necessary (or reconnects if the connection got lost).
+
+        :return: the connection
+        :rtype: pulsectl.Pulse
+        """
+
+        if (self._pulse is not None) and self._owner and (self._pulse.connected is False):
+            self.close()
+        if self._pulse is None:
+            self._pulse = pulse_instance(self.server)
+            self._owner = True
+            self.connects += 1
+        return self._pulse
+
+    @property
+    def connected(self):
+        """
+        Returns whether a connection is currently open.
+
+        :return: True if connected
+        :rtype: bool
+        """
+
+        return (self._pulse is not None) and (self._pulse.connected is not False)
+
+    def close(self):
+        """
+        Closes the connection, if it was opened by the session.
+        """
+
+        if (self._pulse is not None) and self._owner:
+            self._pulse.close()
+        self._pulse = None
+        self._snapshot = None
+
+    def snapshot(self):
+        """
+        Returns the snapshot of the server state, retrieves it if necessary.
+
+        :return: the snapshot
+        :rtype: PulseSnapshot
+        """
+
+        if (self._snapshot is None) or (self._snapshot.pulse is not self.pulse):
+            self._snapshot = PulseSnapshot(self.pulse)
+        return self._snapshot
+
+    def refresh(self):
+        """
+        Retrieves the server state again, e.g., after devices got added or removed.
+
+        :return: the updated snapshot
+        :rtype: PulseSnapshot
+        """
+
+        self._snapshot = None
+        return self.snapshot()
+
+    def invalidate(self):
+        """
+        Discards the current snapshot, e.g., after the server state got modified.
+        The next call of snapshot() retrieves the state again.
+        """
+
+        self._snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@contextmanager
+def pulse_session(session=None):
+    """
+    Context manager that yields the provided session or, if None, a new
+    session that gets closed again on exit.
+
+    :param session: the session to use, creates a temporary one if None
+    :type session: PulseSession
+    :return: the session to use
+    :rtype: PulseSession
+    """
+
+    if session is None:
+        with PulseSession() as session:
+            yield session
+    else:
+        yield session
+
+
+_shared_session = None
+""" the session shared by embedding callers. """
+
+_shared_session_lock = threading.Lock()
+""" guards the creation of the shared session. """
+
+
+def shared_session():
+    """
+    Returns the cached session that is shared across calls, for long-running
+    callers that perform many operations. The connection is kept open (and
+    re-established if it got lost) until close_shared_session() gets called.
+    Like pulsectl.Pulse itself, the session must not be used concurrently
+    from several threads.
+
+    :return: the shared session
+    :rtype: PulseSession
+    """
+
+    global _shared_session
+
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = PulseSession()
+        return _shared_session
+
+
+def close_shared_session():
+    """
+    Closes the cached session, if any.
+    """
+
+    global _shared_session
+
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
@@ -0,0 +1,347 @@
+from itertools import compress
+from pypulseprofiles.matchers import compile_matcher, is_matcher
+
+
+def device_index(devices):
+    """
+    Generates a lookup dictionary for the devices or ports, using both names
+    and descriptions as keys. Names take precedence over descriptions and
+    the first device wins if descriptions are not unique.
+
+    :param devices: the list of devices or ports to index
+    :type devices: list
+    :return: the dictionary with name/description -> object
+    :rtype: dict
+    """
+
+    result = dict()
+    for d in devices:
+        result.setdefault(d.description, d)
+    for d in devices:
+        result[d.name] = d
+    return result
+
+
+class PulseSnapshot(object):
+    """
+    Snapshot of the server state, obtained with a single round of server_info,
+    source_list and sink_list calls. Sources, sinks and their ports can be
+    looked up by name or description without any further server round trips.
+    Matchers (see DeviceMatcher) get evaluated once per snapshot, with property
+    values being indexed on demand.
+    """
+
+    def __init__(self, pulse=None):
+        """
+        Initializes the snapshot and retrieves the current state.
+
+        :param pulse: the connection to use, None if the state gets supplied via update()
+        :type pulse: pulsectl.Pulse
+        """
+
+        self.pulse = pulse
+        if pulse is not None:
+            self.refresh()
+
+    def refresh(self):
+        """
+        Retrieves the current state from the server again.
+
+        :return: itself
+        :rtype: PulseSnapshot
+        """
+
+        return self.update(self.pulse.server_info(), self.pulse.source_list(), self.pulse.sink_list())
+
+    def update(self, server, sources, sinks):
+        """
+        Replaces the state with the supplied server info, sources and sinks.
+
+        :param server: the server info
+        :type server: pulsectl.PulseServerInfo
+        :param sources: the list of sources
+        :type sources: list
+        :param sinks: the list of sinks
+        :type sinks: list
+        :return: itself
+        :rtype: PulseSnapshot
+        """
+
+        self.default_source_name = server.default_source_name
+        self.default_sink_name = server.default_sink_name
+        self.sources = sources
+        self.sinks = sinks
+        # server_info, source_list and sink_list, cards/streams add to it
+        self.round_trips = 3
+        # the lookups get built on demand
+        self._sources = None
+        self._sinks = None
+        self._ports = dict()
+        self._indices = None
+        self._fingerprint = None
+        self._cards = None
+        self._card_list = None
+        self._streams = dict()
+        self._matches = dict()
+        self._properties = dict()
+        self._newest = dict()
+        self._names = dict()
+        self._literals = dict()
+        return self
+
+    @property
+    def fingerprint(self):
+        """
+        Returns the fingerprint of the available devices, which changes when
+        hardware gets added or removed but not when defaults, active ports or
+        volumes change. Since the server assigns new indices to devices that
+        (re)appear, the indices of the sources and sinks suffice.
+
+        :return: the fingerprint
+        :rtype: str
+        """
+
+        if self._fingerprint is None:
+            import hashlib
+            key = "sources:%s;sinks:%s" % (",".join([str(d.index) for d in self.sources]),
+                                           ",".join([str(d.index) for d in self.sinks]))
+            self._fingerprint = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    def device_by_index(self, kind, index):
+        """
+        Returns the source/sink with the specified index.
+
+        :param kind: the type of device (source|sink)
+        :type kind: str
+        :param index: the index of the device
+        :type index: int
+        :return: the device, None if not found
+        :rtype: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+        """
+
+        if self._indices is None:
+            self._indices = {"source": {d.index: d for d in self.sources}, "sink": {d.index: d for d in self.sinks}}
+        return self._indices[kind].get(index)
+
+    def _property_index(self, kind, devices, prop):
+        """
+        Returns the lookup of the devices by the value of the property.
+
+        :param kind: the type of device (source|sink|card)
+        :type kind: str
+        :param devices: the devices to index
+        :type devices: list
+        :param prop: the property to index, e.g., device.bus
+        :type prop: str
+        :return: the dictionary with property value -> list of devices
+        :rtype: dict
+        """
+
+        key = (kind, prop)
+        if key not in self._properties:
+            index = dict()
+            for d in devices:
+                value = getattr(d, "proplist", dict()).get(prop)
+                if value is not None:
+                    index.setdefault(value, []).append(d)
+            self._properties[key] = index
+        return self._properties[key]
+
+    def _strings(self, kind, devices):
+        """
+        Returns the names and descriptions of the devices, newest device (i.e.,
+        highest index) first, along with the devices they belong to.
+
+        :param kind: the type of device (source|sink|card)
+        :type kind: str
+        :param devices: the devices
+        :type devices: list
+        :return: tuple of the list of names/descriptions and the list of the corresponding devices
+        :rtype: tuple
+        """
+
+        if kind not in self._names:
+            strings = []
+            owners = []
+            for d in sorted(devices, key=lambda d: d.index, reverse=True):
+                strings.append(d.name)
+                strings.append(getattr(d, "description", None) or d.proplist.get("device.description", d.name))
+                owners.append(d)
+                owners.append(d)
+            self._names[kind] = (strings, owners)
+        return self._names[kind]
+
+    def _match(self, kind, devices, spec):
+        """
+        Returns the device that the matcher selects: the most recently added
+        one (i.e., highest index) if several devices match. The result gets
+        stored per matcher content, i.e., profiles sharing a matcher only
+        evaluate it once.
+
+        :param kind: the type of device (source|sink|card)
+        :type kind: str
+        :param devices: the devices to choose from
+        :type devices: list
+        :param spec: the matcher dictionary
+        :type spec: dict
+        :return: the device, None if none matches
+        """
+
+        matcher = compile_matcher(spec)
+        key = (kind, matcher.key)
+        if key in self._matches:
+            return self._matches[key]
+        literal = matcher.literal()
+        literal_property = matcher.literal_property()
+        test = matcher.name_test()
+        result = None
+        if test is not None:
+            # scans the names/descriptions (newest device first) without calling back into Python per device
+            strings, owners = self._strings(kind, devices)
+            i = next(compress(range(len(strings)), map(test, strings)), None)
+            candidates = []
+            if i is not None:
+                result = owners[i]
+        elif literal is not None:
+            # all the devices with that name or description, not just the one that device_index picks
+            if kind not in self._literals:
+                lookup = dict()
+                for string, d in zip(*self._strings(kind, devices)):
+                    lookup.setdefault(string, []).append(d)
+                self._literals[kind] = lookup
+            candidates = self._literals[kind].get(literal, [])
+        elif literal_property is not None:
+            candidates = self._property_index(kind, devices, literal_property[0]).get(literal_property[1], [])
+        else:
+            # newest first, the first match wins
+            if kind not in self._newest:
+                self._newest[kind] = sorted(devices, key=lambda d: d.index, reverse=True)
+            candidates = self._newest[kind]
+            for d in candidates:
+                if matcher.matches(d):
+                    result = d
+                    break
+            candidates = []
+        for d in candidates:
+            if ((result is None) or (d.index > result.index)) and matcher.matches(d):
+                result = d
+        self._matches[key] = result
+        return result
+
+    def source(self, name_or_desc=None):
+        """
+        Returns the PulseSourceInfo that matches the string, either against the name or the description.
+
+        :param name_or_desc: the name or description string to look for (or matcher dictionary, see DeviceMatcher), uses default source if None
+        :type name_or_desc: str or dict
+        :return: the PulseSourceInfo object or None if not found
+        :rtype: pulsectl.PulseSourceInfo
+        """
+
+        if name_or_desc is None:
+            name_or_desc = self.default_source_name
+        if self._sources is None:
+            self._sources = device_index(self.sources)
+        if is_matcher(name_or_desc):
+            return self._match("source", self.sources, name_or_desc)
+        return self._sources.get(name_or_desc)
+
+    def sink(self, name_or_desc=None):
+        """
+        Returns the PulseSinkInfo that matches the string, either against the name or the description.
+
+        :param name_or_desc: the name or description string to look for (or matcher dictionary, see DeviceMatcher), uses default sink if None
+        :type name_or_desc: str or dict
+        :return: the PulseSinkInfo object or None if not found
+        :rtype: pulsectl.PulseSinkInfo
+        """
+
+        if name_or_desc is None:
+            name_or_desc = self.default_sink_name
+        if self._sinks is None:
+            self._sinks = device_index(self.sinks)
+        if is_matcher(name_or_desc):
+            return self._match("sink", self.sinks, name_or_desc)
+        return self._sinks.get(name_or_desc)
+
+    def card(self, name_or_desc):
+        """
+        Returns the card that matches the string, either against the name or the
+        description. The cards get retrieved on first use (one additional round trip).
+
+        :param name_or_desc: the name or description string to look for (or matcher dictionary, see DeviceMatcher)
+        :type name_or_desc: str or dict
+        :return: the PulseCardInfo object or None if not found
+        :rtype: pulsectl.PulseCardInfo
+        """
+
+        if self._cards is None:
+            if self.pulse is None:
+                raise Exception("Snapshot without connection, cannot retrieve cards!")
+            cards = self.pulse.card_list()
+            self.round_trips += 1
+            self._card_list = cards
+            self._cards = dict()
+            for c in cards:
+                self._cards.setdefault(c.proplist.get('device.description', c.name), c)
+            for c in cards:
+                self._cards[c.name] = c
+        if is_matcher(name_or_desc):
+            return self._match("card", self._card_list, name_or_desc)
+        return self._cards.get(name_or_desc)
+
+    def streams(self, kind):
+        """
+        Returns the streams of the sources/sinks, i.e., the source outputs
+        (recording) or sink inputs (playback). They get retrieved on first use
+        (one additional round trip per type).
+
+        :param kind: the type of device (source|sink)
+        :type kind: str
+        :return: the list of PulseSourceOutputInfo/PulseSinkInputInfo objects
+        :rtype: list
+        """
+
+        if kind not in self._streams:
+            if self.pulse is None:
+                raise Exception("Snapshot without connection, cannot retrieve streams!")
+            if kind == "source":
+                self._streams[kind] = self.pulse.source_output_list()
+            else:
+                self._streams[kind] = self.pulse.sink_input_list()
+            self.round_trips += 1
+        return self._streams[kind]
+
+    def port(self, device, name_or_desc=None):
+        """
+        Returns the port of the source/sink that matches the string, either against the name or the description.
+
+        :param device: the PulseSourceInfo/PulseSinkInfo object to get the port from
+        :type device: pulsectl.PulseSourceInfo or pulsectl.PulseSinkInfo
+        :param name_or_desc: the name or description string to look for (or matcher dictionary, see DeviceMatcher; the first matching port gets used), uses active one if None
+        :type name_or_desc: str or dict
+        :return: the PulsePortInfo object or None if not found
+        :rtype: pulsectl.PulsePortInfo
+        """
+
+        if device is None:
+            raise Exception("No device object provided!")
+
+        if name_or_desc is None:
+            return device.port_active
+
+        # the port lookups get built on demand, the device is kept to guard against id reuse
+        entry = self._ports.get(id(device))
+        if (entry is None) or (entry[0] is not device):
+            entry = (device, device_index(device.port_list))
+            self._ports[id(device)] = entry
+        if is_matcher(name_or_desc):
+            matcher = compile_matcher(name_or_desc)
+            literal = matcher.literal()
+            ports = [entry[1][literal]] if (literal is not None) and (literal in entry[1]) else device.port_list
+            for port in ports:
+                if matcher.matches(port):
+                    return port
+            return None
+        return entry[1].get(name_or_desc)
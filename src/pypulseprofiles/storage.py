@@ -0,0 +1,286 @@
+import os
+from pypulseprofiles.metrics import timer
+
+DEFAULT_FORMAT = "yaml"
+""" the format for storing new profiles. """
+
+MARSHAL_MAGIC = b"ppp-marshal"
+""" the start of the header of profiles in the marshal format, followed by the Python version and the marshal version. """
+
+
+def yaml_load(stream):
+    """
+    Parses the YAML content, using the libyaml-based loader if available.
+    PyYAML gets only imported on first use.
+
+    :param stream: the string or file to parse
+    :return: the parsed data
+    """
+
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(stream, Loader=loader)
+
+
+def yaml_dump(data, stream=None):
+    """
+    Serializes the data as YAML, using the libyaml-based dumper if available.
+    PyYAML gets only imported on first use.
+
+    :param data: the data to serialize
+    :param stream: the file to write to, returns a string if None
+    :return: the YAML string if no stream provided
+    :rtype: str
+    """
+
+    import yaml
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(data, stream, Dumper=dumper)
+
+
+def _yaml_read(filename):
+    """
+    Reads a profile in YAML format.
+
+    :param filename: the file to read
+    :type filename: str
+    :return: the profile
+    :rtype: dict
+    """
+
+    with open(filename, "r") as f:
+        return yaml_load(f)
+
+
+def _yaml_write(profile, filename):
+    """
+    Writes a profile in YAML format.
+
+    :param profile: the profile to write
+    :type profile: dict
+    :param filename: the file to write to
+    :type filename: str
+    """
+
+    with open(filename, "w") as f:
+        yaml_dump(profile, f)
+
+
+def _json_read(filename):
+    """
+    Reads a profile in JSON format.
+
+    :param filename: the file to read
+    :type filename: str
+    :return: the profile
+    :rtype: dict
+    """
+
+    import json
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def _json_write(profile, filename):
+    """
+    Writes a profile in JSON format.
+
+    :param profile: the profile to write
+    :type profile: dict
+    :param filename: the file to write to
+    :type filename: str
+    """
+
+    import json
+    with open(filename, "w") as f:
+        json.dump(profile, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _marshal_header():
+    """
+    Returns the header of profiles in the marshal format, which identifies the
+    Python version and marshal version that wrote it, as the marshal format is
+    not guaranteed to be stable across Python versions.
+
+    :return: the header line
+    :rtype: bytes
+    """
+
+    import marshal
+    import sys
+    return MARSHAL_MAGIC + (" %d.%d %d\n" % (sys.version_info[0], sys.version_info[1], marshal.version)).encode("ascii")
+
+
+def _marshal_read(filename):
+    """
+    Reads a profile in the precompiled marshal format (Python-specific, only load trusted files).
+    Only profiles written by the same Python version get read.
+
+    :param filename: the file to read
+    :type filename: str
+    :return: the profile
+    :rtype: dict
+    """
+
+    import marshal
+    with open(filename, "rb") as f:
+        header = f.readline()
+        if header != _marshal_header():
+            if header.startswith(MARSHAL_MAGIC):
+                written = header[len(MARSHAL_MAGIC):].decode("ascii", "replace").strip()
+            else:
+                written = "unknown version"
+            raise Exception("Profile %s was written in the marshal format by another Python version (%s), "
+                            "create it again or convert it again from YAML/JSON" % (filename, written))
+        return marshal.load(f)
+
+
+def _marshal_write(profile, filename):
+    """
+    Writes a profile in the precompiled marshal format, with a header identifying
+    the Python version (see _marshal_header).
+
+    :param profile: the profile to write
+    :type profile: dict
+    :param filename: the file to write to
+    :type filename: str
+    """
+
+    import marshal
+    with open(filename, "wb") as f:
+        f.write(_marshal_header())
+        marshal.dump(profile, f)
+
+
+FORMATS = dict()
+""" the registered formats: name -> (extensions, read function, write function). """
+
+
+def register_format(name, extensions, read, write):
+    """
+    Registers a format for storing profiles.
+
+    :param name: the name of the format
+    :type name: str
+    :param extensions: the file extensions (incl dot), the first one is used for new files
+    :type extensions: list
+    :param read: the function for reading a profile (filename -> profile)
+    :type read: function
+    :param write: the function for writing a profile (profile, filename -> None)
+    :type write: function
+    """
+
+    FORMATS[name] = (list(extensions), read, write)
+
+
+register_format("yaml", [".yaml", ".yml"], _yaml_read, _yaml_write)
+register_format("json", [".json"], _json_read, _json_write)
+register_format("marshal", [".marshal"], _marshal_read, _marshal_write)
+
+
+def format_names():
+    """
+    Returns the names of the registered formats.
+
+    :return: the names
+    :rtype: list
+    """
+
+    return sorted(FORMATS)
+
+
+def format_extensions():
+    """
+    Returns all the file extensions of the registered formats, default format first.
+
+    :return: the extensions
+    :rtype: list
+    """
+
+    result = list(FORMATS[DEFAULT_FORMAT][0])
+    for name in format_names():
+        if name != DEFAULT_FORMAT:
+            result.extend(FORMATS[name][0])
+    return result
+
+
+def format_extension(name):
+    """
+    Returns the extension to use for new files of the format.
+
+    :param name: the name of the format
+    :type name: str
+    :return: the extension
+    :rtype: str
+    """
+
+    if name not in FORMATS:
+        raise Exception("Unknown profile format: %s" % name)
+    return FORMATS[name][0][0]
+
+
+def format_of(filename):
+    """
+    Determines the format from the file's extension, YAML for unknown extensions.
+
+    :param filename: the file to get the format for
+    :type filename: str
+    :return: the name of the format
+    :rtype: str
+    """
+
+    ext = os.path.splitext(filename)[1].lower()
+    for name in FORMATS:
+        if ext in FORMATS[name][0]:
+            return name
+    return DEFAULT_FORMAT
+
+
+def profile_read(filename):
+    """
+    Reads the profile, using the format associated with the file's extension.
+
+    :param filename: the file to read
+    :type filename: str
+    :return: the profile
+    :rtype: dict
+    """
+
+    name = format_of(filename)
+    with timer("read", name):
+        return FORMATS[name][1](filename)
+
+
+def profile_write(profile, filename):
+    """
+    Writes the profile atomically, using the format associated with the file's extension.
+    The file keeps the permissions of the existing one, new files get the
+    default permissions (according to the umask).
+
+    :param profile: the profile to write
+    :type profile: dict
+    :param filename: the file to write to
+    :type filename: str
+    """
+
+    import stat
+    import tempfile
+
+    fd, tmp = tempfile.mkstemp(prefix=".profile-", dir=os.path.dirname(os.path.abspath(filename)))
+    os.close(fd)
+    try:
+        FORMATS[format_of(filename)][2](profile, tmp)
+        # mkstemp creates the file with mode 0600
+        if os.path.exists(filename):
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp, mode)
+        os.replace(tmp, filename)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
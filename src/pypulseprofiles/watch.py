@@ -0,0 +1,62 @@
+import argparse
+import traceback
+from pypulseprofiles.watcher import PulseWatcher
+from pypulseprofiles.metrics import cli_timings
+
+
+def main(args=None):
+    """
+    Listens for PulseAudio devices being added or removed and applies the
+    stored profile that matches the available devices best.
+    Use -h to see all options.
+
+    :param args: the command-line arguments to use, uses sys.argv if None
+    :type args: list
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Listens for PulseAudio devices being added or removed and applies the stored profile that matches the available devices best.',
+        prog="ppp-watch")
+    parser.add_argument("--debounce", metavar="MSEC", dest="debounce", type=float, default=250.0, help="the quiet period in milliseconds to wait for after an event before applying a profile")
+    parser.add_argument("--volume", action="store_true", dest="volume", help="whether to set the volume (per channel if stored, otherwise the average across all channels) and the mute state")
+    parser.add_argument("--move", action="store_true", dest="move", help="whether to move the running playback/recording streams to the new default sink/source")
+    parser.add_argument("--move_apps", metavar="PATTERN", dest="move_apps", nargs="+", default=None, help="the glob patterns for the application names or binaries of the streams to move (e.g., firefox or 'Zoom*'), moves all streams if not provided; implies --move")
+    parser.add_argument("--verbose", action="store_true", dest="verbose", help="whether to output the applied profiles and the event-to-applied latencies")
+    parser.add_argument("--timings", action="store_true", dest="timings", help="whether to output the time spent on connecting, querying/changing the server state and reading profiles (to stderr)")
+    parsed = parser.parse_args(args=args)
+    with cli_timings(parsed.timings):
+        watcher = PulseWatcher(debounce=parsed.debounce / 1000.0, volume=parsed.volume, verbose=parsed.verbose,
+                               move=parsed.move or (parsed.move_apps is not None), move_apps=parsed.move_apps)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        if parsed.verbose:
+            stats = watcher.stats()
+            if stats['count'] > 0:
+                print("Event to applied: count=%d, mean=%.2f ms, max=%.2f ms"
+                      % (stats['count'], stats['mean'] * 1000.0, stats['max'] * 1000.0))
+
+
+def sys_main():
+    """
+    Runs the main function using the system cli arguments, and
+    returns a system error code.
+
+    :return: 0 for success, 1 for failure.
+    :rtype: int
+    """
+
+    try:
+        main()
+        return 0
+    except Exception:
+        print(traceback.format_exc())
+        return 1
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception:
+        print(traceback.format_exc())
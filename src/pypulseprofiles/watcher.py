@@ -0,0 +1,205 @@
+import time
+from pypulseprofiles.backend import loop_stop, connection_errors
+from pypulseprofiles.session import PulseSession
+from pypulseprofiles.core import pulse_apply_profile
+from pypulseprofiles.selection import selection_index
+
+EVENT_MASKS = ["sink", "source", "card"]
+""" the event facilities to subscribe to. """
+
+EVENT_TYPES = ["new", "remove"]
+""" the event types that trigger a re-evaluation of the profiles. """
+
+
+class PulseWatcher(object):
+    """
+    Listens for devices being added or removed over a single persistent
+    connection and applies the stored profile that matches the available
+    devices best. Bursts of events are coalesced, i.e., profiles are only
+    evaluated once no further events arrived within the debounce period.
+    Blocks in poll while waiting for events, hence uses no CPU when idle.
+    Events that arrive while a profile gets applied trigger another evaluation.
+    """
+
+    def __init__(self, debounce=0.25, volume=False, verbose=False, move=False, move_apps=None):
+        """
+        Initializes the watcher.
+
+        :param debounce: the quiet period in seconds to wait for after an event before applying
+        :type debounce: float
+        :param volume: whether to set the volume (per channel if stored) and the mute state (if present)
+        :type volume: bool
+        :param verbose: whether to output information about the applied profiles
+        :type verbose: bool
+        :param move: whether to move the streams (sink inputs/source outputs) to the new default sink/source
+        :type move: bool
+        :param move_apps: the glob patterns for the application names/binaries of the streams to move, None for all
+        :type move_apps: list
+        """
+
+        self.debounce = debounce
+        self.volume = volume
+        self.verbose = verbose
+        self.move = move
+        self.move_apps = move_apps
+        self.session = None
+        self.profiles = dict()
+        self.index = None
+        self._pending = None
+        self._events = 0
+        self._stop = None
+        self.applied = None
+        self.latencies = []
+
+    def _on_event(self, event):
+        """
+        The event callback, flags a pending re-evaluation for relevant events
+        and stops the listening loop.
+
+        :param event: the event
+        :type event: pulsectl.PulseEventInfo
+        """
+
+        if event.t in EVENT_TYPES:
+            self._events += 1
+            if self._pending is None:
+                self._pending = time.perf_counter()
+            raise self._stop()
+
+    def load_profiles(self):
+        """
+        Updates the selection index with the stored profiles that got added, removed or modified.
+
+        :return: the dictionary of profile name -> profile
+        :rtype: dict
+        """
+
+        self.index = selection_index()
+        for name in sorted(self.index.failed):
+            print("Failed to load profile %s: %s" % (name, self.index.failed[name]))
+        self.profiles = self.index.profiles
+        return self.profiles
+
+    def apply_best(self):
+        """
+        Applies the profile that matches the current devices best (including
+        its card profile and moving the streams, see pulse_apply_profile).
+
+        :return: the name of the applied profile, None if none matched
+        :rtype: str
+        """
+
+        snapshot = self.session.refresh()
+        self.load_profiles()
+        name = self.index.best(snapshot)
+        if name is None:
+            return None
+        report = pulse_apply_profile(self.profiles[name], volume=self.volume, session=self.session,
+                                     move=self.move, move_apps=self.move_apps)
+        if self.verbose and any(not step['noop'] for step in report['operations']):
+            print("Applied profile: %s (%.2f ms)" % (name, report['total'] * 1000.0))
+        self.applied = name
+        return name
+
+    def _apply(self):
+        """
+        Applies the best profile, outputting the errors (e.g., a missing port
+        or a failed operation) and keeping the connection. Only a lost
+        connection gets raised, for reconnecting.
+
+        :return: whether successfully applied
+        :rtype: bool
+        """
+
+        try:
+            self.apply_best()
+            return True
+        except connection_errors()[1]:
+            raise
+        except Exception as e:
+            print("Failed to apply profile: %s" % str(e))
+            return False
+
+    def _wait_for_events(self):
+        """
+        Blocks until a relevant event arrived (returns right away if one arrived
+        while applying) and no further ones arrived within the debounce period.
+        The pending event only gets cleared when returning, i.e., before the
+        profiles get evaluated again.
+
+        :return: the time of the first event of the burst (perf_counter)
+        :rtype: float
+        """
+
+        pulse = self.session.pulse
+        while self._pending is None:
+            pulse.event_listen()
+        while True:
+            events = self._events
+            pulse.event_listen(timeout=self.debounce)
+            if self._events == events:
+                break
+        result = self._pending
+        self._pending = None
+        return result
+
+    def _connect(self):
+        """
+        Opens the connection and subscribes to the events.
+        """
+
+        self._stop = loop_stop()
+        self._pending = None
+        self.session = PulseSession()
+        pulse = self.session.pulse
+        pulse.event_mask_set(*EVENT_MASKS)
+        pulse.event_callback_set(self._on_event)
+
+    def stats(self):
+        """
+        Returns statistics about the latency between the first event of a burst and the profile being applied.
+
+        :return: the dictionary with count, last, mean and max (in seconds)
+        :rtype: dict
+        """
+
+        result = dict()
+        result['count'] = len(self.latencies)
+        if len(self.latencies) > 0:
+            result['last'] = self.latencies[-1]
+            result['mean'] = sum(self.latencies) / len(self.latencies)
+            result['max'] = max(self.latencies)
+        return result
+
+    def run(self, retry=1.0):
+        """
+        Applies the best profile and then keeps listening for events, re-applying
+        whenever devices appear or disappear. Reconnects if the connection got lost.
+
+        :param retry: the number of seconds to wait before reconnecting
+        :type retry: float
+        """
+
+        errors, disconnected = connection_errors()
+        while True:
+            try:
+                self._connect()
+                self._apply()
+                while True:
+                    start = self._wait_for_events()
+                    if not self._apply():
+                        continue
+                    self.latencies.append(time.perf_counter() - start)
+                    if self.verbose:
+                        print("Event to applied: %.2f ms" % (self.latencies[-1] * 1000.0))
+            except disconnected:
+                if self.verbose:
+                    print("Connection lost, reconnecting in %.1f s" % retry)
+            except errors as e:
+                if self.verbose:
+                    print("Connection failed (%s), retrying in %.1f s" % (str(e), retry))
+            finally:
+                if self.session is not None:
+                    self.session.close()
+                    self.session = None
+            time.sleep(retry)
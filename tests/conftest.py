@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pypulseprofiles.backend import set_backend
+from pypulseprofiles.fake import FakePulseServer, set_fake_server
+
+
+@pytest.fixture
+def fake_env(tmp_path, monkeypatch):
+    """
+    Selects the fake backend, with the config dir in a temporary home
+    directory and the control server disabled (the tools run in-process).
+    """
+
+    (tmp_path / ".config").mkdir()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PPP_SERVER", "")
+    set_backend("fake")
+    yield tmp_path
+    set_backend(None)
+    set_fake_server(None)
+
+
+@pytest.fixture
+def server(fake_env):
+    """
+    The fake server that the fake backend connects to: two sources and two
+    sinks with two ports each, the first source/sink being the defaults.
+    """
+
+    result = FakePulseServer()
+    result.add_source("alsa_input.pci.analog-stereo", "Built-in Audio Analog Stereo",
+                      ports=[("analog-input-mic", "Microphone"), ("analog-input-linein", "Line In")], volume=0.5)
+    result.add_source("alsa_input.usb.mono", "USB Headset Mono",
+                      ports=[("analog-input-headset", "Headset Microphone"), ("analog-input-mono", "Mono In")],
+                      channels=1, volume=0.6)
+    result.add_sink("alsa_output.pci.analog-stereo", "Built-in Audio Analog Stereo",
+                    ports=[("analog-output-speaker", "Speakers"), ("analog-output-headphones", "Headphones")],
+                    volume=0.7)
+    result.add_sink("alsa_output.usb.analog-stereo", "USB Headset Analog Stereo",
+                    ports=[("analog-output-headset", "Headset"), ("analog-output-lineout", "Line Out")], volume=0.4)
+    set_fake_server(result)
+    return result
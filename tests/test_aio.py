@@ -0,0 +1,115 @@
+import asyncio
+import importlib.util
+import time
+import pytest
+
+from pypulseprofiles import aio
+from pypulseprofiles.backend import set_backend
+from pypulseprofiles.core import pulse_info, pulse_store
+
+PROFILE = {
+    'source': {'device': "alsa_input.usb.mono", 'port': "analog-input-mono", 'volume': 0.9},
+    'sink': {'device': "alsa_output.usb.analog-stereo", 'port': "analog-output-lineout", 'volume': 0.9},
+}
+""" switches to the non-default source/sink, changing their ports and volumes. """
+
+
+def state(server):
+    """
+    Returns the state of the server that applying a profile changes.
+
+    :param server: the fake server
+    :type server: FakePulseServer
+    :return: the defaults and the active port and volumes per source/sink
+    :rtype: tuple
+    """
+
+    devices = [(d.name, d.port_active.name, list(d.volume.values)) for d in server.sources + server.sinks]
+    return server.default_source_name, server.default_sink_name, devices
+
+
+def test_info(server):
+    expected = pulse_info(list_sources=True, list_sinks=True, volume=True)
+    server.reset_calls()
+    assert asyncio.run(aio.pulse_info(list_sources=True, list_sinks=True, volume=True)) == expected
+    assert server.calls == {'connect': 1, 'server_info': 1, 'source_list': 1, 'sink_list': 1}
+
+
+def test_info_concurrent_queries(server):
+    # the queries of the snapshot get issued concurrently, i.e., the latency only adds up once
+    server.latency = 0.05
+    loop = asyncio.new_event_loop()
+    try:
+        session = aio.PulseAsyncSession()
+        loop.run_until_complete(session.pulse())
+        start = loop.time()
+        loop.run_until_complete(aio.pulse_info(session=session))
+        assert loop.time() - start < 0.1
+        session.close()
+    finally:
+        loop.close()
+
+
+def test_create_profile(server):
+    result = asyncio.run(aio.pulse_create_profile(sink_name="USB Headset Analog Stereo", sink_port="Line Out"))
+    assert result == {
+        'source': {'device': "alsa_input.pci.analog-stereo", 'port': "analog-input-mic"},
+        'sink': {'device': "alsa_output.usb.analog-stereo", 'port': "analog-output-lineout"},
+    }
+
+
+def test_apply_profile(server):
+    report = asyncio.run(aio.pulse_apply_profile(PROFILE, volume=True))
+    assert len(report['operations']) == 6
+    assert server.default_source_name == "alsa_input.usb.mono"
+    assert server.default_sink_name == "alsa_output.usb.analog-stereo"
+    assert server.sink("alsa_output.usb.analog-stereo").port_active.name == "analog-output-lineout"
+    assert server.source("alsa_input.usb.mono").volume.values == [0.9]
+
+
+def test_apply_config(server):
+    pulse_store(PROFILE, "usb")
+    asyncio.run(aio.pulse_apply("usb"))
+    assert server.default_sink_name == "alsa_output.usb.analog-stereo"
+
+
+@pytest.mark.parametrize("call", ["port_set", "default_set", "volume_set"])
+def test_failure_restores_state(server, call):
+    before = state(server)
+    server.fail(call)
+    with pytest.raises(Exception, match="restored previous state"):
+        asyncio.run(aio.pulse_apply_profile(PROFILE, volume=True))
+    assert state(server) == before
+
+
+def test_rollback_waits_for_operations_in_flight(server):
+    # the port switch fails right away, while the volume changes are still in flight for 50 ms
+    before = state(server)
+    server.call_latency = {'volume_set': 0.05}
+    server.fail("port_set")
+    start = time.perf_counter()
+    with pytest.raises(Exception, match="restored previous state"):
+        asyncio.run(aio.pulse_apply_profile(PROFILE, volume=True))
+    assert state(server) == before
+    assert server.calls['volume_set'] == 4
+    # the restore operations (50 ms for the volumes) only got issued once the volume changes completed
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_failed_rollback_reported(server):
+    server.fail("port_set", times=3)
+    with pytest.raises(Exception, match="failed to restore previous state as well"):
+        asyncio.run(aio.pulse_apply_profile(PROFILE, volume=True))
+
+
+def test_card_not_supported(server):
+    with pytest.raises(Exception, match="'card' section"):
+        asyncio.run(aio.pulse_apply_profile(dict(PROFILE, card={'device': "card", 'profile': "off"})))
+
+
+def test_missing_pulsectl_asyncio(server):
+    if importlib.util.find_spec("pulsectl_asyncio") is not None:
+        pytest.skip("pulsectl-asyncio is installed")
+    set_backend("pulsectl")
+    with pytest.raises(ImportError, match="pip install python-pulseaudio-profiles\\[asyncio\\]"):
+        aio.pulse_async_instance()
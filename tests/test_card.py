@@ -0,0 +1,84 @@
+import pytest
+
+from pypulseprofiles.core import pulse_apply_profile, pulse_switch_card, pulse_previous_state, PulseSession
+
+PROFILE = {
+    'card': {'device': "bluez_card.headset", 'profile': "a2dp_sink"},
+    'source': {'device': "alsa_input.pci.analog-stereo"},
+    'sink': {'device': "bluez_sink.headset.a2dp_sink"},
+}
+""" switches the headset to A2DP, using the built-in microphone. """
+
+
+@pytest.fixture
+def headset(server):
+    """
+    Adds a Bluetooth headset in HSP mode that provides the default source/sink,
+    with the devices of a card profile appearing after a short delay.
+    """
+
+    server.add_card("bluez_card.headset", "Headset",
+                    profiles=[("headset_head_unit", "Headset Head Unit",
+                               [("bluez_source.headset.hsp", "Headset Microphone", [("headset-input", "Headset")])],
+                               [("bluez_sink.headset.hsp", "Headset", [("headset-output", "Headset")])]),
+                              ("a2dp_sink", "High Fidelity Playback", [],
+                               [("bluez_sink.headset.a2dp_sink", "Headset", [("headset-output", "Headset")])])],
+                    active="headset_head_unit")
+    server.default_source_name = "bluez_source.headset.hsp"
+    server.default_sink_name = "bluez_sink.headset.hsp"
+    server.card_delay = 0.02
+    return server
+
+
+def test_switch(headset):
+    report = pulse_apply_profile(PROFILE)
+    assert headset.card("bluez_card.headset").profile_active.name == "a2dp_sink"
+    assert headset.default_source_name == "alsa_input.pci.analog-stereo"
+    assert headset.default_sink_name == "bluez_sink.headset.a2dp_sink"
+    assert report['devices'] > 0
+
+
+@pytest.mark.parametrize("call", ["default_set", "port_set"])
+def test_failure_restores_card_and_defaults(headset, call):
+    profile = dict(PROFILE)
+    profile['sink'] = {'device': "bluez_sink.headset.a2dp_sink", 'port': "headset-output"}
+    # the source's operations come first, i.e., the failure happens before any of the sink
+    profile['source'] = {'device': "alsa_input.pci.analog-stereo", 'port': "analog-input-linein"}
+    headset.fail(call)
+    with pytest.raises(Exception, match="restored previous state"):
+        pulse_apply_profile(profile)
+    assert headset.card("bluez_card.headset").profile_active.name == "headset_head_unit"
+    assert headset.default_source_name == "bluez_source.headset.hsp"
+    assert headset.default_sink_name == "bluez_sink.headset.hsp"
+    assert headset.source("alsa_input.pci.analog-stereo").port_active.name == "analog-input-mic"
+
+
+def test_failure_restores_volume(headset):
+    headset.sink("bluez_sink.headset.hsp").volume.values[:] = [0.3, 0.3]
+    headset.fail("default_set")
+    with pytest.raises(Exception):
+        pulse_apply_profile(PROFILE)
+    # the devices of the card get re-created with full volume, the previous volume gets re-applied
+    assert headset.sink("bluez_sink.headset.hsp").volume.values == pytest.approx([0.3, 0.3], abs=1e-4)
+
+
+def test_timeout_restores_card_and_defaults(headset):
+    profile = dict(PROFILE)
+    profile['sink'] = {'device': "bluez_sink.headset.missing"}
+    with PulseSession() as session:
+        with pytest.raises(Exception, match="did not become available within 0.1 s"):
+            pulse_switch_card(profile, session, timeout=0.1, previous=pulse_previous_state(session.snapshot()))
+    assert headset.card("bluez_card.headset").profile_active.name == "headset_head_unit"
+    assert headset.default_sink_name == "bluez_sink.headset.hsp"
+
+
+def test_session_subscriptions_kept(headset):
+    def callback(event):
+        pass
+
+    with PulseSession() as session:
+        session.pulse.event_mask_set("server")
+        session.pulse.event_callback_set(callback)
+        pulse_apply_profile(PROFILE, session=session)
+        assert session.pulse.event_masks == ("server",)
+        assert session.pulse._callback is callback
@@ -0,0 +1,141 @@
+import os
+import socket
+import stat
+import threading
+import time
+import pytest
+
+from pypulseprofiles import control
+from pypulseprofiles.backend import set_backend
+from pypulseprofiles.core import pulse_store
+from pypulseprofiles.control import PulseControlServer, ControlUnavailable, control_request, control_stream, \
+    socket_dir, socket_file, _private_dir
+
+
+@pytest.fixture
+def runtime_dir(fake_env, monkeypatch):
+    """
+    The user runtime dir in the temporary home directory, with the control server enabled.
+    """
+
+    result = fake_env / "run"
+    result.mkdir(mode=0o700)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(result))
+    monkeypatch.delenv("PPP_SERVER")
+    return result
+
+
+def start_server():
+    """
+    Runs the control server in a separate thread and waits for it to accept requests.
+
+    :return: the thread running the server
+    :rtype: threading.Thread
+    """
+
+    result = threading.Thread(target=PulseControlServer().run, daemon=True)
+    result.start()
+    for _ in range(200):
+        try:
+            control_request("ping")
+            return result
+        except ControlUnavailable:
+            time.sleep(0.01)
+    raise Exception("Control server did not start")
+
+
+def test_socket_file(runtime_dir, monkeypatch):
+    assert socket_file() == os.path.join(str(runtime_dir), "python-pulseaudio-profiles", "control.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    assert socket_dir().endswith("python-pulseaudio-profiles-%d" % os.getuid())
+    monkeypatch.setenv("PPP_SERVER", "/path/to/ppp.sock")
+    assert socket_file() == "/path/to/ppp.sock"
+
+
+def test_private_socket(server, runtime_dir):
+    thread = start_server()
+    try:
+        assert stat.S_IMODE(os.stat(socket_dir()).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(socket_file()).st_mode) & 0o077 == 0
+        assert control_request("info") == {
+            'default_source': {'device': "Built-in Audio Analog Stereo", 'port': "Microphone"},
+            'default_sink': {'device': "Built-in Audio Analog Stereo", 'port': "Speakers"},
+        }
+    finally:
+        control_request("shutdown")
+        thread.join(5.0)
+    assert not os.path.exists(socket_file())
+
+
+def test_shared_dir_rejected(server, runtime_dir):
+    os.mkdir(socket_dir(), 0o755)
+    os.chmod(socket_dir(), 0o755)
+    with pytest.raises(Exception, match="accessible by other users"):
+        PulseControlServer().run()
+
+
+def test_foreign_socket_rejected(server, runtime_dir, monkeypatch):
+    thread = start_server()
+    try:
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+        with pytest.raises(ControlUnavailable, match="not owned by current user"):
+            control_request("ping")
+        monkeypatch.setattr(os, "getuid", lambda: uid)
+    finally:
+        control_request("shutdown")
+        thread.join(5.0)
+
+
+@pytest.mark.parametrize("change", [lambda m: m.setenv("PULSE_SERVER", "tcp:elsewhere"),
+                                    lambda m: set_backend("pulsectl"),
+                                    lambda m: m.setenv("HOME", "/nonexistent")],
+                         ids=["pulse_server", "backend", "config_dir"])
+def test_context_mismatch(server, runtime_dir, monkeypatch, change):
+    thread = start_server()
+    try:
+        # the client executes the command in-process instead of the server acting on its own context
+        change(monkeypatch)
+        with pytest.raises(ControlUnavailable, match="different context"):
+            control_request("info")
+        with pytest.raises(ControlUnavailable, match="different context"):
+            control_stream("info_stream")
+        assert control_request("ping")['requests'] > 0
+    finally:
+        set_backend("fake")
+        control_request("shutdown")
+        thread.join(5.0)
+
+
+def test_hung_server(runtime_dir, monkeypatch):
+    # accepts connections, but never responds
+    _private_dir(socket_dir())
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(socket_file())
+    sock.listen(1)
+    monkeypatch.setattr(control, "CONTROL_TIMEOUT", 0.1)
+    try:
+        with pytest.raises(ControlUnavailable, match="did not respond within 0.1 s"):
+            control_request("info")
+    finally:
+        sock.close()
+
+
+def test_apply_refreshes_snapshot(server, runtime_dir):
+    profile = {'source': {'device': "alsa_input.pci.analog-stereo"},
+               'sink': {'device': "alsa_output.usb.analog-stereo", 'port': "analog-output-lineout"}}
+    pulse_store(profile, "usb")
+    thread = start_server()
+    try:
+        control_request("apply", config="usb")
+        # the events of applying have arrived, the snapshot retrieved for the info is up to date
+        time.sleep(0.1)
+        control_request("info")
+        # changed without an event reaching the server (yet)
+        sink = server.sink("alsa_output.usb.analog-stereo")
+        sink.port_active = sink.port_list[0]
+        control_request("apply", config="usb")
+        assert sink.port_active.name == "analog-output-lineout"
+    finally:
+        control_request("shutdown")
+        thread.join(5.0)
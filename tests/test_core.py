@@ -0,0 +1,247 @@
+import itertools
+import os
+import pytest
+
+from pypulseprofiles.core import pulse_info, pulse_info_stream, pulse_create_profile, pulse_apply_profile, pulse_apply, \
+    pulse_store, pulse_load, pulse_snapshot_entries, pulse_create_all, derive_config_name, PulseSession
+from pypulseprofiles.fake import FakePulseError
+
+SNAPSHOT_CALLS = {'connect': 1, 'server_info': 1, 'source_list': 1, 'sink_list': 1}
+""" the calls for connecting and obtaining the server state. """
+
+PROFILE = {
+    'source': {'device': "USB Headset Mono", 'port': "Mono In"},
+    'sink': {'device': "alsa_output.usb.analog-stereo", 'port': "analog-output-lineout", 'volume': 0.9},
+    'description': "USB headset",
+}
+""" profile for the non-default source/sink, using a description for the source. """
+
+
+def calls(**kwargs):
+    """
+    Returns the expected calls: the ones of the snapshot plus the specified ones.
+
+    :return: the dictionary of call -> count
+    :rtype: dict
+    """
+
+    result = dict(SNAPSHOT_CALLS)
+    result.update(kwargs)
+    return result
+
+
+def test_info_defaults(server):
+    assert pulse_info() == {
+        'default_source': {'device': "Built-in Audio Analog Stereo", 'port': "Microphone"},
+        'default_sink': {'device': "Built-in Audio Analog Stereo", 'port': "Speakers"},
+    }
+    assert server.calls == calls()
+
+
+def test_info_lists(server):
+    result = pulse_info(list_sources=True, list_sinks=True, volume=True)
+    assert [s['device'] for s in result['sources']] == ["Built-in Audio Analog Stereo", "USB Headset Mono"]
+    assert [s['device'] for s in result['sinks']] == ["Built-in Audio Analog Stereo", "USB Headset Analog Stereo"]
+    assert result['sinks'][1] == {'device': "USB Headset Analog Stereo", 'port': "Headset", 'volume': 0.4}
+    assert result['default_sink'] == result['sinks'][0]
+    assert server.calls == calls()
+
+
+def test_info_verbose_fields(server):
+    result = pulse_info(list_sources=True, verbose=True, fields=["device", "volume"])
+    assert result['default_source'] == {'device': {'name': "alsa_input.pci.analog-stereo",
+                                                   'description': "Built-in Audio Analog Stereo", 'volume': 0.5}}
+    assert "sinks" not in result
+    with pytest.raises(Exception, match="Unknown field"):
+        pulse_info(fields=["channels"])
+
+
+def test_info_stream(server):
+    entries = list(pulse_info_stream(list_sinks=True))
+    assert [list(e)[0] for e in entries] == ["default_source", "default_sink", "sink", "sink"]
+    assert server.calls == calls()
+
+
+def test_info_stream_lazy(server):
+    class Broken(object):
+        name = "broken"
+
+        @property
+        def description(self):
+            raise Exception("converted too early")
+
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        snapshot.sinks.append(Broken())
+        entries = pulse_snapshot_entries(snapshot, list_sinks=True)
+        # the entries before the broken sink get generated without converting it
+        assert [key for key, _ in itertools.islice(entries, 4)] == ["default_source", "default_sink", "sink", "sink"]
+        with pytest.raises(Exception, match="converted too early"):
+            next(entries)
+
+
+def test_info_shared_session(server):
+    with PulseSession() as session:
+        pulse_info(session=session)
+        pulse_info(list_sources=True, session=session)
+    # the snapshot gets reused by the second call
+    assert server.calls == calls()
+
+
+def test_info_failure(server):
+    server.fail("sink_list")
+    with pytest.raises(FakePulseError, match="Injected failure: sink_list"):
+        pulse_info()
+
+
+def test_create_profile_defaults(server):
+    assert pulse_create_profile(desc="built-in") == {
+        'source': {'device': "alsa_input.pci.analog-stereo", 'port': "analog-input-mic"},
+        'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-speaker"},
+        'description': "built-in",
+    }
+    assert server.calls == calls()
+
+
+def test_create_profile_descriptions_volume(server):
+    result = pulse_create_profile(source_name="USB Headset Mono", source_port="Mono In",
+                                  sink_name="alsa_output.usb.analog-stereo", volume=True)
+    assert result['source'] == {'device': "alsa_input.usb.mono", 'port': "analog-input-mono", 'volume': 0.6,
+                                'channels': [39322], 'channel_map': ["mono"], 'mute': False}
+    assert result['sink']['port'] == "analog-output-headset"
+    assert result['sink']['channels'] == [26214, 26214]
+
+
+def test_create_profile_unknown(server):
+    with pytest.raises(Exception, match="Unknown source: nope"):
+        pulse_create_profile(source_name="nope")
+    server.remove_sink("alsa_output.pci.analog-stereo")
+    server.remove_sink("alsa_output.usb.analog-stereo")
+    with pytest.raises(Exception, match="No default sink available"):
+        pulse_create_profile()
+
+
+def test_create_profile_failure(server):
+    server.fail("server_info")
+    with pytest.raises(FakePulseError):
+        pulse_create_profile()
+
+
+def test_create_all_names(server):
+    server.add_sink("alsa_output.jp", "\u30d8\u30c3\u30c9\u30db\u30f3", ports=[("analog-output", "!!!"), ("", "\u2605")])
+    files = pulse_create_all(sources=["alsa_input.pci.*"], source_ports=["Microphone"], sinks=["alsa_output.jp"])
+    # falls back on the names of the device and port, and their position if even the name is unusable
+    assert [os.path.basename(f) for f in files] == [
+        "built-in-audio-analog-stereo_microphone_alsa-output-jp_analog-output.yaml",
+        "built-in-audio-analog-stereo_microphone_alsa-output-jp_port-2.yaml",
+    ]
+
+
+def test_derive_config_name():
+    assert derive_config_name("USB Headset", None, ("", "Line Out")) == "usb-headset_line-out"
+    with pytest.raises(Exception, match="Cannot derive a config name"):
+        derive_config_name("...", ("\u2605",))
+
+
+def test_apply_profile(server):
+    report = pulse_apply_profile(PROFILE, volume=True)
+    assert server.default_source_name == "alsa_input.usb.mono"
+    assert server.default_sink_name == "alsa_output.usb.analog-stereo"
+    assert server.source("alsa_input.usb.mono").port_active.name == "analog-input-mono"
+    assert server.sink("alsa_output.usb.analog-stereo").port_active.name == "analog-output-lineout"
+    assert server.sink("alsa_output.usb.analog-stereo").volume.values == [0.9, 0.9]
+    assert [step['noop'] for step in report['operations']] == [False] * 5
+    assert server.calls == calls(default_set=2, port_set=2, volume_set=1)
+
+
+def test_apply_profile_noop(server):
+    pulse_apply_profile(PROFILE, volume=True)
+    server.reset_calls()
+    report = pulse_apply_profile(PROFILE, volume=True)
+    assert all(step['noop'] for step in report['operations'])
+    assert server.calls == calls()
+
+
+def test_apply_profile_without_volume(server):
+    pulse_apply_profile(PROFILE)
+    assert server.sink("alsa_output.usb.analog-stereo").volume.values == [0.4, 0.4]
+    assert "volume_set" not in server.calls
+
+
+def test_apply_profile_unavailable(server):
+    with pytest.raises(Exception, match="Sink port is not available: nope"):
+        pulse_apply_profile({'source': PROFILE['source'], 'sink': {'device': PROFILE['sink']['device'], 'port': "nope"}})
+    with pytest.raises(Exception, match="No 'sink' section"):
+        pulse_apply_profile({'source': PROFILE['source']})
+    # nothing gets changed if the profile can't be resolved
+    assert server.calls.get("default_set", 0) == 0
+
+
+def test_apply_profile_failure(server):
+    server.fail("volume_set")
+    with pytest.raises(Exception, match="restored previous state.*Injected failure: volume_set"):
+        pulse_apply_profile(PROFILE, volume=True)
+    assert server.default_source_name == "alsa_input.pci.analog-stereo"
+    assert server.default_sink_name == "alsa_output.pci.analog-stereo"
+
+
+def test_apply_dry_run(server):
+    report = pulse_apply_profile(PROFILE, volume=True, dry_run=True)
+    assert report['changes'] == 5
+    assert report['round_trips'] == {'snapshot': 3, 'operations': 5, 'total': 8}
+    assert server.default_source_name == "alsa_input.pci.analog-stereo"
+    assert server.calls == calls()
+
+
+def test_apply_config_name(server):
+    pulse_store(PROFILE, "usb")
+    assert pulse_load("usb") == PROFILE
+    pulse_apply("usb", volume=True)
+    assert server.default_sink_name == "alsa_output.usb.analog-stereo"
+    assert server.calls == calls(default_set=2, port_set=2, volume_set=1)
+
+    # the compiled profile gets reused, i.e., the server state is only queried
+    server.reset_calls()
+    report = pulse_apply("usb", volume=True)
+    assert all(step['noop'] for step in report['operations'])
+    assert server.calls == calls()
+
+
+def test_apply_config_file(server, fake_env):
+    filename = os.path.join(str(fake_env), "usb.yaml")
+    pulse_store(PROFILE, filename)
+    pulse_apply(filename)
+    assert server.default_source_name == "alsa_input.usb.mono"
+
+
+def test_apply_config_missing(server):
+    with pytest.raises(Exception, match="Profile does not exist: missing"):
+        pulse_apply("missing")
+
+
+def test_apply_config_failure(server):
+    pulse_store(PROFILE, "usb")
+    server.fail("port_set")
+    with pytest.raises(Exception, match="restored previous state"):
+        pulse_apply("usb")
+    assert server.default_source_name == "alsa_input.pci.analog-stereo"
+    assert server.source("alsa_input.usb.mono").port_active.name == "analog-input-headset"
+
+
+def test_apply_connect_failure(server):
+    server.fail("connect")
+    with pytest.raises(FakePulseError, match="Injected failure: connect"):
+        pulse_apply_profile(PROFILE)
+
+
+def test_fake_changes_server_side_only(server):
+    # like with pulsectl, the objects of a listing are not updated by changes, only a new listing reflects them
+    with PulseSession() as session:
+        pulse = session.pulse
+        sink = pulse.sink_list()[1]
+        pulse.port_set(sink, "analog-output-lineout")
+        pulse.volume_set(sink, type(sink.volume)([0.1, 0.1]))
+        pulse.mute(sink, True)
+        assert (sink.port_active.name, sink.volume.values, sink.mute) == ("analog-output-headset", [0.4, 0.4], 0)
+        sink = pulse.sink_list()[1]
+        assert (sink.port_active.name, sink.volume.values, sink.mute) == ("analog-output-lineout", [0.1, 0.1], 1)
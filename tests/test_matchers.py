@@ -0,0 +1,29 @@
+from pypulseprofiles import matchers
+from pypulseprofiles.core import PulseSession
+from pypulseprofiles.matchers import compile_matcher
+
+
+def test_literal_newest_device(server):
+    # the same description as an existing sink, and a description equal to the name of an existing sink
+    first = server.add_sink("alsa_output.usb-2.analog-stereo", "USB Headset Analog Stereo")
+    second = server.add_sink("alsa_output.renamed", "alsa_output.pci.analog-stereo")
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        assert snapshot.sink({'glob': "USB Headset Analog Stereo"}).name == first.name
+        assert snapshot.sink({'glob': "alsa_output.pci.analog-stereo"}).name == second.name
+        # plain strings keep preferring names and the first device with the description
+        assert snapshot.sink("USB Headset Analog Stereo").name == "alsa_output.usb.analog-stereo"
+        assert snapshot.sink("alsa_output.pci.analog-stereo").name == "alsa_output.pci.analog-stereo"
+
+
+def test_cache_by_content(monkeypatch):
+    monkeypatch.setattr(matchers, "_matchers", type(matchers._matchers)())
+    monkeypatch.setattr(matchers, "MAX_MATCHERS", 2)
+    first = compile_matcher({'glob': "USB*"})
+    assert compile_matcher({'glob': "USB*"}) is first
+    compile_matcher({'regex': "^alsa"})
+    # the least recently used one gets discarded
+    assert compile_matcher({'glob': "USB*"}) is first
+    compile_matcher({'glob': "HDMI*"})
+    assert len(matchers._matchers) == 2
+    assert list(matchers._matchers) == [matchers.matcher_key({'glob': "USB*"}), matchers.matcher_key({'glob': "HDMI*"})]
@@ -0,0 +1,63 @@
+import os
+import threading
+import pytest
+
+from pypulseprofiles.config import config_dir
+from pypulseprofiles.core import pulse_store
+from pypulseprofiles.fake import fake_scenario, set_fake_server
+from pypulseprofiles.multi import pulse_apply_servers, pulse_info_servers
+from pypulseprofiles.selection import SelectionIndex, selection_index
+
+SERVERS = [None, "second", "third"]
+""" the fake servers to apply to, the default one and two generated ones. """
+
+
+@pytest.fixture
+def servers(server):
+    """
+    The fake servers, the default one plus two generated ones with the same devices as each other.
+    """
+
+    result = {None: server}
+    for name in SERVERS[1:]:
+        result[name] = fake_scenario(sources=2, sinks=2)
+        set_fake_server(result[name], name)
+    yield result
+    for name in SERVERS[1:]:
+        set_fake_server(None, name)
+
+
+def test_apply_config(servers):
+    pulse_store({'source': {'device': "Fake Input 1"}, 'sink': {'device': "Fake Output 1"}}, "fake")
+    result = pulse_apply_servers("fake", SERVERS)
+    assert [o['success'] for o in result['servers']] == [False, True, True]
+    assert result['failed'] == 1
+    assert servers["second"].default_sink_name == servers["second"].sinks[1].name
+
+
+def test_apply_auto_index_read_only(servers, monkeypatch):
+    pulse_store({'source': {'device': "Fake Input 1"}, 'sink': {'device': "Fake Output 1"}}, "fake")
+    pulse_store({'source': {'device': "alsa_input.usb.mono"}, 'sink': {'device': "alsa_output.usb.analog-stereo"}}, "usb")
+    selection_index()
+    # modified in place, i.e., without changing the modification time of the config dir
+    with open(os.path.join(config_dir(), "fake.yaml"), "a") as f:
+        f.write("priority: 1\n")
+    syncs = []
+    original = SelectionIndex.sync
+
+    def sync(self, force=False):
+        syncs.append(threading.current_thread() is threading.main_thread())
+        return original(self, force=force)
+
+    monkeypatch.setattr(SelectionIndex, "sync", sync)
+    result = pulse_apply_servers(None, SERVERS, workers=3)
+    assert [o['result']['profile'] for o in result['servers']] == ["usb", "fake", "fake"]
+    # synchronized before the threads got started, not by the threads
+    assert syncs == [True, True]
+    assert selection_index().profiles["fake"]['priority'] == 1
+
+
+def test_info(servers):
+    result = pulse_info_servers(SERVERS, list_sinks=True)
+    assert result['failed'] == 0
+    assert [len(o['result']['sinks']) for o in result['servers']] == [2, 2, 2]
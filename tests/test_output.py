@@ -0,0 +1,76 @@
+import io
+import json
+import pytest
+import yaml
+
+from pypulseprofiles.core import pulse_info, pulse_info_stream
+from pypulseprofiles.output import output_data, output_entries, output_dumps, OUTPUT_FORMATS
+
+ENTRIES = [
+    {'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-speaker", 'volume': 0.7}},
+    {'source': {'device': "USB Headset Mono", 'channels': [39322], 'mute': False, 'description': "line 1\nline 2"}},
+    {'default_sink': None},
+]
+""" entries with nested, multi-line and null values. """
+
+
+def parse(text, output_format, stream=False):
+    """
+    Parses the output.
+
+    :param text: the output to parse
+    :type text: str
+    :param output_format: the format of the output (yaml|json|jsonl)
+    :type output_format: str
+    :param stream: whether the output was generated by output_entries()
+    :type stream: bool
+    :return: the parsed data, the list of entries in case of streamed output
+    """
+
+    if output_format == "yaml":
+        return list(yaml.safe_load_all(text)) if stream else yaml.safe_load(text)
+    elif output_format == "json":
+        return json.loads(text)
+    else:
+        lines = [json.loads(line) for line in text.splitlines()]
+        return lines if stream else lines[0]
+
+
+def output(function, data, output_format):
+    """
+    Returns the output of output_data() or output_entries() as string.
+    """
+
+    out = io.StringIO()
+    function(data, output_format, out=out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_data_round_trip(output_format):
+    assert parse(output(output_data, ENTRIES, output_format), output_format) == ENTRIES
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_entries_round_trip(output_format):
+    assert parse(output(output_entries, ENTRIES, output_format), output_format, stream=True) == ENTRIES
+    assert parse(output(output_entries, [], output_format), output_format, stream=True) == []
+
+
+def test_streamed_json_identical():
+    # the streamed array is indistinguishable from the complete one
+    assert output(output_entries, ENTRIES, "json") == output(output_data, ENTRIES, "json")
+    assert output(output_entries, [], "json") == output(output_data, [], "json")
+
+
+def test_formats_equivalent(server):
+    data = pulse_info(list_sources=True, list_sinks=True, volume=True)
+    entries = list(pulse_info_stream(list_sources=True, list_sinks=True, volume=True))
+    for output_format in OUTPUT_FORMATS:
+        assert parse(output(output_data, data, output_format), output_format) == data
+        assert parse(output(output_entries, entries, output_format), output_format, stream=True) == entries
+
+
+def test_unknown_format():
+    with pytest.raises(Exception, match="Unknown output format 'xml'"):
+        output_dumps(ENTRIES, "xml")
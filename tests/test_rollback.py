@@ -0,0 +1,123 @@
+import re
+import pytest
+
+from pypulseprofiles.core import pulse_apply_profile, PulseSession
+from pypulseprofiles.plan import pulse_plan, pulse_rollback_plan, pulse_execute
+
+LATENCY = 0.002
+""" the time in seconds that every call to the fake server takes. """
+
+ROLLBACK_BOUND = 0.05
+""" the maximum time in seconds that restoring the previous state may take (at most 6 operations, i.e., 12 ms of latency). """
+
+PROFILE = {
+    'source': {'device': "alsa_input.usb.mono", 'port': "analog-input-mono", 'volume': 0.9},
+    'sink': {'device': "alsa_output.usb.analog-stereo", 'port': "analog-output-lineout", 'volume': 0.9},
+}
+""" switches to the non-default source/sink, changing their ports and volumes. """
+
+
+def state(server):
+    """
+    Returns the state of the server that applying a profile changes.
+
+    :param server: the fake server
+    :type server: FakePulseServer
+    :return: the defaults and the active port and volumes per source/sink
+    :rtype: tuple
+    """
+
+    devices = [(d.name, d.port_active.name, list(d.volume.values), d.mute) for d in server.sources + server.sinks]
+    return server.default_source_name, server.default_sink_name, devices
+
+
+def rollback_time(error):
+    """
+    Extracts the time it took to restore the previous state from the error message.
+
+    :param error: the error raised by pulse_execute
+    :type error: Exception
+    :return: the time in seconds
+    :rtype: float
+    """
+
+    match = re.search(r"restored previous state \(([0-9.]+) ms\)", str(error))
+    assert match is not None, str(error)
+    return float(match.group(1)) / 1000.0
+
+
+@pytest.mark.parametrize("call", ["port_set", "default_set", "volume_set"])
+def test_failure_restores_state(server, call):
+    before = state(server)
+    server.latency = LATENCY
+    server.fail(call)
+    with pytest.raises(Exception, match="restored previous state") as info:
+        pulse_apply_profile(PROFILE, volume=True)
+    assert state(server) == before
+    assert rollback_time(info.value) < ROLLBACK_BOUND
+
+
+def test_failure_of_sink_restores_source(server):
+    # the source's port is already active, i.e., the first port_set is the one of the sink
+    source = server.source("alsa_input.usb.mono")
+    source.port_active = source.port_list[1]
+    profile = {'source': dict(PROFILE['source']), 'sink': {'device': "alsa_output.pci.analog-stereo",
+                                                           'port': "analog-output-headphones"}}
+    before = state(server)
+    server.fail("port_set")
+    with pytest.raises(Exception, match="restored previous state"):
+        pulse_apply_profile(profile, volume=True)
+    assert state(server) == before
+    assert server.default_source_name == "alsa_input.pci.analog-stereo"
+
+
+def test_rollback_only_undoes_changes(server):
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        operations = pulse_plan(PROFILE, snapshot, volume=True)
+        restore = pulse_rollback_plan(operations, snapshot)
+    assert [str(op) for op in restore] == [
+        "sink port_set alsa_output.usb.analog-stereo analog-output-headset",
+        "sink volume_set alsa_output.usb.analog-stereo [0.4, 0.4]",
+        "sink default_set alsa_output.pci.analog-stereo",
+        "source port_set alsa_input.usb.mono analog-input-headset",
+        "source volume_set alsa_input.usb.mono [0.6]",
+        "source default_set alsa_input.pci.analog-stereo",
+    ]
+    assert all(not op.noop for op in restore)
+
+
+def test_rollback_round_trips_bounded(server):
+    server.fail("volume_set")
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        operations = pulse_plan(PROFILE, snapshot, volume=True)
+        restore = pulse_rollback_plan(operations, snapshot)
+        server.reset_calls()
+        with pytest.raises(Exception, match="restored previous state"):
+            pulse_execute(session.pulse, operations, rollback=restore)
+    # source default_set and the failed volume_set, then every restore operation once
+    assert server.round_trips == 2 + len(restore)
+
+
+def test_failed_rollback_reported(server):
+    server.fail("port_set", times=2)
+    with pytest.raises(Exception, match="failed to restore previous state as well"):
+        pulse_apply_profile(PROFILE, volume=True)
+
+
+def test_no_rollback_without_plan(server):
+    server.fail("port_set")
+    with PulseSession() as session:
+        snapshot = session.snapshot()
+        with pytest.raises(Exception, match="Injected failure: port_set"):
+            pulse_execute(session.pulse, pulse_plan(PROFILE, snapshot, volume=True))
+    # the source has already been made the default one
+    assert server.default_source_name == "alsa_input.usb.mono"
+
+
+def test_no_rollback_when_disabled(server):
+    server.fail("port_set")
+    with pytest.raises(Exception, match="Injected failure: port_set"):
+        pulse_apply_profile(PROFILE, volume=True, rollback=False)
+    assert server.default_source_name == "alsa_input.usb.mono"
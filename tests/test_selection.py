@@ -0,0 +1,67 @@
+from pypulseprofiles.core import pulse_store, pulse_apply_auto, PulseSession
+from pypulseprofiles.selection import pulse_best_profile, selection_index
+
+SPEAKERS = {
+    'source': {'device': "alsa_input.pci.analog-stereo"},
+    'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-speaker"},
+}
+""" profile for the built-in speakers. """
+
+HEADPHONES = {
+    'source': {'device': "alsa_input.pci.analog-stereo"},
+    'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-headphones"},
+}
+""" profile for the headphones plugged into the built-in jack. """
+
+
+def best(profiles):
+    """
+    Returns the best of the profiles for the current state of the fake server.
+
+    :param profiles: the dictionary of profile name -> profile
+    :type profiles: dict
+    :return: the name of the best profile
+    :rtype: str
+    """
+
+    with PulseSession() as session:
+        return pulse_best_profile(profiles, session.snapshot())
+
+
+def test_port_availability(server):
+    ports = {p.name: p for p in server.sink("alsa_output.pci.analog-stereo").port_list}
+    ports["analog-output-headphones"].available = "no"
+    assert best({'headphones': HEADPHONES, 'speakers': SPEAKERS}) == "speakers"
+    ports["analog-output-headphones"].available = "yes"
+    ports["analog-output-speaker"].available = "no"
+    assert best({'headphones': HEADPHONES, 'speakers': SPEAKERS}) == "headphones"
+
+
+def test_unavailable_port_after_device_only(server):
+    ports = {p.name: p for p in server.sink("alsa_output.pci.analog-stereo").port_list}
+    ports["analog-output-headphones"].available = "no"
+    builtin = {'source': SPEAKERS['source'], 'sink': {'device': "alsa_output.pci.analog-stereo"}}
+    assert best({'a': HEADPHONES, 'b': builtin}) == "b"
+    # still selected if nothing else matches
+    assert best({'a': HEADPHONES}) == "a"
+
+
+def test_ties_resolved_by_name(server):
+    profiles = {'b': SPEAKERS, 'a': dict(SPEAKERS), 'c': dict(SPEAKERS)}
+    assert best(profiles) == "a"
+    assert best(dict(reversed(list(profiles.items())))) == "a"
+
+
+def test_invalid_priority(server):
+    pulse_store(dict(HEADPHONES, priority="high"), "broken")
+    pulse_store(SPEAKERS, "speakers")
+    index = selection_index()
+    assert "broken" in index.failed
+    assert "Invalid priority" in index.failed["broken"]
+    assert pulse_apply_auto()['profile'] == "speakers"
+    assert best({'broken': dict(HEADPHONES, priority="high")}) is None
+
+
+def test_priority(server):
+    assert best({'a': SPEAKERS, 'b': dict(HEADPHONES, priority=1)}) == "b"
+    assert best({'a': SPEAKERS, 'b': dict(HEADPHONES, priority="-1")}) == "a"
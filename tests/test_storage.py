@@ -0,0 +1,44 @@
+import os
+import stat
+import pytest
+
+from pypulseprofiles.storage import profile_read, profile_write, format_names, format_extension
+
+PROFILE = {'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-speaker", 'volume': 0.7}}
+
+
+@pytest.mark.parametrize("name", format_names())
+def test_round_trip(tmp_path, name):
+    filename = str(tmp_path / ("profile" + format_extension(name)))
+    profile_write(PROFILE, filename)
+    assert profile_read(filename) == PROFILE
+
+
+def test_marshal_other_version(tmp_path):
+    filename = str(tmp_path / "profile.marshal")
+    profile_write(PROFILE, filename)
+    with open(filename, "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data.replace(data[:data.index(b"\n")], b"ppp-marshal 2.7 2", 1))
+    with pytest.raises(Exception, match=r"another Python version \(2.7 2\)"):
+        profile_read(filename)
+    # no header at all
+    with open(filename, "wb") as f:
+        f.write(data[data.index(b"\n") + 1:])
+    with pytest.raises(Exception, match="another Python version"):
+        profile_read(filename)
+
+
+def test_permissions(tmp_path):
+    filename = str(tmp_path / "profile.yaml")
+    umask = os.umask(0o022)
+    try:
+        profile_write(PROFILE, filename)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o644
+    os.chmod(filename, 0o640)
+    profile_write(PROFILE, filename)
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+    assert os.listdir(str(tmp_path)) == ["profile.yaml"]
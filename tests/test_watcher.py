@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+
+from pypulseprofiles.core import pulse_store
+from pypulseprofiles.fake import FakeEvent, FakePulseDisconnected
+from pypulseprofiles.watcher import PulseWatcher
+
+BUILTIN = {
+    'source': {'device': "alsa_input.pci.analog-stereo"},
+    'sink': {'device': "alsa_output.pci.analog-stereo", 'port': "analog-output-headphones"},
+}
+""" profile for the built-in devices. """
+
+DOCK = {
+    'source': {'device': "alsa_input.pci.analog-stereo"},
+    'sink': {'device': "alsa_output.dock.analog-stereo"},
+    'priority': 10,
+}
+""" profile for the sink of a docking station, preferred if available. """
+
+
+@pytest.fixture
+def watcher(server):
+    """
+    The connected watcher, with the profiles stored in the config dir.
+    """
+
+    pulse_store(BUILTIN, "builtin")
+    pulse_store(DOCK, "dock")
+    result = PulseWatcher(debounce=0.01)
+    result._connect()
+    yield result
+    result.session.close()
+
+
+def wait_for_events(watcher, timeout=2.0):
+    """
+    Waits for the events in a separate thread, to not block the tests if no event arrives.
+
+    :param watcher: the watcher to wait with
+    :type watcher: PulseWatcher
+    :param timeout: the time in seconds to wait at most
+    :type timeout: float
+    :return: the time of the first event of the burst, None if none arrived in time
+    :rtype: float
+    """
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(watcher._wait_for_events()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        watcher.session.pulse.event_listen_stop()
+        watcher._pending = 0.0
+        thread.join()
+        return None
+    return result[0]
+
+
+def test_no_pulsectl_import():
+    # the fake backend works without pulsectl, which only gets imported on connecting with the pulsectl backend
+    code = "import sys, pypulseprofiles.watch; print('pulsectl' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.stdout.strip() == "False", result.stderr
+
+
+def test_applies_on_new_device(server, watcher):
+    assert watcher._apply()
+    assert watcher.applied == "builtin"
+    assert server.sink("alsa_output.pci.analog-stereo").port_active.name == "analog-output-headphones"
+
+    server.add_sink("alsa_output.dock.analog-stereo", "Dock")
+    assert wait_for_events(watcher) is not None
+    assert watcher._apply()
+    assert watcher.applied == "dock"
+    assert server.default_sink_name == "alsa_output.dock.analog-stereo"
+
+
+def test_event_during_apply_not_lost(server, watcher):
+    # an event that got dispatched while applying (e.g., during a pulsectl call) must trigger another evaluation
+    with pytest.raises(watcher._stop):
+        watcher._on_event(FakeEvent("sink", "new", 5))
+    assert watcher._apply()
+    start = wait_for_events(watcher, timeout=1.0)
+    assert start is not None
+    assert watcher._pending is None
+
+
+def test_irrelevant_events_ignored(server, watcher):
+    watcher._on_event(FakeEvent("sink", "change", 0))
+    assert watcher._pending is None
+
+
+def test_applies_card_profile(server, watcher):
+    # the sink is available with both card profiles
+    server.add_card("bluez_card.headset", "Headset",
+                    profiles=[("headset_head_unit", "Headset Head Unit",
+                               [("bluez_source.headset", "Headset")], [("bluez_sink.headset", "Headset")]),
+                              ("a2dp_sink", "High Fidelity Playback", [], [("bluez_sink.headset", "Headset")])],
+                    active="headset_head_unit")
+    pulse_store({'card': {'device': "bluez_card.headset", 'profile': "a2dp_sink"},
+                 'source': {'device': "alsa_input.pci.analog-stereo"},
+                 'sink': {'device': "bluez_sink.headset"},
+                 'priority': 20}, "headset")
+    assert watcher._apply()
+    assert watcher.applied == "headset"
+    assert server.card("bluez_card.headset").profile_active.name == "a2dp_sink"
+    assert server.default_sink_name == "bluez_sink.headset"
+
+
+def test_moves_streams(server, watcher):
+    stream = server.add_stream("sink", "alsa_output.usb.analog-stereo", application="Firefox")
+    server.default_sink_name = "alsa_output.usb.analog-stereo"
+    watcher.move = True
+    assert watcher._apply()
+    assert watcher.applied == "builtin"
+    assert stream.sink == server.sink("alsa_output.pci.analog-stereo").index
+
+
+def test_failure_reported(server, watcher, capsys):
+    server.fail("port_set")
+    assert not watcher._apply()
+    assert "Failed to apply profile" in capsys.readouterr().out
+
+
+def test_operation_error_keeps_connection(server, watcher, capsys):
+    # e.g., a failed query: reported, the watcher keeps its connection instead of reconnecting
+    pulse = watcher.session.pulse
+    server.fail("sink_list")
+    assert not watcher._apply()
+    assert "Failed to apply profile: Injected failure: sink_list" in capsys.readouterr().out
+    assert watcher.session.pulse is pulse
+    assert watcher._apply()
+
+
+def test_disconnect_raised(server, watcher):
+    server.fail("sink_list", error=FakePulseDisconnected("Connection lost"))
+    with pytest.raises(FakePulseDisconnected):
+        watcher._apply()